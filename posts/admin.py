@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Post, Group
+from . import search
+from .models import Comment, Follow, Post, Group, Upload
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +10,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по индексу вместо LIKE '%...%' по всей таблице, без
+        # ограничения выдачи сайта: в админке нужны все совпадения
+        if not search_term:
+            return queryset, False
+        return search.matching(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("pk", "title", "description")
@@ -29,7 +37,15 @@ class FollowAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ("pk", "owner", "post", "filename", "size", "received",
+                    "state")
+    list_filter = ("state", "created")
+    empty_value_display = "-пусто-"
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Upload, UploadAdmin)
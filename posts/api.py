@@ -0,0 +1,346 @@
+"""JSON API over posts, comments, groups and subscriptions.
+
+Rows are read with ``values()`` and serialized as they come, without
+building model instances. ``?fields=`` picks the fields of the listed
+objects, listings are cursor paginated like the HTML pages, and the
+export streams every matching post so memory stays flat however many
+there are. Authentication is the session of the site; writes need the
+CSRF token like its forms.
+"""
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from . import uploads
+from .counters import stats_for
+from .feed import feed_posts
+from .forms import CommentForm
+from .models import Comment, Follow, Group, Post, Upload
+from .paginator import COMMENT_KEYS, FEED_KEYS, POST_KEYS, CursorPaginator
+
+User = get_user_model()
+
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+EXPORT_CHUNK_SIZE = 2000
+# API field name: lookup it is read from
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_view(*methods, login=False):
+    """Allow the methods, answer errors and missing objects with JSON."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise ApiError(405, 'Method not allowed.')
+                needs_login = login is True or request.method in (
+                    login or ()
+                )
+                if needs_login and not request.user.is_authenticated:
+                    raise ApiError(401, 'Authentication required.')
+                return view(request, *args, **kwargs)
+            except Http404:
+                return _json({'detail': 'Not found.'}, 404)
+            except ApiError as error:
+                return _json({'detail': error.detail}, error.status)
+        return wrapper
+    return decorator
+
+
+def selected(request, fields):
+    """Names and lookups of the fields asked for with ``?fields=``."""
+    names = request.GET.get('fields')
+    if not names:
+        return dict(fields)
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(400, f'Unknown fields: {", ".join(unknown)}.')
+    return {name: fields[name] for name in names}
+
+
+def _rows(queryset, fields, keys=()):
+    """``values()`` of the lookups, keys needed by the cursor included."""
+    return queryset.values(*dict.fromkeys([*fields.values(), *keys]))
+
+
+def _serialize(row, fields):
+    item = {name: row[lookup] for name, lookup in fields.items()}
+    if 'image' in item:
+        item['image'] = (default_storage.url(item['image'])
+                         if item['image'] else None)
+    return item
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def listing(request, queryset, fields, keys=POST_KEYS):
+    """One cursor page of the queryset with links to its neighbours."""
+    fields = selected(request, fields)
+    try:
+        per_page = min(int(request.GET.get('limit', PER_PAGE)),
+                       MAX_PER_PAGE)
+    except ValueError:
+        raise ApiError(400, 'limit must be a number.')
+    if per_page < 1:
+        raise ApiError(400, 'limit must be positive.')
+    paginator = CursorPaginator(_rows(queryset, fields, keys), per_page,
+                                keys)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except ValueError:
+        raise ApiError(400, 'Invalid cursor.')
+    return _json({
+        'results': [_serialize(row, fields) for row in page],
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    })
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        raise ApiError(400, 'Invalid JSON.')
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Expected a JSON object.')
+    return data
+
+
+def _post(post_id):
+    return get_object_or_404(Post, pk=post_id)
+
+
+@api_view('GET')
+def posts(request):
+    """Posts of every author, newest first."""
+    return listing(request, Post.objects.all(), POST_FIELDS)
+
+
+@api_view('GET')
+def post_detail(request, post_id):
+    fields = selected(request, POST_FIELDS)
+    row = _rows(Post.objects.filter(pk=post_id), fields).first()
+    if row is None:
+        raise Http404
+    return _json(_serialize(row, fields))
+
+
+@api_view('GET', 'POST', login=('POST',))
+def comments(request, post_id):
+    """Comments of the post, newest first; POST adds one."""
+    post = _post(post_id)
+    if request.method == 'GET':
+        return listing(request, post.comments.all(), COMMENT_FIELDS,
+                       COMMENT_KEYS)
+    if request.content_type == 'application/json':
+        data = _json_body(request)
+    else:
+        data = request.POST
+    form = CommentForm(data)
+    if not form.is_valid():
+        return _json({'errors': form.errors}, 400)
+    with transaction.atomic():
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+    row = _rows(Comment.objects.filter(pk=comment.pk), COMMENT_FIELDS).get()
+    return _json(_serialize(row, COMMENT_FIELDS), 201)
+
+
+@api_view('GET')
+def groups(request):
+    fields = selected(request, GROUP_FIELDS)
+    rows = _rows(Group.objects.all(), fields)
+    return _json({'results': [_serialize(row, fields) for row in rows]})
+
+
+@api_view('GET')
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return listing(request, group.posts.all(), POST_FIELDS)
+
+
+@api_view('GET')
+def profile(request, username):
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = stats_for(author)
+    following = (request.user.is_authenticated and
+                 request.user.follower.filter(author=author).exists())
+    return _json({
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': following,
+    })
+
+
+@api_view('GET')
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return listing(request, author.posts.all(), POST_FIELDS)
+
+
+@api_view('GET', login=True)
+def follow_index(request):
+    """Posts of the subscriptions, newest first."""
+    return listing(request, feed_posts(request.user), POST_FIELDS,
+                   FEED_KEYS)
+
+
+@api_view('POST', 'DELETE', login=True)
+def follow(request, username):
+    """POST subscribes to the author, DELETE unsubscribes."""
+    author = get_object_or_404(User, username=username)
+    if author == request.user:
+        raise ApiError(400, 'You cannot follow yourself.')
+    with transaction.atomic():
+        if request.method == 'DELETE':
+            for subscription in request.user.follower.filter(author=author):
+                subscription.delete()
+            return _json({'following': False})
+        _, created = Follow.objects.get_or_create(user=request.user,
+                                                  author=author)
+    return _json({'following': True}, 201 if created else 200)
+
+
+def _stream(rows, fields):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '['
+    for number, row in enumerate(rows):
+        yield (',' if number else '') + encoder.encode(
+            _serialize(row, fields)
+        )
+    yield ']'
+
+
+@api_view('GET')
+def export(request):
+    """Every post as one JSON array, streamed while it is read.
+
+    ``?author=`` and ``?group=`` narrow it down, ``?fields=`` works as
+    in the listings.
+    """
+    fields = selected(request, POST_FIELDS)
+    queryset = Post.objects.order_by('id')
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    rows = _rows(queryset, fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return StreamingHttpResponse(_stream(rows, fields),
+                                 content_type='application/json')
+
+
+def _upload(upload):
+    return {
+        'id': upload.pk,
+        'post': upload.post_id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.received,
+        'state': upload.state,
+        'format': upload.format or None,
+        'width': upload.width,
+        'height': upload.height,
+        'error': upload.error or None,
+        'max_part_bytes': uploads.MAX_PART_BYTES,
+        'url': reverse('api_upload', args=[upload.pk]),
+    }
+
+
+@api_view('POST', login=True)
+def start_upload(request):
+    """Start sending an image for a post of the user in parts.
+
+    Takes ``{"post": id, "filename": name, "size": bytes}``; the parts
+    are then ``PUT`` to the returned ``url``.
+    """
+    data = _json_body(request)
+    post = get_object_or_404(Post, pk=data.get('post'),
+                             author=request.user)
+    try:
+        upload = uploads.start(request.user, post, data.get('filename'),
+                               data.get('size'))
+    except uploads.UploadError as error:
+        raise ApiError(error.status, error.detail)
+    return _json(_upload(upload), 201)
+
+
+@api_view('GET', 'PUT', 'DELETE', login=True)
+def upload_detail(request, upload_id):
+    """State of an upload; PUT adds a part, DELETE cancels it.
+
+    A part is the raw request body, its position in the file is the
+    ``Upload-Offset`` header. It has to be the ``offset`` the upload has
+    reached, which GET tells after a lost connection.
+    """
+    upload = get_object_or_404(Upload, pk=upload_id, owner=request.user)
+    if request.method == 'DELETE':
+        upload.delete()
+        return HttpResponse(status=204)
+    if request.method == 'PUT':
+        try:
+            offset = int(request.META.get('HTTP_UPLOAD_OFFSET', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            raise ApiError(400, 'Upload-Offset must be a number.')
+        try:
+            uploads.receive(upload, offset, request, length)
+        except uploads.UploadError as error:
+            raise ApiError(error.status, error.detail)
+        # without workers the image is processed already
+        upload.refresh_from_db()
+    return _json(_upload(upload))
@@ -0,0 +1,33 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path("posts/", api.posts, name="api_posts"),
+    path("posts/export/", api.export, name="api_export"),
+    path("posts/<int:post_id>/", api.post_detail, name="api_post"),
+    path(
+        "posts/<int:post_id>/comments/", api.comments,
+        name="api_comments"
+        ),
+    path("groups/", api.groups, name="api_groups"),
+    path(
+        "groups/<slug:slug>/posts/", api.group_posts,
+        name="api_group_posts"
+        ),
+    path("users/<str:username>/", api.profile, name="api_profile"),
+    path(
+        "users/<str:username>/posts/", api.profile_posts,
+        name="api_profile_posts"
+        ),
+    path(
+        "users/<str:username>/follow/", api.follow,
+        name="api_follow"
+        ),
+    path("follow/", api.follow_index, name="api_follow_index"),
+    path("uploads/", api.start_upload, name="api_uploads"),
+    path(
+        "uploads/<int:upload_id>/", api.upload_detail,
+        name="api_upload"
+        ),
+]
@@ -0,0 +1,277 @@
+"""Export and import of groups, posts and comments as NDJSON.
+
+An archive is one JSON object per line: the groups first, then every
+post in id order with its comments inline. Authors and groups are named
+by username and slug, so an archive moves between databases whose
+primary keys differ. Images are referenced by their storage name and
+may travel beside the archive in a tar file.
+
+Both directions stream. The export reads posts and comments with two
+server-side iterators and merges them by post, the import buffers a
+batch of lines, resolves names to primary keys through caches kept for
+the whole run and writes the batch with ``bulk_create`` in one
+transaction. Imported posts get new ids from the database and keep the
+run and their archive id as ``import_key``. After each batch a
+checkpoint records how far the file was applied, so an interrupted
+import resumes where it stopped; a batch committed before its
+checkpoint was saved is found by its keys and not written again. Like
+the seeding, imports skip the signals: the counters, timelines and
+search index are rebuilt at the end.
+"""
+import gzip
+import json
+import os
+import tarfile
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .bulk import bulk_create
+from .models import Comment, Group, Post
+
+User = get_user_model()
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+# images are stored under the upload directory of Post.image
+IMAGE_DIRECTORY = Post._meta.get_field('image').upload_to
+
+
+def open_archive(path, mode):
+    """Open the archive for text, gzip-compressed if its name ends in .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _comments_by_post(posts, chunk_size):
+    """Comments of the posts, ordered by post to merge with them."""
+    comments = Comment.objects.all()
+    if posts is not None:
+        comments = comments.filter(post__in=posts.values('pk'))
+    # the order of the post and date index, read without sorting
+    comments = comments.order_by('post_id', '-created').values_list(
+        'post_id', 'author__username', 'text', 'created'
+    )
+    return comments.iterator(chunk_size=chunk_size)
+
+
+def records(posts=None, chunk_size=CHUNK_SIZE):
+    """Archive lines of the groups and of the posts with their comments.
+
+    ``posts`` narrows the export down to a queryset of posts.
+    """
+    comments = _comments_by_post(posts, chunk_size)
+    if posts is None:
+        posts = Post.objects.all()
+    groups = Group.objects.order_by('id').values('slug', 'title',
+                                                 'description')
+    for group in groups.iterator(chunk_size=chunk_size):
+        yield {'type': 'group', **group}
+    pending = next(comments, None)
+    rows = posts.order_by('id').values_list(
+        'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image'
+    )
+    for pk, text, pub_date, author, group, image in rows.iterator(
+            chunk_size=chunk_size):
+        inline = []
+        while pending is not None and pending[0] == pk:
+            inline.append({'author': pending[1], 'text': pending[2],
+                           'created': pending[3].isoformat()})
+            pending = next(comments, None)
+        yield {'type': 'post', 'id': pk, 'text': text,
+               'pub_date': pub_date.isoformat(), 'author': author,
+               'group': group, 'image': image or None, 'comments': inline}
+
+
+def export(stream, posts=None, images=None, chunk_size=CHUNK_SIZE,
+           progress=None):
+    """Write the archive to the text stream, return the counts.
+
+    ``images`` is an open tar file receiving the image of every post.
+    ``progress(rows)`` is called after each post with the rows so far.
+    """
+    counts = {'groups': 0, 'posts': 0, 'comments': 0, 'images': 0,
+              'missing_images': 0}
+    for record in records(posts, chunk_size):
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if record['type'] == 'group':
+            counts['groups'] += 1
+            continue
+        counts['posts'] += 1
+        counts['comments'] += len(record['comments'])
+        if images is not None and record['image']:
+            if _add_image(images, record['image']):
+                counts['images'] += 1
+            else:
+                counts['missing_images'] += 1
+        if progress:
+            progress(counts['posts'] + counts['comments'])
+    return counts
+
+
+def _add_image(tar, name):
+    if not default_storage.exists(name):
+        return False
+    member = tarfile.TarInfo(name)
+    member.size = default_storage.size(name)
+    with default_storage.open(name) as file:
+        tar.addfile(member, file)
+    return True
+
+
+def extract_images(tar):
+    """Save the images of the tar to the storage, keep existing files."""
+    saved = 0
+    for member in tar:
+        name = member.name
+        if (not member.isfile() or not name.startswith(IMAGE_DIRECTORY)
+                or '..' in name.split('/')):
+            continue
+        if not default_storage.exists(name):
+            default_storage.save(name, File(tar.extractfile(member)))
+            saved += 1
+    return saved
+
+
+class Checkpoint:
+    """How far an archive was imported, kept in a JSON file beside it."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state):
+        # a crash mid-write must not leave a truncated checkpoint
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class Importer:
+    """Apply archive lines batch by batch, remembering the names seen."""
+
+    def __init__(self, checkpoint=None, batch_size=BATCH_SIZE,
+                 progress=None):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.progress = progress
+        self.users = {}
+        self.groups = {}
+
+    def new_state(self):
+        # the run names the import keys, a resumed run keeps it
+        return {'line': 0, 'run': uuid.uuid4().hex[:12],
+                'groups': 0, 'posts': 0, 'comments': 0}
+
+    def run(self, stream, resume=True):
+        """Import the lines of the text stream, return the counts."""
+        state = self.checkpoint and resume and self.checkpoint.load()
+        if not state:
+            state = self.new_state()
+            # the run is kept before any batch, a crash may follow one
+            if self.checkpoint:
+                self.checkpoint.save(state)
+        batch = []
+        for number, line in enumerate(stream, 1):
+            if number <= state['line'] or not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= self.batch_size:
+                self.apply(batch, state, number)
+                batch = []
+        if batch:
+            self.apply(batch, state, number)
+        if self.checkpoint:
+            self.checkpoint.clear()
+        return state
+
+    def apply(self, batch, state, line):
+        with transaction.atomic():
+            self._groups([r for r in batch if r['type'] == 'group'], state)
+            posts = [r for r in batch if r['type'] == 'post']
+            # a resumed run skipped the group lines, look the slugs up
+            self._resolve(self.groups, Group, 'slug',
+                          {r['group'] for r in posts if r['group']})
+            self._users({r['author'] for r in posts} |
+                        {c['author'] for r in posts for c in r['comments']})
+            self._posts(posts, state)
+        state['line'] = line
+        if self.checkpoint:
+            self.checkpoint.save(state)
+        if self.progress:
+            self.progress(state['posts'] + state['comments'])
+
+    def _resolve(self, cache, model, field, names):
+        missing = names - cache.keys()
+        if missing:
+            cache.update(model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk'))
+        return names - cache.keys()
+
+    def _groups(self, records, state):
+        slugs = {record['slug'] for record in records}
+        missing = self._resolve(self.groups, Group, 'slug', slugs)
+        bulk_create(Group, [
+            Group(slug=record['slug'], title=record['title'],
+                  description=record['description'])
+            for record in records if record['slug'] in missing
+        ], ignore_conflicts=True)
+        self._resolve(self.groups, Group, 'slug', missing)
+        state['groups'] += len(missing)
+
+    def _users(self, usernames):
+        missing = self._resolve(self.users, User, 'username', usernames)
+        # authors unknown here get accounts without a usable password
+        bulk_create(User, [User(username=username, password='!')
+                           for username in sorted(missing)],
+                    ignore_conflicts=True)
+        self._resolve(self.users, User, 'username', missing)
+
+    def _posts(self, records, state):
+        keys = {f'{state["run"]}:{record["id"]}': record
+                for record in records}
+        state['posts'] += len(records)
+        state['comments'] += sum(len(r['comments']) for r in records)
+        # a replayed batch was committed whole, posts and comments alike
+        written = set(Post.objects.filter(
+            import_key__in=keys
+        ).values_list('import_key', flat=True))
+        new = {key: record for key, record in keys.items()
+               if key not in written}
+        # raw keeps the dates, auto_now_add would set them all to now
+        bulk_create(Post, [
+            Post(text=record['text'],
+                 pub_date=parse_datetime(record['pub_date']),
+                 author_id=self.users[record['author']],
+                 group_id=self.groups.get(record['group']),
+                 image=record['image'] or None,
+                 comment_count=len(record['comments']), import_key=key)
+            for key, record in new.items()
+        ], raw=True)
+        ids = dict(Post.objects.filter(
+            import_key__in=new
+        ).values_list('import_key', 'pk'))
+        bulk_create(Comment, [
+            Comment(post_id=ids[key], author_id=self.users[c['author']],
+                    text=c['text'], created=parse_datetime(c['created']))
+            for key, record in new.items() for c in record['comments']
+        ], raw=True)
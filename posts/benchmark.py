@@ -0,0 +1,210 @@
+"""Drive the public views and measure latency, queries and throughput.
+
+Requests go either through the Django test client or over HTTP to a
+threaded WSGI server started in this process. Queries per request are
+read from the histograms of ``MetricsMiddleware``.
+"""
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+from django.urls import reverse
+
+from .models import Group, Post
+from yatube import metrics
+
+# scenarios are named after the URL names of the views they request
+SCENARIOS = ('index', 'group', 'profile', 'post', 'follow_index',
+             'new_post', 'add_comment')
+
+
+def build_request(name, rng, data):
+    """``(method, url, payload)`` of one request of the scenario."""
+    if name == 'index':
+        return 'GET', reverse('index'), None
+    if name == 'group':
+        slug = rng.choice(data['groups'])
+        return 'GET', reverse('group', kwargs={'slug': slug}), None
+    if name == 'profile':
+        username = rng.choice(data['authors'])
+        return 'GET', reverse('profile', kwargs={'username': username}), None
+    if name == 'follow_index':
+        return 'GET', reverse('follow_index'), None
+    if name == 'new_post':
+        return 'POST', reverse('new_post'), {'text': 'Пост из бенчмарка'}
+    username, post_id = rng.choice(data['posts'])
+    kwargs = {'username': username, 'post_id': post_id}
+    if name == 'post':
+        return 'GET', reverse('post', kwargs=kwargs), None
+    return ('POST', reverse('add_comment', kwargs=kwargs),
+            {'text': 'Комментарий из бенчмарка'})
+
+
+def sample_data(limit=1000):
+    """Groups, authors and posts the scenarios pick their URLs from."""
+    posts = list(Post.objects.order_by('-pk').values_list(
+        'author__username', 'pk'
+    )[:limit])
+    return {
+        'groups': list(Group.objects.values_list('slug', flat=True)[:limit]),
+        'authors': sorted({username for username, _ in posts}),
+        'posts': posts,
+    }
+
+
+class ClientDriver:
+    """Requests through the test client, one client per thread."""
+
+    name = 'client'
+
+    def __init__(self, user):
+        self.user = user
+        self.local = threading.local()
+
+    def __call__(self, method, url, payload):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+            client.force_login(self.user)
+        if method == 'GET':
+            response = client.get(url)
+            if response.streaming:
+                # a streamed page is only built while it is read
+                b''.join(response.streaming_content)
+            return response.status_code
+        return client.post(url, payload).status_code
+
+    def close(self):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ServerDriver:
+    """Requests over HTTP to a WSGI server running in a thread."""
+
+    name = 'server'
+
+    def __init__(self, user):
+        self.server = make_server('127.0.0.1', 0, WSGIHandler(),
+                                  server_class=ThreadingServer,
+                                  handler_class=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        self.opener = urllib.request.build_opener(NoRedirect)
+        client = Client()
+        client.force_login(user)
+        self.cookies = {
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+        }
+        self.cookies[settings.CSRF_COOKIE_NAME] = self._csrf_token()
+
+    def _csrf_token(self):
+        response = self.opener.open(self._request('GET', reverse('new_post')))
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';')[0].partition('=')
+            if name == settings.CSRF_COOKIE_NAME:
+                return value
+        raise RuntimeError('The new post form did not set a CSRF cookie')
+
+    def _request(self, method, url, payload=None):
+        headers = {'Cookie': '; '.join(
+            f'{name}={value}' for name, value in self.cookies.items()
+        )}
+        body = None
+        if method == 'POST':
+            body = urllib.parse.urlencode(payload).encode()
+            headers['X-CSRFToken'] = self.cookies[settings.CSRF_COOKIE_NAME]
+        return urllib.request.Request(self.base + url, body, headers,
+                                      method=method)
+
+    def __call__(self, method, url, payload):
+        try:
+            with self.opener.open(self._request(method, url, payload)) as r:
+                r.read()
+                return r.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def run_scenario(driver, name, data, requests, concurrency, warmup, seed):
+    """Measure one scenario, return its summary."""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        driver(*build_request(name, rng, data))
+    planned = [build_request(name, rng, data) for _ in range(requests)]
+    queries_before = metrics.SQL_QUERIES.totals(view=name)
+
+    def timed(request):
+        start = time.perf_counter()
+        status = driver(*request)
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, planned))
+    else:
+        results = [timed(request) for request in planned]
+    elapsed = time.perf_counter() - start
+    queries_after = metrics.SQL_QUERIES.totals(view=name)
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    served = queries_after[0] - queries_before[0]
+    queries = queries_after[1] - queries_before[1]
+    return {
+        'requests': requests,
+        'errors': sum(status >= 400 for _, status in results),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'queries': round(queries / served, 2) if served else None,
+        'throughput_rps': round(requests / elapsed, 1),
+    }
+
+
+def run(driver, data, scenarios=SCENARIOS, requests=100, concurrency=1,
+        warmup=5, seed=0):
+    return {
+        name: run_scenario(driver, name, data, requests, concurrency,
+                           warmup, seed)
+        for name in scenarios
+    }
@@ -0,0 +1,45 @@
+from django.db import connections, router, transaction
+
+BATCH_SIZE = 1000
+
+
+def bulk_create(model, objs, batch_size=BATCH_SIZE, raw=False, **kwargs):
+    """``bulk_create`` in batches the database accepts.
+
+    Django 2.2 sends an explicit batch size to the database as is, and
+    SQLite rejects statements over its limits on variables and compound
+    SELECT terms, so the size is capped by what the backend allows.
+
+    ``raw`` writes the values as they are set, like ``loaddata`` does:
+    ``auto_now_add`` dates are kept instead of replaced by the current
+    time, and the ids of new rows are not read back.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    db = router.db_for_write(model)
+    limit = connections[db].ops.bulk_batch_size(model._meta.concrete_fields,
+                                                objs)
+    batch_size = max(min(batch_size, limit), 1)
+    if raw:
+        _insert_raw(model, objs, db, batch_size, **kwargs)
+        return objs
+    return model.objects.bulk_create(objs, batch_size=batch_size, **kwargs)
+
+
+def _insert_raw(model, objs, db, batch_size, ignore_conflicts=False):
+    meta = model._meta
+    fields = meta.concrete_fields
+    without_id = [field for field in fields if field is not meta.auto_field]
+    groups = (
+        ([obj for obj in objs if obj.pk is not None], fields),
+        ([obj for obj in objs if obj.pk is None], without_id),
+    )
+    with transaction.atomic(using=db, savepoint=False):
+        for group, group_fields in groups:
+            for start in range(0, len(group), batch_size):
+                # the insert of Model.save(), with pre_save() skipped
+                model._base_manager._insert(
+                    group[start:start + batch_size], fields=group_fields,
+                    raw=True, using=db, ignore_conflicts=ignore_conflicts,
+                )
@@ -0,0 +1,103 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube import metrics
+from yatube.db import routers
+
+FRAGMENT_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+# how long a stale fragment may be served while one worker rebuilds it
+STALE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_STALE_TIMEOUT', 60)
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.5
+LOCK_POLL = 0.05
+
+
+def _key(scope, pk=None):
+    return f'version:{scope}' if pk is None else f'version:{scope}:{pk}'
+
+
+def _generation():
+    # An evicted counter restarts above every value it could have had.
+    return int(time.time() * 1000)
+
+
+def versions(*scopes):
+    """Current generation of the scopes joined into one cache key part.
+
+    A scope is a tuple like ``('all',)``, ``('group', 1)``,
+    ``('author', 1)``, ``('post', 1)`` or ``('feed', 1)``.
+    """
+    keys = [_key(*scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _generation() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def bump(*scopes):
+    """Invalidate every fragment cached under the scopes."""
+    for scope in scopes:
+        key = _key(*scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _generation(), None)
+
+
+def bump_post(post_id, author_id, *group_ids):
+    """Invalidate every listing that shows the post."""
+    scopes = [('all',), ('post', post_id), ('author', author_id)]
+    scopes += [('group', pk) for pk in set(group_ids) if pk is not None]
+    bump(*scopes)
+
+
+def get_or_render(key, version, render, timeout=FRAGMENT_TIMEOUT):
+    """Return a cached fragment or render it, guarding against stampedes.
+
+    Entries are ``(version, fresh_until, value)``. Only the worker that
+    takes the lock renders; the others serve the expired value of the
+    same version, or wait for the new version for up to ``LOCK_WAIT``
+    seconds before rendering it themselves.
+    """
+    entry = cache.get(key)
+    current = entry is not None and entry[0] == version
+    if current and entry[1] > time.time():
+        metrics.count_cache(True)
+        return entry[2]
+    locked = _lock(key)
+    if not locked:
+        if not current:
+            entry = _wait(key, version)
+        if entry is not None and entry[0] == version:
+            metrics.count_cache(True)
+            return entry[2]
+    metrics.count_cache(False)
+    if routers.reads_replica():
+        # a lagging replica may render rows older than the version
+        timeout = min(timeout, routers.PIN_SECONDS)
+    try:
+        value = render()
+        cache.set(key, (version, time.time() + timeout, value),
+                  timeout + STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(f'lock:{key}')
+    return value
+
+
+def _lock(key):
+    return cache.add(f'lock:{key}', 1, LOCK_TIMEOUT)
+
+
+def _wait(key, version):
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry
+    return None
@@ -0,0 +1,113 @@
+"""Rendered HTML of post cards, post bodies and comments.
+
+Each one is rendered once for every viewer and stored under a digest of
+what it shows, so a listing page is mostly a concatenation of stored
+fragments, and a changed post gets a new key instead of needing an
+invalidation. Posts are rendered ahead when they are saved, when a
+comment changes their counter and when their thumbnails are ready.
+
+Parts only the author sees, like the edit button, are rendered for
+everyone between markers naming the author (``{% author_only %}``);
+``for_viewer`` keeps them for the author and drops them for the others
+once the fragments holding them are read from the cache. The markers
+stay in the cached listing fragments too, so those are shared by all
+viewers.
+"""
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from tasks.queue import task
+from yatube import metrics
+
+from .cache import FRAGMENT_TIMEOUT
+from .loaders import load_comments, load_posts
+from .models import Comment, Post
+
+CARD_TEMPLATE = 'includes/post_item.html'
+BODY_TEMPLATE = 'includes/post_body.html'
+COMMENT_TEMPLATE = 'includes/comment_item.html'
+# context variable making {% author_only %} render for everyone in markers
+DEFERRED = 'author_only_deferred'
+AUTHOR_ONLY = re.compile(r'<!--author:(\d+)-->(.*?)<!--/author-->', re.S)
+
+
+def _digest(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def post_version(post):
+    """Digest of everything a card or body shows; variants prefetched."""
+    group = post.group and (post.group.slug, post.group.title)
+    variants = [(variant.file.name, variant.width, variant.format)
+                for variant in post.variants.all()]
+    return _digest(post.text, post.pub_date, str(post.image),
+                   post.image_card, post.comment_count, post.author_id,
+                   post.author.username, group, variants)
+
+
+def comment_version(comment):
+    return _digest(comment.text, comment.author.username)
+
+
+def marked(author_id, html):
+    return f'<!--author:{author_id}-->{html}<!--/author-->'
+
+
+def for_viewer(html, user):
+    """Keep the parts of the user's own posts, drop those of the others."""
+    if '<!--author:' not in html:
+        return html
+    viewer = str(user.pk) if user is not None and user.pk else None
+    return mark_safe(AUTHOR_ONLY.sub(
+        lambda match: match[2] if match[1] == viewer else '', html
+    ))
+
+
+def rendered(template_name, objects, version, name):
+    """HTML of every object, read from the cache or rendered and stored."""
+    objects = list(objects)
+    keys = [f'html:{template_name}:{obj.pk}:{version(obj)}'
+            for obj in objects]
+    found = cache.get_many(keys)
+    missing = {}
+    for key, obj in zip(keys, objects):
+        if key not in found:
+            template = get_template(template_name)
+            found[key] = missing[key] = template.render(
+                {name: obj, DEFERRED: True}
+            )
+    if objects:
+        metrics.count_cache(not missing)
+    if missing:
+        cache.set_many(missing, FRAGMENT_TIMEOUT)
+    return [found[key] for key in keys]
+
+
+def cards(posts):
+    return rendered(CARD_TEMPLATE, posts, post_version, 'post')
+
+
+def body(post):
+    return rendered(BODY_TEMPLATE, [post], post_version, 'post')[0]
+
+
+def comments(items):
+    return rendered(COMMENT_TEMPLATE, items, comment_version, 'item')
+
+
+@task(dedupe=True)
+def warm_post(post_id):
+    """Render the card and body of a saved post before anyone asks."""
+    post = load_posts(Post.objects.filter(pk=post_id)).first()
+    if post is not None:
+        cards([post])
+        body(post)
+
+
+@task(dedupe=True)
+def warm_comment(comment_id):
+    comments(load_comments(Comment.objects.filter(pk=comment_id)))
@@ -0,0 +1,132 @@
+"""Validators answering conditional GETs of the post and listing pages.
+
+The ETag of a page is built from the fragment cache versions it renders
+under, which every change of its posts and comments bumps, plus what the
+page shows beside them: the counters and follow button of the author
+card and the viewer, so one user's page never validates another's. It
+is weak because the CSRF token differs between renders. No
+Last-Modified is sent: the dates of the posts and comments miss edits,
+deletions and the counters, and a client sending only If-Modified-Since
+would be told that a changed page is unchanged.
+
+The lookups are kept on the request, so the view renders from them
+instead of querying again.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import versions
+from .counters import stats_for
+from .models import Group
+
+User = get_user_model()
+
+# how long a reverse proxy may serve an anonymous page without asking
+EDGE_SECONDS = getattr(settings, 'PAGE_CACHE_EDGE_SECONDS', 10)
+
+
+class PageState:
+    """Version and objects a page is rendered from."""
+
+    def __init__(self, request, version, *shown):
+        self.version = version
+        viewer = request.user.pk if request.user.is_authenticated else 0
+        raw = ':'.join(str(part) for part in
+                       (cache.version, viewer, version, *shown))
+        self.etag = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def kept_on_request(func):
+    """Compute the state once per request and view arguments."""
+    @wraps(func)
+    def wrapper(request, **kwargs):
+        states = request.__dict__.setdefault('_page_states', {})
+        key = (func.__name__, *sorted(kwargs.items()))
+        if key not in states:
+            states[key] = func(request, **kwargs)
+        return states[key]
+    return wrapper
+
+
+def _author(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = stats_for(author)
+    following = (request.user.is_authenticated and
+                 request.user.follower.filter(author=author).exists())
+    shown = (author.get_full_name(), stats.posts_count,
+             stats.followers_count, stats.following_count, following)
+    return author, stats, following, shown
+
+
+@kept_on_request
+def index_state(request):
+    return PageState(request, versions(('all',)))
+
+
+@kept_on_request
+def groups_state(request):
+    return PageState(request, versions(('groups',)))
+
+
+@kept_on_request
+def group_state(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    state = PageState(request, versions(('group', group.pk)),
+                      group.title, group.description)
+    state.group = group
+    return state
+
+
+@kept_on_request
+def profile_state(request, username):
+    author, stats, following, shown = _author(request, username)
+    state = PageState(request, versions(('author', author.pk)), *shown)
+    state.author, state.stats, state.following = author, stats, following
+    return state
+
+
+@kept_on_request
+def post_state(request, username, post_id):
+    author, stats, following, shown = _author(request, username)
+    if not author.posts.filter(pk=post_id).exists():
+        raise Http404('No Post matches the given query.')
+    state = PageState(request, versions(('post', post_id)), *shown)
+    state.author, state.stats, state.following = author, stats, following
+    return state
+
+
+def validated_by(state_func):
+    """Answer conditional GETs of the view with the page state.
+
+    Signed-in users get private responses revalidated on every use;
+    anonymous ones may be kept by a reverse proxy for ``EDGE_SECONDS``,
+    keyed by the cookies, which tell the two apart.
+    """
+    def etag(request, *args, **kwargs):
+        return state_func(request, **kwargs).etag
+
+    def decorator(view):
+        conditional = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, public=True, max_age=0,
+                                    s_maxage=EDGE_SECONDS)
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
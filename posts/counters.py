@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .bulk import bulk_create
+from .models import Follow, Post, UserStats
+
+User = get_user_model()
+FIELDS = {
+    'posts_count': 'real_posts',
+    'followers_count': 'real_followers',
+    'following_count': 'real_following',
+}
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def actual_stats():
+    """Users annotated with the counters computed from the tables."""
+    return User.objects.annotate(
+        real_posts=_count(Post, 'author'),
+        real_followers=_count(Follow, 'author'),
+        real_following=_count(Follow, 'user'),
+    )
+
+
+def stats_for(user):
+    """Counters of the user, the row is created on first access."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        real = actual_stats().get(pk=user.pk)
+        user.stats = UserStats.objects.get_or_create(user=user, defaults={
+            field: getattr(real, name) for field, name in FIELDS.items()
+        })[0]
+        return user.stats
+
+
+def change(user_id, field, delta):
+    """Atomically shift one counter of the user by ``delta``."""
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        # A new row is counted from the tables which already hold the change.
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            stats_for(user)
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def reconcile():
+    """Repair counters that drifted from the tables.
+
+    Returns the number of repaired user and post rows.
+    """
+    created, updated = [], []
+    for user in actual_stats().select_related('stats').iterator():
+        real = {field: getattr(user, name) for field, name in FIELDS.items()}
+        try:
+            stats = user.stats
+        except UserStats.DoesNotExist:
+            created.append(UserStats(user=user, **real))
+            continue
+        if any(getattr(stats, field) != value
+               for field, value in real.items()):
+            for field, value in real.items():
+                setattr(stats, field, value)
+            updated.append(stats)
+    bulk_create(UserStats, created)
+    UserStats.objects.bulk_update(updated, list(FIELDS), batch_size=1000)
+
+    posts = Post.objects.order_by().annotate(
+        real=Count('comments')
+    ).exclude(comment_count=F('real')).values_list('pk', 'real')
+    drifted = list(posts)
+    for pk, real in drifted:
+        Post.objects.filter(pk=pk).update(comment_count=real)
+    return len(created) + len(updated) + len(drifted)
+
@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from tasks.queue import enqueue, task
+
+from . import cache
+from .bulk import bulk_create
+from .models import FeedEntry, Follow, Post, UserStats
+
+User = get_user_model()
+
+CELEBRITY_FOLLOWERS = getattr(settings, 'FEED_CELEBRITY_FOLLOWERS', 1000)
+BACKFILL_SIZE = getattr(settings, 'FEED_BACKFILL_SIZE', 500)
+
+
+def is_celebrity(author_id):
+    """Authors with many followers are read at request time."""
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gte=CELEBRITY_FOLLOWERS
+    ).exists()
+
+
+def celebrity_ids(user):
+    """Ids of celebrity authors the user is subscribed to."""
+    return list(Follow.objects.filter(
+        user=user, author__stats__followers_count__gte=CELEBRITY_FOLLOWERS
+    ).values_list('author_id', flat=True))
+
+
+def _entries(users, posts):
+    return [
+        FeedEntry(user_id=user_id, post_id=post.id,
+                  author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in users for post in posts
+    ]
+
+
+def fan_out(post):
+    """Write the new post into the timelines of the author's followers.
+
+    Returns the ids of the followers.
+    """
+    if is_celebrity(post.author_id):
+        return []
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    bulk_create(FeedEntry, _entries(followers, [post]),
+                ignore_conflicts=True)
+    return followers
+
+
+@task(dedupe=True)
+def deliver(post_id):
+    """Fan a new post out and refresh the timelines it was written to."""
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        cache.bump(*[('feed', user_id) for user_id in fan_out(post)])
+
+
+def backfill(user, author):
+    """Copy the recent posts of a new subscription into the timeline."""
+    if is_celebrity(author.pk):
+        return
+    posts = author.posts.only('id', 'author_id', 'pub_date')[:BACKFILL_SIZE]
+    bulk_create(FeedEntry, _entries([user.id], posts),
+                ignore_conflicts=True)
+
+
+def trim(user, author):
+    """Remove the posts of a cancelled subscription from the timeline."""
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+@task(dedupe=True)
+def sync_subscription(user_id, author_id):
+    """Backfill or trim the timeline as the subscription now stands."""
+    user, author = User(pk=user_id), User(pk=author_id)
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user, author)
+    else:
+        trim(user, author)
+    cache.bump(('feed', user_id))
+
+
+def followers_changed(author_id, delta):
+    """Resync the followers when the author crossed the celebrity line.
+
+    Posts of a celebrity are not written to the timelines, so an author
+    who drops below ``FEED_CELEBRITY_FOLLOWERS`` needs them written and
+    one who reaches it has them dropped, see ``sync_author``.
+    """
+    count = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    crossed = CELEBRITY_FOLLOWERS if delta > 0 else CELEBRITY_FOLLOWERS - 1
+    if count == crossed:
+        enqueue(sync_author, author_id)
+
+
+@task(dedupe=True)
+def sync_author(author_id):
+    """Write or drop the posts of the author in every follower's timeline."""
+    followers = list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+    if is_celebrity(author_id):
+        FeedEntry.objects.filter(author_id=author_id).delete()
+    else:
+        posts = Post.objects.filter(author_id=author_id).only(
+            'id', 'author_id', 'pub_date'
+        )[:BACKFILL_SIZE]
+        bulk_create(FeedEntry, _entries(followers, posts),
+                    ignore_conflicts=True)
+    cache.bump(*[('feed', user_id) for user_id in followers])
+
+
+def rebuild(user):
+    """Recreate the timeline of one user from the subscriptions."""
+    FeedEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill(user, follow.author)
+
+
+def rebuild_all():
+    """Recreate every timeline in the database with one statement.
+
+    Like ``backfill``, every subscription brings the ``BACKFILL_SIZE``
+    latest posts of its author. Counters must be current, they decide
+    who is a celebrity.
+    """
+    tables = {model.__name__: model._meta.db_table
+              for model in (FeedEntry, Follow, Post, UserStats)}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tables["FeedEntry"]}')
+        cursor.execute(
+            f'INSERT INTO {tables["FeedEntry"]} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {tables["Follow"]} f '
+            'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER '
+            '(PARTITION BY author_id ORDER BY pub_date DESC) AS position '
+            f'FROM {tables["Post"]}) p ON p.author_id = f.author_id '
+            f'LEFT JOIN {tables["UserStats"]} s ON s.user_id = f.author_id '
+            'WHERE p.position <= %s AND COALESCE(s.followers_count, 0) < %s '
+            # rows in index order keep the inserts local to a few pages
+            'ORDER BY f.user_id, p.pub_date',
+            [BACKFILL_SIZE, CELEBRITY_FOLLOWERS]
+        )
+        return cursor.rowcount
+
+
+def feed_posts(user):
+    """Posts of the subscriptions, newest first.
+
+    Materialized entries are read with one range scan over
+    ``(user, -pub_date)``; celebrity authors are merged in at request time.
+    Posts are annotated with ``feed_date`` to paginate on.
+    """
+    celebrities = celebrity_ids(user)
+    if not celebrities:
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F('feed_entries__pub_date')
+        ).order_by('-feed_date', '-id')
+    materialized = FeedEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(id__in=materialized) | Q(author_id__in=celebrities)
+    ).annotate(feed_date=F('pub_date')).order_by('-feed_date', '-id')
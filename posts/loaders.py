@@ -0,0 +1,20 @@
+from .models import Post
+
+
+def load_posts(queryset=None):
+    """Posts with everything a card needs fetched up front.
+
+    Authors and groups are joined in, the comment counter is a column of
+    the post and the image variants come in one extra query, so rendering
+    a page costs the same whatever its size.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group').prefetch_related(
+        'variants'
+    )
+
+
+def load_comments(queryset):
+    """Comments of a post with their authors joined in."""
+    return queryset.select_related('author')
@@ -0,0 +1,67 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import thumbnails
+from posts.models import PostImageVariant
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def render(path):
+    """Bytes per format of the variants of one image, nothing is saved."""
+    sizes = Counter()
+    with open(path, 'rb') as source:
+        for _, _, image_format, data in thumbnails.render_variants(source):
+            sizes[image_format] += len(data)
+    return sizes
+
+
+class Command(BaseCommand):
+    help = ('Render image variants of every picture in a directory and '
+            'report throughput and bytes per format.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes rendering images, 1 to run '
+                                 'in the current process.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'{directory} is not a directory')
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(EXTENSIONS)
+        )
+        if not paths:
+            raise CommandError(f'No images found in {directory}')
+        start = time.monotonic()
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(render, paths))
+        else:
+            results = [render(path) for path in paths]
+        elapsed = time.monotonic() - start
+        total = sum(results, Counter())
+        source = sum(os.path.getsize(path) for path in paths)
+        self.stdout.write(
+            f'{len(paths)} images in {elapsed:.2f}s '
+            f'({len(paths) / elapsed:.1f} images/s, '
+            f'{len(thumbnails.WIDTHS)} widths each)'
+        )
+        self.stdout.write(f'source: {source / 1024:.0f} KiB')
+        for image_format in thumbnails.FORMATS:
+            self.stdout.write(
+                f'{image_format}: {total[image_format] / 1024:.0f} KiB'
+            )
+        jpeg = total[PostImageVariant.JPEG]
+        if jpeg:
+            saved = 1 - total[PostImageVariant.WEBP] / jpeg
+            self.stdout.write(self.style.SUCCESS(
+                f'WebP is {saved:.0%} smaller than JPEG.'
+            ))
@@ -0,0 +1,68 @@
+import statistics
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+
+
+def timed(func, repeat):
+    """Median latency of the call in milliseconds and its last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+class Command(BaseCommand):
+    help = ('Compare query latency of the search index against the '
+            "admin's LIKE search.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('words', nargs='*',
+                            help='Queries to run, the most common words '
+                                 'of the posts by default.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--sample', type=int, default=10,
+                            help='Common words picked without queries.')
+
+    def common_words(self, sample):
+        words = Counter()
+        for text in Post.objects.values_list('text', flat=True)[:2000]:
+            words.update(
+                word for word in search.WORD.findall(text.lower())
+                if len(word) > 3 and word not in search.STOP_WORDS
+            )
+        return [word for word, _ in words.most_common(sample)]
+
+    def handle(self, *args, **options):
+        words = options['words'] or self.common_words(options['sample'])
+        repeat = options['repeat']
+        backend = 'fts5' if search.use_fts() else 'terms'
+        self.stdout.write(
+            f'{"query":<20} {"like ms":>9} {backend + " ms":>9} '
+            f'{"like":>7} {"index":>7}'
+        )
+        like_total = index_total = 0
+        for word in words:
+            like_ms, like_ids = timed(
+                lambda: list(Post.objects.filter(text__icontains=word)
+                             .values_list('pk', flat=True)), repeat
+            )
+            index_ms, index_ids = timed(
+                lambda: search.search_ids(word), repeat
+            )
+            like_total += like_ms
+            index_total += index_ms
+            self.stdout.write(
+                f'{word:<20} {like_ms:>9.2f} {index_ms:>9.2f} '
+                f'{len(like_ids):>7} {len(index_ids):>7}'
+            )
+        if index_total:
+            self.stdout.write(self.style.SUCCESS(
+                f'Index is {like_total / index_total:.1f}x faster than LIKE.'
+            ))
@@ -0,0 +1,74 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from posts import streaming
+from posts.cache import versions
+from posts.loaders import load_posts
+from posts.models import Post
+
+MODES = {'render': False, 'stream': True}
+
+
+class Command(BaseCommand):
+    help = ('Compare the time to first byte, the total time and the peak '
+            'memory of the home page rendered whole and streamed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 100, 500], help='Posts per page.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Measured requests, the best one counts.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the fragment and card caches between '
+                                 'requests instead of clearing them.')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        if Post.objects.count() < max(sizes):
+            raise CommandError('Not enough posts, seed the database first.')
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.stdout.write(f'{"mode":<7} {"posts":>5} {"ttfb ms":>8} '
+                          f'{"total ms":>9} {"peak KiB":>9} {"chunks":>6}')
+        for size in sizes:
+            for mode, stream in MODES.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    if not options['warm']:
+                        cache.clear()
+                    timings.append(self.timed(request, size, stream))
+                ttfb, total, count = min(timings)
+                if not options['warm']:
+                    cache.clear()
+                tracemalloc.start()
+                try:
+                    self.timed(request, size, stream)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                self.stdout.write(
+                    f'{mode:<7} {size:>5} {ttfb * 1000:>8.2f} '
+                    f'{total * 1000:>9.2f} {peak / 1024:>9.0f} {count:>6}'
+                )
+
+    def timed(self, request, size, stream):
+        """Seconds to the first and to the last chunk, and the chunks."""
+        start = time.perf_counter()
+        paginator, page = streaming.paginate(request, load_posts(),
+                                             per_page=size, stream=stream)
+        response = streaming.render_listing(
+            request, 'index.html',
+            {'page': page, 'paginator': paginator,
+             'cache_version': versions(('all',))},
+            stream=stream,
+        )
+        chunks = iter(response)
+        next(chunks)
+        first = time.perf_counter() - start
+        count = 1 + sum(1 for _ in chunks)
+        return first, time.perf_counter() - start, count
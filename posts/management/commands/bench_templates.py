@@ -0,0 +1,97 @@
+import gc
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context
+from django.template.backends.django import DjangoTemplates
+
+from posts.loaders import load_posts
+from yatube import metrics
+
+ROUNDS = 5
+# ways of rendering the cards of a page
+RENDERERS = {
+    'include': ('{% for post in posts %}'
+                '{% include "includes/post_item.html" with post=post %}'
+                '{% endfor %}'),
+    'post_cards': '{% load post_cards %}{% post_cards posts %}',
+}
+
+
+def engine(profile):
+    """A template engine of the project with the loaders of the profile."""
+    return DjangoTemplates({
+        'NAME': f'bench-{profile}',
+        'DIRS': settings.TEMPLATES[0]['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': dict(settings.TEMPLATE_PROFILES[profile]),
+    }).engine
+
+
+class Command(BaseCommand):
+    help = ('Measure how long a page of post cards takes to render with '
+            'each template profile and way of rendering the cards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 50, 100], help='Posts per page.')
+        parser.add_argument('--profiles', nargs='+',
+                            choices=settings.TEMPLATE_PROFILES,
+                            default=list(settings.TEMPLATE_PROFILES))
+        parser.add_argument('--renderers', nargs='+', choices=RENDERERS,
+                            default=list(RENDERERS))
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Renders per measured round.')
+        parser.add_argument('--breakdown', action='store_true',
+                            help='Print the time spent in each template '
+                                 'of the largest page.')
+
+    def handle(self, *args, **options):
+        posts = list(load_posts()[:max(options['sizes'])])
+        if len(posts) < max(options['sizes']):
+            raise CommandError(f'Only {len(posts)} posts, seed the '
+                               f'database first.')
+        self.stdout.write(f'{"profile":<8} {"renderer":<11} {"posts":>5} '
+                          f'{"ms/page":>8} {"us/card":>8}')
+        for profile in options['profiles']:
+            for renderer in options['renderers']:
+                page = engine(profile).from_string(RENDERERS[renderer])
+                for size in options['sizes']:
+                    seconds = self.measure(page, posts[:size],
+                                           options['repeat'])
+                    self.stdout.write(
+                        f'{profile:<8} {renderer:<11} {size:>5} '
+                        f'{seconds * 1000:>8.2f} '
+                        f'{seconds / size * 1e6:>8.1f}'
+                    )
+                if options['breakdown']:
+                    self.breakdown(page, posts)
+
+    def measure(self, page, posts, repeat):
+        context = {'posts': posts, 'user': AnonymousUser()}
+        # the first render warms up the loaders
+        page.render(Context(context))
+        # like timeit: the best of a few rounds, without garbage collection
+        gc.collect()
+        gc.disable()
+        try:
+            rounds = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    page.render(Context(context))
+                rounds.append((time.perf_counter() - start) / repeat)
+            return min(rounds)
+        finally:
+            gc.enable()
+
+    def breakdown(self, page, posts):
+        with metrics.template_profile() as templates:
+            page.render(Context({'posts': posts, 'user': AnonymousUser()}))
+        for name, (renders, seconds, own) in sorted(
+                templates.items(), key=lambda item: -item[1][2]):
+            self.stdout.write(f'    {name:<40} x{renders:<4} '
+                              f'{seconds * 1000:>8.2f} ms, own '
+                              f'{own * 1000:.2f} ms')
@@ -0,0 +1,71 @@
+import timeit
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.urls import reverse
+
+from posts import routes
+
+ROUNDS = 5
+# the links of a card, with the resolver and with the compiled routes
+CARD_LINKS = {
+    'url': ("{% url 'profile' post.author.username %}"
+            "{% url 'group' post.group.slug %}"
+            "{% url 'post' post.author.username post.id %}"
+            "{% url 'post_edit' post.author.username post.id %}"),
+    'routes': ('{% load routes %}{{ post.author.username|profile_url }}'
+               '{{ post.group.slug|group_url }}{{ post|post_url }}'
+               '{{ post|post_edit_url }}'),
+}
+
+
+def best(func, number):
+    """Microseconds per call, the best of a few rounds like timeit."""
+    rounds = timeit.repeat(func, number=number, repeat=ROUNDS)
+    return min(rounds) / number * 1e6
+
+
+class Command(BaseCommand):
+    help = ('Measure how fast the URLs of posts, profiles and groups are '
+            'built by reverse() and by posts.routes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='leo_tolstoy',
+                            help='Author of the reversed URLs.')
+        parser.add_argument('--number', type=int, default=20000,
+                            help='Calls per measured round.')
+
+    def handle(self, *args, **options):
+        username, number = options['username'], options['number']
+        arguments = {
+            'post': (username, 1234),
+            'profile': (username,),
+            'group': ('cats',),
+            'post_edit': (username, 1234),
+            'add_comment': (username, 1234),
+        }
+        self.stdout.write(f'{"route":<12} {"reverse us":>10} '
+                          f'{"routes us":>10} {"calls/s":>10} {"x":>6}')
+        for name, values in arguments.items():
+            assert routes.url(name, *values) == reverse(name, args=values)
+            slow = best(lambda: reverse(name, args=values), number)
+            fast = best(lambda: routes.url(name, *values), number)
+            self.stdout.write(f'{name:<12} {slow:>10.2f} {fast:>10.2f} '
+                              f'{1e6 / fast:>10.0f} {slow / fast:>6.1f}')
+        post = SimpleNamespace(
+            id=1234, pk=1234, author=SimpleNamespace(username=username),
+            group=SimpleNamespace(slug='cats'),
+        )
+        context = {'post': post}
+        timings = {}
+        for renderer, source in CARD_LINKS.items():
+            template = engines['django'].from_string(source)
+            timings[renderer] = best(
+                lambda: template.render(context), number // 10
+            )
+        self.stdout.write(
+            f'card links: {{% url %}} {timings["url"]:.2f} us, filters '
+            f'{timings["routes"]:.2f} us, '
+            f'{timings["url"] / timings["routes"]:.1f}x'
+        )
@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import benchmark, synthetic
+
+User = get_user_model()
+DRIVERS = {
+    'client': benchmark.ClientDriver,
+    'server': benchmark.ServerDriver,
+}
+COLUMNS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'throughput_rps',
+           'errors')
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the public views on synthetic data through the test '
+            'client and a WSGI server, optionally saving the results as '
+            'JSON.')
+
+    def add_arguments(self, parser):
+        sizes = parser.add_argument_group('synthetic data')
+        sizes.add_argument('--users', type=int, default=200)
+        sizes.add_argument('--groups', type=int, default=20)
+        sizes.add_argument('--posts', type=int, default=5000)
+        sizes.add_argument('--comments', type=int, default=10000)
+        sizes.add_argument('--follows', type=int, default=2000)
+        sizes.add_argument('--images', type=int, default=0)
+        sizes.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--current-db', action='store_true',
+                            help='Benchmark the configured database as is '
+                                 'instead of a throwaway one.')
+        parser.add_argument('--mode', choices=[*DRIVERS, 'both'],
+                            default='both')
+        parser.add_argument('--scenarios', nargs='+',
+                            choices=benchmark.SCENARIOS,
+                            default=benchmark.SCENARIOS)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument('--baseline',
+                            help='Compare with the JSON of an earlier run.')
+
+    def handle(self, *args, **options):
+        media = tempfile.mkdtemp()
+        old_name = None
+        try:
+            with override_settings(DEBUG=False, MEDIA_ROOT=media):
+                if not options['current_db']:
+                    old_name = self.create_database(media)
+                    synthetic.generate(
+                        users=options['users'], groups=options['groups'],
+                        posts=options['posts'],
+                        comments=options['comments'],
+                        follows=options['follows'],
+                        images=options['images'], seed=options['seed'],
+                    )
+                report = self.benchmark(options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media, ignore_errors=True)
+        self.print_report(report)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                self.compare(json.load(baseline), report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Saved to {options["output"]}')
+
+    def create_database(self, directory):
+        if connection.vendor == 'sqlite':
+            # a file shared by the server threads, not an in-memory database
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                directory, 'benchmark.sqlite3'
+            )
+        return connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+
+    def benchmark(self, options):
+        user = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').first()
+        data = benchmark.sample_data()
+        modes = list(DRIVERS) if options['mode'] == 'both' else [
+            options['mode']
+        ]
+        results = {}
+        for mode in modes:
+            cache.clear()
+            driver = DRIVERS[mode](user)
+            try:
+                results[mode] = benchmark.run(
+                    driver, data, options['scenarios'],
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    warmup=options['warmup'], seed=options['seed'],
+                )
+            finally:
+                driver.close()
+        return {
+            'meta': {
+                'commit': self.commit(),
+                'date': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'options': {
+                    key: options[key] for key in (
+                        'users', 'groups', 'posts', 'comments', 'follows',
+                        'images', 'seed', 'current_db', 'requests',
+                        'warmup', 'concurrency',
+                    )
+                },
+            },
+            'results': results,
+        }
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report):
+        header = ''.join(f'{column:>16}' for column in COLUMNS)
+        for mode, scenarios in report['results'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(mode))
+            self.stdout.write(f'{"view":<14}{header}')
+            for name, result in scenarios.items():
+                row = ''.join(
+                    f'{str(result[column]):>16}' for column in COLUMNS
+                )
+                self.stdout.write(f'{name:<14}{row}')
+
+    def compare(self, baseline, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'p95 against {baseline["meta"].get("commit")}'
+        ))
+        for mode, scenarios in report['results'].items():
+            for name, result in scenarios.items():
+                before = baseline['results'].get(mode, {}).get(name)
+                if not before or not before['p95_ms']:
+                    continue
+                change = result['p95_ms'] / before['p95_ms'] - 1
+                style = (self.style.ERROR if change > 0.1
+                         else self.style.SUCCESS)
+                self.stdout.write(style(
+                    f'{mode:<8}{name:<14}{before["p95_ms"]:>10} -> '
+                    f'{result["p95_ms"]:>10} ({change:+.0%})'
+                ))
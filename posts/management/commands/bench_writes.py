@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import (OperationalError, close_old_connections, connection,
+                       connections, transaction)
+from django.test.utils import override_settings
+
+from posts import synthetic
+from posts.benchmark import percentile
+from posts.models import Comment, Post
+from yatube.db.pool import pool_for
+from yatube.db.sqlite3.base import PRAGMAS
+
+# database settings compared by the benchmark, on top of the configured ones
+PROFILES = {
+    # Django defaults: rollback journal, 5 s busy timeout, no reuse
+    'stock': {'PRAGMAS': {}, 'OPTIONS': {'timeout': 5}, 'CONN_MAX_AGE': 0,
+              'POOL_SIZE': 0},
+    'tuned': {'PRAGMAS': PRAGMAS, 'OPTIONS': {'timeout': 20},
+              'CONN_MAX_AGE': 60, 'POOL_SIZE': 8},
+}
+# share of the writes creating posts, the others add comments
+NEW_POSTS = 0.2
+
+
+def write(rng, users, posts):
+    with transaction.atomic():
+        if rng.random() < NEW_POSTS:
+            Post.objects.create(text='Пост из бенчмарка',
+                                author_id=rng.choice(users))
+        else:
+            Comment.objects.create(text='Комментарий из бенчмарка',
+                                   post_id=rng.choice(posts),
+                                   author_id=rng.choice(users))
+
+
+def _worker(args):
+    """Run the writes like requests do, return latencies and errors."""
+    seed, writes, users, posts = args
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    for _ in range(writes):
+        start = time.perf_counter()
+        # what request_started and request_finished do
+        close_old_connections()
+        try:
+            write(rng, users, posts)
+        except OperationalError:
+            errors += 1
+        finally:
+            close_old_connections()
+        latencies.append(time.perf_counter() - start)
+    connections.close_all()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = ('Measure concurrent write throughput of new posts and '
+            'comments under the stock and the tuned database profiles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES,
+                            default=list(PROFILES))
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Writing processes.')
+        parser.add_argument('--writes', type=int, default=200,
+                            help='Writes per process.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        self.stdout.write(
+            f'{"profile":<8} {"writes/s":>9} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"p99 ms":>8} {"errors":>7}'
+        )
+        try:
+            with override_settings(MEDIA_ROOT=directory):
+                for name in options['profiles']:
+                    self.report(name, self.measure(name, directory, options))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def measure(self, name, directory, options):
+        settings_dict = connection.settings_dict
+        saved = dict(settings_dict)
+        connection.close()
+        settings_dict.update(PROFILES[name])
+        if connection.vendor == 'sqlite':
+            settings_dict['TEST'] = {
+                **settings_dict['TEST'],
+                'NAME': os.path.join(directory, f'{name}.sqlite3'),
+            }
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            data = synthetic.generate(users=50, groups=5, posts=500,
+                                      comments=500, follows=200,
+                                      seed=options['seed'])
+            tasks = [
+                (f'{options["seed"]}:{worker}', options['writes'],
+                 data['users'], data['posts'])
+                for worker in range(options['workers'])
+            ]
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            start = time.perf_counter()
+            with context.Pool(options['workers']) as pool:
+                results = pool.map(_worker, tasks)
+            elapsed = time.perf_counter() - start
+        finally:
+            idle = pool_for(settings_dict)
+            if idle is not None:
+                idle.clear()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.close()
+            settings_dict.clear()
+            settings_dict.update(saved)
+        latencies = sorted(seconds * 1000 for part, _ in results
+                           for seconds in part)
+        errors = sum(errors for _, errors in results)
+        return {
+            'writes_per_second': (len(latencies) - errors) / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'errors': errors,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<8} {result["writes_per_second"]:>9.1f} '
+            f'{result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} '
+            f'{result["p99_ms"]:>8.1f} {result["errors"]:>7}'
+        )
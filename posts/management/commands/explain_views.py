@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+VIEWS = ('index', 'group', 'profile', 'post', 'follow_index', 'groups',
+         'search')
+# fragments would hide the queries of the cached parts of the pages
+NO_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}}
+
+
+def problems(plan):
+    """Plan lines of SQLite showing a full table scan or a sort."""
+    return [
+        line for line in plan
+        if 'TEMP B-TREE' in line
+        or line.lstrip().startswith('SCAN') and ' USING ' not in line
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Print the query plans of the SQL run by every listing view, '
+            'flagging full table scans and sorts on SQLite.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', nargs='+', choices=VIEWS,
+                            default=VIEWS)
+        parser.add_argument('--page', type=int, default=1,
+                            help='Page of the listings to request.')
+        parser.add_argument('--query', default='кот',
+                            help='Query of the search view.')
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Exit with an error if a plan has a full '
+                                 'scan or a sort.')
+
+    def urls(self, views, query):
+        group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        post = Post.objects.select_related('author').order_by(
+            '-comment_count'
+        ).first()
+        author = User.objects.filter(
+            stats__isnull=False
+        ).order_by('-stats__posts_count').first()
+        urls = {
+            'index': reverse('index'),
+            'follow_index': reverse('follow_index'),
+            'groups': reverse('groups'),
+            'search': f'{reverse("search")}?q={query}',
+        }
+        if group is not None:
+            urls['group'] = reverse('group', kwargs={'slug': group.slug})
+        if author is not None:
+            urls['profile'] = reverse(
+                'profile', kwargs={'username': author.username}
+            )
+        if post is not None:
+            urls['post'] = reverse('post', kwargs={
+                'username': post.author.username, 'post_id': post.pk,
+            })
+        return [(view, urls[view]) for view in views if view in urls]
+
+    def capture(self, client, url):
+        """SELECT statements of the request, each one once."""
+        queries = {}
+
+        def execute(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.setdefault(sql, params)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(execute):
+            response = client.get(url)
+            if response.streaming:
+                # the cards of a streamed listing query as they are sent
+                b''.join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(f'{url} answered {response.status_code}')
+        return queries.items()
+
+    def explain(self, sql, params):
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+        if connection.vendor != 'sqlite':
+            return [str(row[0]) for row in rows]
+        # (id, parent, notused, detail): indent the steps under their parent
+        depth = {0: 0}
+        plan = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, 0) + 1
+            plan.append('  ' * (depth[node] - 1) + detail)
+        return plan
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').first()
+        if user is None:
+            raise CommandError('No users, seed the database first.')
+        page = f'page={options["page"]}'
+        flagged = 0
+        with override_settings(CACHES=NO_CACHE), transaction.atomic():
+            client = Client()
+            client.force_login(user)
+            for view, url in self.urls(options['views'], options['query']):
+                url += ('&' if '?' in url else '?') + page
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{view}: {url}'
+                ))
+                for sql, params in self.capture(client, url):
+                    plan = self.explain(sql, params)
+                    found = problems(plan)
+                    flagged += bool(found)
+                    self.stdout.write(f'  {sql}')
+                    for line in plan:
+                        style = self.style.WARNING if line in found else str
+                        self.stdout.write(style(f'    {line}'))
+                self.stdout.write('')
+            # the login session is not worth keeping
+            transaction.set_rollback(True)
+        if connection.vendor != 'sqlite':
+            return
+        summary = f'{flagged} queries scan a table or sort.'
+        if flagged and options['fail_on_scan']:
+            raise CommandError(summary)
+        self.stdout.write(
+            self.style.WARNING(summary) if flagged
+            else self.style.SUCCESS(summary)
+        )
@@ -0,0 +1,83 @@
+import sys
+import tarfile
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import archive
+from posts.models import Post
+
+PROGRESS_SECONDS = 0.5
+
+
+class Command(BaseCommand):
+    help = ('Stream groups, posts and their comments to an NDJSON archive, '
+            'gzip-compressed if its name ends in .gz.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archive to write, - for stdout.')
+        parser.add_argument('--author', help='Only posts of this username.')
+        parser.add_argument('--group', help='Only posts of this group slug.')
+        parser.add_argument('--images-tar',
+                            help='Bundle the images of the posts into this '
+                                 'tar file, compressed by its extension.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=archive.CHUNK_SIZE,
+                            help='Rows fetched per round trip.')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-' and options['verbosity']:
+            # progress would end up in the archive
+            options['verbosity'] = 0
+        posts = None
+        if options['author'] or options['group']:
+            posts = Post.objects.all()
+            if options['author']:
+                posts = posts.filter(author__username=options['author'])
+            if options['group']:
+                posts = posts.filter(group__slug=options['group'])
+        images = None
+        if options['images_tar']:
+            images = tarfile.open(options['images_tar'], 'w:' + {
+                'gz': 'gz', 'tgz': 'gz', 'bz2': 'bz2', 'xz': 'xz',
+            }.get(options['images_tar'].rsplit('.', 1)[-1], ''))
+        self.start = self.shown = time.monotonic()
+        progress = self.progress if options['verbosity'] else None
+        try:
+            with (nullcontext(sys.stdout) if options['path'] == '-' else
+                  archive.open_archive(options['path'], 'w')) as stream:
+                counts = archive.export(stream, posts, images,
+                                        options['chunk_size'], progress)
+        except OSError as error:
+            raise CommandError(error)
+        finally:
+            if images is not None:
+                images.close()
+        if not options['verbosity']:
+            return
+        elapsed = time.monotonic() - self.start
+        rows = counts['posts'] + counts['comments']
+        self.stdout.write('')
+        if counts['missing_images']:
+            self.stdout.write(self.style.WARNING(
+                f'{counts["missing_images"]} images are missing from the '
+                f'storage and were not bundled.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {counts["groups"]} groups, {counts["posts"]} posts, '
+            f'{counts["comments"]} comments and {counts["images"]} images '
+            f'in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s).'
+        ))
+
+    def progress(self, rows):
+        now = time.monotonic()
+        if now - self.shown < PROGRESS_SECONDS:
+            return
+        self.shown = now
+        elapsed = now - self.start
+        self.stdout.write(
+            f'\r{rows} rows, {rows / max(elapsed, 1e-9):.0f} rows/s',
+            ending=''
+        )
+        self.stdout.flush()
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Render missing card thumbnails of post images in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=thumbnails.WORKERS * 2,
+                            help='Threads rendering thumbnails, 1 to run '
+                                 'in the current thread.')
+        parser.add_argument('--all', action='store_true',
+                            help='Render thumbnails that already exist too.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(image_card='')
+        ids = list(posts.values_list('pk', flat=True))
+        start = time.monotonic()
+        done = failed = 0
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                urls = list(pool.map(thumbnails.run, ids))
+        else:
+            urls = [thumbnails.run(pk, release=False) for pk in ids]
+        for url in urls:
+            if url:
+                done += 1
+            else:
+                failed += 1
+        elapsed = time.monotonic() - start
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {done} thumbnails, {failed} failed '
+            f'in {elapsed:.1f}s ({rate:.1f}/s).'
+        ))
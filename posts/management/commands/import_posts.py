@@ -0,0 +1,89 @@
+import sys
+import tarfile
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import archive, synthetic
+
+PROGRESS_SECONDS = 0.5
+
+
+class Command(BaseCommand):
+    help = ('Import an NDJSON archive written by export_posts in batches, '
+            'resuming from its checkpoint if an earlier run stopped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archive to read, - for stdin.')
+        parser.add_argument('--images-tar',
+                            help='Save the images bundled in this tar file.')
+        parser.add_argument('--batch-size', type=int,
+                            default=archive.BATCH_SIZE,
+                            help='Lines written per transaction.')
+        parser.add_argument('--checkpoint',
+                            help='Checkpoint file, PATH.checkpoint by '
+                                 'default.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint of an earlier run.')
+        parser.add_argument('--no-feeds', action='store_true',
+                            help='Leave the timelines to rebuild_feeds.')
+        parser.add_argument('--no-search', action='store_true',
+                            help='Leave the index to rebuild_search_index.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = state = None
+        if path != '-':
+            checkpoint = archive.Checkpoint(
+                options['checkpoint'] or f'{path}.checkpoint'
+            )
+            state = None if options['restart'] else checkpoint.load()
+            if state:
+                self.stdout.write(
+                    f'Resuming after line {state["line"]}: '
+                    f'{state["posts"]} posts and {state["comments"]} '
+                    f'comments were imported.'
+                )
+        self.resumed = state['posts'] + state['comments'] if state else 0
+        self.start = self.shown = time.monotonic()
+        importer = archive.Importer(checkpoint, options['batch_size'],
+                                    self.progress)
+        try:
+            if options['images_tar']:
+                with tarfile.open(options['images_tar'], 'r:*') as tar:
+                    images = archive.extract_images(tar)
+            else:
+                images = 0
+            with (nullcontext(sys.stdin) if path == '-' else
+                  archive.open_archive(path, 'r')) as stream:
+                counts = importer.run(stream, resume=not options['restart'])
+        except (OSError, tarfile.TarError) as error:
+            raise CommandError(error)
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Malformed archive: {error!r}')
+        self.stdout.write('')
+        imported = time.monotonic() - self.start
+        timings = synthetic.finish(feeds=not options['no_feeds'],
+                                   search_index=not options['no_search'])
+        for step, seconds in timings.items():
+            self.stdout.write(f'{step} rebuilt in {seconds:.1f}s')
+        # rows of an earlier run do not count towards the rate
+        rows = counts['posts'] + counts['comments'] - self.resumed
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {counts["groups"]} groups, {counts["posts"]} posts, '
+            f'{counts["comments"]} comments and {images} images '
+            f'({rows / max(imported, 1e-9):.0f} rows/s while writing).'
+        ))
+
+    def progress(self, rows):
+        now = time.monotonic()
+        if now - self.shown < PROGRESS_SECONDS:
+            return
+        self.shown = now
+        rate = (rows - self.resumed) / (now - self.start)
+        self.stdout.write(
+            f'\r{rows} rows, {rate:.0f} rows/s',
+            ending=''
+        )
+        self.stdout.flush()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts and comments.'
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild()
+        backend = 'FTS5' if search.use_fts() else 'SearchTerm'
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} posts into {backend}.'
+        ))
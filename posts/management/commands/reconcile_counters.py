@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount denormalized user stats and post comment counters.'
+
+    def handle(self, *args, **options):
+        repaired = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} rows.'))
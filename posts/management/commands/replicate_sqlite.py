@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.db import replication, routers
+
+
+class Command(BaseCommand):
+    help = ('Keep the SQLite replicas in sync with the primary by copying '
+            'it over them, a stand-in for real replication.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Seconds between copies, keep it below '
+                                 'DATABASE_PIN_SECONDS.')
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        aliases = routers.replicas()
+        if not aliases:
+            raise CommandError('No replicas, set YATUBE_DB_REPLICAS.')
+        while True:
+            start = time.monotonic()
+            for alias in aliases:
+                try:
+                    replication.sync(alias)
+                except ValueError as error:
+                    raise CommandError(error)
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Copied to {", ".join(aliases)} in '
+                    f'{time.monotonic() - start:.2f}s'
+                )
+            if options['once']:
+                return
+            time.sleep(max(options['interval'] -
+                           (time.monotonic() - start), 0))
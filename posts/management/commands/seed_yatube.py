@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import synthetic
+
+
+class Command(BaseCommand):
+    help = ('Bulk-create synthetic users, groups, posts, comments and '
+            'subscriptions with power-law activity.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000,
+                            help='Approximate total, drawn per post.')
+        parser.add_argument('--follows', type=int, default=200000,
+                            help='Approximate total, drawn per user.')
+        parser.add_argument('--images', type=int, default=0,
+                            help='Posts getting a generated picture.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes writing chunks in parallel.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=synthetic.CHUNK_SIZE)
+        parser.add_argument('--no-feeds', action='store_true',
+                            help='Leave the timelines to rebuild_feeds.')
+        parser.add_argument('--no-search', action='store_true',
+                            help='Leave the index to rebuild_search_index.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 and (options['posts'] or options['follows']):
+            raise CommandError('Posts and follows need at least two users.')
+        plan = synthetic.Plan(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], seed=options['seed'],
+            chunk_size=options['chunk_size'],
+        )
+        self.start = time.monotonic()
+        self.rows = 0
+        synthetic.write(plan, options['workers'], self.progress)
+        self.stdout.write('')
+        written = time.monotonic() - self.start
+        images = synthetic.add_images(plan, options['images'])
+        timings = synthetic.finish(feeds=not options['no_feeds'],
+                                   search_index=not options['no_search'])
+        for step, seconds in timings.items():
+            self.stdout.write(f'{step} rebuilt in {seconds:.1f}s')
+        total = time.monotonic() - self.start
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {self.rows} rows and {images} images in {total:.1f}s '
+            f'({self.rows / written:.0f} rows/s while writing).'
+        ))
+
+    def progress(self, kind, rows):
+        self.rows += rows
+        elapsed = time.monotonic() - self.start
+        self.stdout.write(
+            f'\r{self.rows} rows, last chunk {kind}, '
+            f'{self.rows / elapsed:.0f} rows/s', ending=''
+        )
+        self.stdout.flush()
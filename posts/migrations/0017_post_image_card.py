@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_card',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Превью'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='import_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Ключ импорта'),
+        ),
+    ]
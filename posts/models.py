@@ -8,25 +8,58 @@ class Post(models.Model):
     text = models.TextField("Текст", help_text="Содержимое поста")
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True,
                                     db_index=True)
+    # the composite indexes of Meta lead with author and group
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name="posts"
+                               related_name="posts", db_index=False
                                )
     group = models.ForeignKey("Group", on_delete=models.SET_NULL,
                               related_name="posts", blank=True,
                               null=True, verbose_name="Группа",
-                              help_text="Куда разместить"
+                              help_text="Куда разместить", db_index=False
                               )
     image = models.ImageField(
         "Изображение", upload_to='posts/',
         blank=True, null=True
         )
+    image_card = models.CharField(
+        "Превью", max_length=255, blank=True, editable=False
+        )
+    comment_count = models.PositiveIntegerField(
+        "Комментариев", default=0, editable=False
+        )
+    # run and archive id of an imported post, a replayed batch finds it
+    import_key = models.CharField(
+        "Ключ импорта", max_length=64, unique=True, null=True,
+        blank=True, editable=False
+        )
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_date'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_date'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def _srcset(self, image_format):
+        return ', '.join(
+            f'{variant.file.url} {variant.width}w'
+            for variant in self.variants.all()
+            if variant.format == image_format
+        )
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset(PostImageVariant.JPEG)
+
+    @property
+    def webp_srcset(self):
+        return self._srcset(PostImageVariant.WEBP)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -42,7 +75,7 @@ class Group(models.Model):
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
-                             related_name="comments")
+                             related_name="comments", db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="comments")
     text = models.TextField(
@@ -53,21 +86,141 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created'),
+        ]
 
     def __str__(self):
         return f'{self.author.username}: {self.text}'
 
 
 class Follow(models.Model):
+    # (user, author) is indexed by the unique constraint
     user = models.ForeignKey(User, on_delete=models.CASCADE,
-                             related_name="follower")
+                             related_name="follower", db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name="following")
+                               related_name="following", db_index=False)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['user', 'author'], name='unique')
             ]
 
     def __str__(self):
         return f'{self.user.username} подписан на {self.author.username}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=['user', '-pub_date'], name='feed_user_date'),
+            models.Index(fields=['user', 'author'], name='feed_user_author'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_feed_entry')
+            ]
+
+    def __str__(self):
+        return f'{self.user.username}: {self.post_id}'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="stats")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписан", default=0)
+
+    def __str__(self):
+        return f'{self.user.username}: {self.posts_count}'
+
+
+class PostImageVariant(models.Model):
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+    FORMATS = [(JPEG, 'JPEG'), (WEBP, 'WebP')]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="variants")
+    width = models.PositiveIntegerField("Ширина")
+    height = models.PositiveIntegerField("Высота")
+    format = models.CharField("Формат", max_length=4, choices=FORMATS)
+    file = models.FileField("Файл", upload_to='posts/variants/')
+    size = models.PositiveIntegerField("Размер, байт")
+
+    class Meta:
+        ordering = ["width"]
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'width', 'format'],
+                                    name='unique_image_variant')
+            ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.width}w {self.format}'
+
+
+class SearchTerm(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="search_terms")
+    term = models.CharField("Основа слова", max_length=64)
+    weight = models.PositiveIntegerField("Вес")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_post'),
+            ]
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'term'],
+                                    name='unique_search_term')
+            ]
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
+
+
+class Upload(models.Model):
+    """An image sent in parts and attached to its post once processed."""
+    RECEIVING = 'receiving'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATES = (
+        (RECEIVING, 'Загружается'),
+        (PROCESSING, 'Обрабатывается'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE,
+                              related_name="uploads")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="uploads")
+    filename = models.CharField("Имя файла", max_length=255)
+    size = models.PositiveIntegerField("Размер, байт")
+    received = models.PositiveIntegerField("Получено, байт", default=0)
+    state = models.CharField("Состояние", max_length=10, choices=STATES,
+                             default=RECEIVING)
+    # read from the header of the first parts
+    format = models.CharField("Формат", max_length=4, blank=True)
+    width = models.PositiveIntegerField("Ширина", null=True, blank=True)
+    height = models.PositiveIntegerField("Высота", null=True, blank=True)
+    error = models.TextField("Ошибка", blank=True)
+    created = models.DateTimeField("Начата", auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.filename}: {self.received}/{self.size}'
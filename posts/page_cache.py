@@ -0,0 +1,56 @@
+"""Whole responses of the public pages cached for anonymous visitors.
+
+A page is stored under its full path and the ETag of its state, so any
+change that bumps the versions behind the ETag leaves the old response
+behind to expire. Signed-in users, other methods and responses that set
+cookies or carry a CSRF token are never served from or stored in it.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube import metrics
+from yatube.db import routers
+
+TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+
+
+def _key(request, state):
+    raw = f'{request.get_full_path()}:{state.etag}'
+    return f'page:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _cacheable(request, response):
+    return (response.status_code == 200 and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+            and not getattr(response, 'streaming', False))
+
+
+def cached_for_anonymous(state_func):
+    """Serve the view from the page cache to anonymous GETs."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            key = _key(request, state_func(request, **kwargs))
+            match = request.resolver_match
+            name = match.url_name if match else view.__name__
+            response = cache.get(key)
+            if response is not None:
+                metrics.PAGE_CACHE.inc(view=name, result='hit')
+                return response
+            metrics.PAGE_CACHE.inc(view=name, result='miss')
+            timeout = TIMEOUT
+            if routers.reads_replica():
+                # a lagging replica may render rows older than the ETag
+                timeout = min(timeout, routers.PIN_SECONDS)
+            response = view(request, *args, **kwargs)
+            if _cacheable(request, response):
+                cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
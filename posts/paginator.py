@@ -0,0 +1,197 @@
+import base64
+import binascii
+import datetime as dt
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+PER_PAGE = 10
+MAX_PAGES = getattr(settings, 'PAGINATOR_MAX_PAGES', 50)
+POST_KEYS = ('pub_date', 'id')
+COMMENT_KEYS = ('created', 'id')
+FEED_KEYS = ('feed_date', 'id')
+
+
+def encode_cursor(values, backwards=False):
+    """Pack key values of a boundary row into an opaque token."""
+    data = [backwards] + [
+        value.isoformat() if isinstance(value, dt.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_value(value, last):
+    # cursors hold the dates of the ordering followed by the unique id
+    if last:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return parsed
+    raise ValueError(f'Invalid cursor value: {value!r}')
+
+
+def decode_cursor(token):
+    """Unpack a token made by encode_cursor, raise ValueError if broken."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        backwards, *values = json.loads(raw)
+        if not isinstance(backwards, bool) or not values:
+            raise ValueError
+        values = [_decode_value(value, i == len(values) - 1)
+                  for i, value in enumerate(values)]
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError(f'Invalid cursor: {token!r}')
+    return backwards, values
+
+
+class CursorPage:
+    """A page of a keyset paginated listing."""
+    number = None
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginate a queryset by descending ``keys`` without COUNT or OFFSET.
+
+    The keys are dates ending with a unique integer id, so every page
+    costs one indexed range scan no matter how deep it is.
+    """
+
+    def __init__(self, object_list, per_page, keys=POST_KEYS):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.keys = keys
+
+    def cursor_for(self, obj, backwards=False):
+        """Cursor of a model instance or of a ``values()`` row."""
+        if isinstance(obj, dict):
+            values = [obj[key] for key in self.keys]
+        else:
+            values = [getattr(obj, key) for key in self.keys]
+        return encode_cursor(values, backwards)
+
+    def _after(self, values, backwards):
+        lookup = 'gt' if backwards else 'lt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            equal = {k: v for k, v in zip(self.keys[:i], values)}
+            condition |= Q(**equal, **{f'{key}__{lookup}': values[i]})
+        return condition
+
+    def page(self, cursor=None):
+        backwards, values = False, None
+        if cursor:
+            backwards, values = decode_cursor(cursor)
+            if len(values) != len(self.keys):
+                raise ValueError(f'Invalid cursor: {cursor!r}')
+        order = [key if backwards else f'-{key}' for key in self.keys]
+        queryset = self.object_list.order_by(*order)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        items = list(queryset[:self.per_page + 1])
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+        if not items:
+            return CursorPage(items, self)
+        if backwards:
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, values is not None
+        return CursorPage(
+            items, self,
+            self.cursor_for(items[-1]) if has_next else None,
+            self.cursor_for(items[0], True) if has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except ValueError:
+            return self.page()
+
+
+def page_number(request):
+    """``?page=`` of the request, 404 past ``PAGINATOR_MAX_PAGES``.
+
+    Deeper pages are reached by the cursor of the next link.
+    """
+    number = request.GET.get('page')
+    if number and number.isdigit() and int(number) > MAX_PAGES:
+        raise Http404(f'Pages past {MAX_PAGES} are browsed by cursor.')
+    return number
+
+
+def _first_page(queryset, per_page, keys):
+    """Page 1 read by keyset, so the listing is never counted."""
+    paginator = Paginator(queryset, per_page)
+    first = CursorPaginator(queryset, per_page, keys).page()
+    page = paginator._get_page(first.object_list, 1, paginator)
+    page.has_next = first.has_next
+    page.next_cursor = first.next_cursor
+    page.page_numbers = (1,)
+    return paginator, page
+
+
+def paginate(request, queryset, keys=POST_KEYS, per_page=PER_PAGE,
+             count=None):
+    """Return ``(paginator, page)`` for a listing view.
+
+    ``?cursor=`` switches to keyset pagination. Without ``?page=`` the
+    first page is read by keyset too, unless a known ``count`` makes the
+    page numbers free. ``?page=`` uses the page number mode for the first
+    ``PAGINATOR_MAX_PAGES`` pages and ``page.page_numbers`` are the
+    numbers to link to. The next link of every page is a cursor.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        paginator = CursorPaginator(queryset, per_page, keys)
+        return paginator, paginator.get_page(cursor)
+    number = page_number(request)
+    if not number and count is None:
+        return _first_page(queryset, per_page, keys)
+    paginator = Paginator(queryset, per_page)
+    if count is not None:
+        paginator.count = count
+    page = paginator.get_page(number)
+    page.page_numbers = range(1, min(paginator.num_pages, MAX_PAGES) + 1)
+    if page.has_next():
+        keyset = CursorPaginator(queryset, per_page, keys)
+        page.next_cursor = keyset.cursor_for(page[len(page) - 1])
+    return paginator, page
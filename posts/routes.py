@@ -0,0 +1,129 @@
+"""URLs of the post, profile and group pages without the resolver.
+
+Every card links to its post, its author, its group and its edit page,
+and ``reverse()`` walks the URL patterns, converts, regex-checks and
+quotes every candidate on each call. Here the hot routes are compiled
+once per URLconf into their literal parts and converters, and a URL is
+the concatenation of those with the converted arguments. Arguments a
+converter rejects go through ``reverse()``, which raises the usual
+``NoReverseMatch``, so the result is always that of ``reverse()``.
+"""
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_resolver, get_script_prefix, get_urlconf, reverse
+from django.utils.http import RFC3986_SUBDELIMS, escape_leading_slashes
+
+ROUTES = ('post', 'profile', 'group', 'post_edit', 'add_comment')
+# what reverse() leaves unquoted, the pchar of RFC 3986
+SAFE = RFC3986_SUBDELIMS + '/~:@'
+PARAMETER = re.compile(r'%\((\w+)\)s')
+# remembered arguments of each route parameter
+ENCODED_VALUES = 4096
+
+
+def _encoder(regex):
+    """Quoting of the values the converter accepts, None for the others.
+
+    The same usernames and slugs come up on every page, so the checked
+    and quoted values are remembered.
+    """
+    matches = re.compile(regex).fullmatch
+
+    @lru_cache(maxsize=ENCODED_VALUES)
+    def encode(text):
+        if matches(text) is None:
+            return None
+        return quote(text, safe=SAFE)
+    return encode
+
+
+class Route:
+    """A URL pattern as literal parts around converted arguments."""
+
+    __slots__ = ('literals', 'converters')
+
+    def __init__(self, format_string, params, converters):
+        literals = PARAMETER.split(format_string)[::2]
+        self.literals = [quote(literal.replace('%%', '%'), safe=SAFE)
+                         for literal in literals]
+        self.converters = [
+            (converters[param].to_url, _encoder(converters[param].regex))
+            for param in params
+        ]
+
+    def build(self, prefix, args):
+        """The URL, or None when reverse() has to decide."""
+        if len(args) != len(self.converters):
+            return None
+        parts = [prefix, self.literals[0]]
+        for (to_url, encode), literal, value in zip(
+                self.converters, self.literals[1:], args):
+            text = encode(to_url(value))
+            if text is None:
+                return None
+            parts.append(text)
+            parts.append(literal)
+        return escape_leading_slashes(''.join(parts))
+
+
+@lru_cache(maxsize=None)
+def _table(urlconf):
+    resolver = get_resolver(urlconf)
+    table = {}
+    for name in ROUTES:
+        possibilities = resolver.reverse_dict.getlist(name)
+        # routes with alternatives or defaults are left to reverse()
+        if len(possibilities) != 1:
+            continue
+        bits, _, defaults, converters = possibilities[0]
+        if len(bits) != 1 or defaults:
+            continue
+        format_string, params = bits[0]
+        if all(param in converters for param in params):
+            table[name] = Route(format_string, params, converters)
+    return table
+
+
+@lru_cache(maxsize=16)
+def _quoted(prefix):
+    return quote(prefix, safe=SAFE)
+
+
+@receiver(setting_changed)
+def _urlconf_changed(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _table.cache_clear()
+
+
+def url(name, *args):
+    """``reverse(name, args=args)``, compiled for the routes of ROUTES."""
+    route = _table(get_urlconf()).get(name)
+    if route is not None:
+        built = route.build(_quoted(get_script_prefix()), args)
+        if built is not None:
+            return built
+    return reverse(name, args=args)
+
+
+def post_url(post):
+    return url('post', post.author.username, post.pk)
+
+
+def post_edit_url(post):
+    return url('post_edit', post.author.username, post.pk)
+
+
+def comment_url(post):
+    return url('add_comment', post.author.username, post.pk)
+
+
+def profile_url(username):
+    return url('profile', username)
+
+
+def group_url(slug):
+    return url('group', slug)
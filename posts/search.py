@@ -0,0 +1,245 @@
+"""Full-text search over posts and their comments.
+
+Every post is one document made of the stems of its text and of its
+comments. On SQLite the documents live in an FTS5 table ranked by bm25,
+elsewhere (or when SQLite is built without FTS5) in the ``SearchTerm``
+inverted index. Signals keep both up to date.
+"""
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from tasks.queue import task
+
+from .bulk import bulk_create
+from .models import Comment, Post, SearchTerm
+from .paginator import MAX_PAGES, PER_PAGE
+
+# 'auto' uses FTS5 when the table exists, 'fts5' or 'terms' force a backend
+BACKEND = getattr(settings, 'SEARCH_BACKEND', 'auto')
+FTS_TABLE = 'posts_search'
+# a word of the post text counts as much as this many words of comments
+TEXT_WEIGHT = 10
+RESULT_LIMIT = PER_PAGE * MAX_PAGES
+BATCH_SIZE = 500
+
+WORD = re.compile(r'\w+')
+STOP_WORDS = frozenset(
+    'а без бы был была были было в во вот вы да для до его ее ей ему если '
+    'есть еще же за и из или им их к как ко ли мне мы на над не нет ни но '
+    'о об он она они оно от по под при с со так то только ты у уже что '
+    'эта эти это я'.split()
+)
+
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+_fts_enabled = {}
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Stem of a lowercase Russian word (Porter's Russian stemmer)."""
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    ending = PERFECTIVE_GERUND.sub('', rv, 1)
+    if ending == rv:
+        rv = REFLEXIVE.sub('', rv, 1)
+        ending = ADJECTIVE.sub('', rv, 1)
+        if ending != rv:
+            rv = PARTICIPLE.sub('', ending, 1)
+        else:
+            ending = VERB.sub('', rv, 1)
+            rv = NOUN.sub('', rv, 1) if ending == rv else ending
+    else:
+        rv = ending
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = re.sub(r'ость?$', '', rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def tokenize(text):
+    """Stems of the words of the text, stop words dropped."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words
+            if len(word) > 1 and word not in STOP_WORDS]
+
+
+def use_fts():
+    """Whether the FTS5 table of the current database is used."""
+    if BACKEND != 'auto':
+        return BACKEND == 'fts5'
+    name = connection.settings_dict['NAME']
+    if name not in _fts_enabled:
+        _fts_enabled[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_enabled[name]
+
+
+def _documents(post_ids):
+    """``(post_id, text, comments)`` of every existing post of the ids."""
+    texts = dict(
+        Post.objects.filter(pk__in=post_ids).values_list('pk', 'text')
+    )
+    comments = defaultdict(list)
+    rows = Comment.objects.filter(post_id__in=texts).values_list(
+        'post_id', 'text'
+    )
+    for post_id, text in rows:
+        comments[post_id].append(text)
+    for pk, text in texts.items():
+        yield pk, text, comments[pk]
+
+
+def _remove(post_ids):
+    if use_fts():
+        placeholders = ','.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                post_ids
+            )
+    else:
+        SearchTerm.objects.filter(post_id__in=post_ids).delete()
+
+
+def _store(documents):
+    if use_fts():
+        rows = [
+            (pk, ' '.join(tokenize(text)),
+             ' '.join(tokenize(' '.join(comments))))
+            for pk, text, comments in documents
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, comments) '
+                'VALUES (%s, %s, %s)', rows
+            )
+        return
+    terms = []
+    for pk, text, comments in documents:
+        weights = Counter()
+        for term in tokenize(text):
+            weights[term] += TEXT_WEIGHT
+        for comment in comments:
+            weights.update(tokenize(comment))
+        terms += [
+            SearchTerm(post_id=pk, term=term, weight=weight)
+            for term, weight in weights.items()
+            if len(term) <= SearchTerm._meta.get_field('term').max_length
+        ]
+    bulk_create(SearchTerm, terms)
+
+
+@task(dedupe=True)
+def index_post(post_id):
+    """Replace the document of the post, drop it if the post is gone."""
+    with transaction.atomic():
+        _remove([post_id])
+        _store(list(_documents([post_id])))
+
+
+def remove_post(post_id):
+    _remove([post_id])
+
+
+def rebuild():
+    """Index every post from scratch, return the number of documents."""
+    with transaction.atomic():
+        return _rebuild()
+
+
+def _rebuild():
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        _store(list(_documents(ids[start:start + BATCH_SIZE])))
+    return len(ids)
+
+
+def _fts_match(terms):
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _ranked(terms):
+    return SearchTerm.objects.filter(term__in=terms).values(
+        'post_id'
+    ).annotate(
+        matched=Count('term'), rank=Sum('weight')
+    ).filter(matched=len(terms))
+
+
+def search_ids(query, limit=RESULT_LIMIT):
+    """Ids of the posts matching every word of the query, best first."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {TEXT_WEIGHT}, 1), rowid DESC '
+                'LIMIT %s', [_fts_match(terms), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+    ranked = _ranked(terms).order_by('-rank', '-post_id')
+    return list(ranked.values_list('post_id', flat=True)[:limit])
+
+
+def matching(posts, query):
+    """The posts of the queryset matching every word of the query.
+
+    Unlike ``search_ids`` the matches are neither ranked nor limited.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return posts.none()
+    if use_fts():
+        table = posts.model._meta.db_table
+        return posts.extra(
+            where=[f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+                   f'WHERE {FTS_TABLE} MATCH %s)'],
+            params=[_fts_match(terms)],
+        )
+    return posts.filter(
+        pk__in=_ranked(terms).values_list('post_id', flat=True)
+    )
@@ -0,0 +1,108 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from tasks import queue
+
+from . import cache, cards, counters, feed, search, uploads
+from .models import Comment, Follow, Group, Post, Upload
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # group_id may be deferred, reading it here would cost a query
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'posts_count', 1)
+        queue.enqueue(feed.deliver, instance.pk)
+    cache.bump_post(instance.pk, instance.author_id,
+                    instance.group_id, instance._loaded_group_id)
+    instance._loaded_group_id = instance.group_id
+    queue.enqueue(search.index_post, instance.pk)
+    queue.enqueue(cards.warm_post, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts_count', -1)
+    cache.bump_post(instance.pk, instance.author_id, instance.group_id)
+    search.remove_post(instance.pk)
+
+
+def comment_changed(comment, delta=0):
+    if delta:
+        counters.change_comments(comment.post_id, delta)
+    post = Post.objects.filter(pk=comment.post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        cache.bump(('all',), ('post', comment.post_id))
+    else:
+        cache.bump_post(comment.post_id, *post)
+        queue.enqueue(search.index_post, comment.post_id)
+        # the card shows the comment counter
+        queue.enqueue(cards.warm_post, comment.post_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    comment_changed(instance, 1 if created else 0)
+    queue.enqueue(cards.warm_comment, instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    comment_changed(instance, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'followers_count', 1)
+        counters.change(instance.user_id, 'following_count', 1)
+        feed.followers_changed(instance.author_id, 1)
+        queue.enqueue(feed.sync_subscription, instance.user_id,
+                      instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'followers_count', -1)
+    counters.change(instance.user_id, 'following_count', -1)
+    feed.followers_changed(instance.author_id, -1)
+    queue.enqueue(feed.sync_subscription, instance.user_id,
+                  instance.author_id)
+
+
+def _group_authors(group):
+    return list(Post.objects.filter(group=group).order_by().values_list(
+        'author_id', flat=True
+    ).distinct())
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # SET_NULL empties the group of the posts without a Post signal
+    instance._author_ids = _group_authors(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # the cards of the index, profiles and feeds show the group too
+    authors = getattr(instance, '_author_ids', None)
+    if authors is None:
+        authors = _group_authors(instance)
+    cache.bump(('groups',), ('group', instance.pk), ('all',),
+               *[('author', author_id) for author_id in authors])
+
+
+@receiver(post_delete, sender=Upload)
+def upload_deleted(sender, instance, **kwargs):
+    # parts of a finished or failed upload are already gone
+    if instance.state in (Upload.RECEIVING, Upload.PROCESSING):
+        uploads.delete_parts(instance)
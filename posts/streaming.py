@@ -0,0 +1,98 @@
+"""Listing pages sent while they render.
+
+With ``STREAM_LISTINGS`` on, the listing views answer with a
+``StreamingHttpResponse``: the head of the page, the navigation and the
+author or group card go out before the posts are even queried, then the
+cards follow a few at a time. The page is rendered as usual except that
+``{% streamed %}`` blocks and ``{% post_cards %}`` leave a marker behind;
+the response renders what the marker stands for when it gets to it.
+
+The page of posts is paginated lazily, on the first use inside a
+streamed block. A streamed listing skips the fragment cache of the whole
+page and is built from the card cache instead, and the page cache of
+anonymous visitors keeps only rendered responses, so it stays empty.
+"""
+import re
+import secrets
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template import loader
+from django.utils.functional import SimpleLazyObject
+from django.utils.safestring import mark_safe
+
+from . import paginator as paginators
+
+ENABLED = getattr(settings, 'STREAM_LISTINGS', False)
+CARDS_PER_CHUNK = getattr(settings, 'STREAM_CARDS_PER_CHUNK', 5)
+# context variable holding the Stream of the response being rendered
+STREAM = 'listing_stream'
+
+
+class Stream:
+    """Parts of a page left for later and the markers standing for them."""
+
+    def __init__(self):
+        # the token keeps post texts from passing for a marker
+        self.token = secrets.token_hex(8)
+        self.marker = re.compile(rf'<!--stream:{self.token}:(\d+)-->')
+        self.parts = []
+
+    def defer(self, render):
+        """Marker of ``render``, a callable returning chunks of HTML."""
+        self.parts.append(render)
+        number = len(self.parts) - 1
+        return mark_safe(f'<!--stream:{self.token}:{number}-->')
+
+    def expand(self, html):
+        """Chunks of the page, rendering each deferred part in its turn."""
+        position = 0
+        for match in self.marker.finditer(html):
+            if match.start() > position:
+                yield html[position:match.start()]
+            for chunk in self.parts[int(match[1])]():
+                yield from self.expand(chunk)
+            position = match.end()
+        if position < len(html):
+            yield html[position:]
+
+
+def chunks(items, size=None):
+    """Lists of ``size`` items, ``CARDS_PER_CHUNK`` by default."""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size or CARDS_PER_CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+
+def paginate(request, queryset, *args, stream=None, **kwargs):
+    """``paginator.paginate``, evaluated on first use when streaming."""
+    if not (ENABLED if stream is None else stream):
+        return paginators.paginate(request, queryset, *args, **kwargs)
+    # a wrong page number is answered before the page starts streaming
+    paginators.page_number(request)
+    paginated = lru_cache(maxsize=None)(
+        lambda: paginators.paginate(request, queryset, *args, **kwargs)
+    )
+    return (SimpleLazyObject(lambda: paginated()[0]),
+            SimpleLazyObject(lambda: paginated()[1]))
+
+
+def render_listing(request, template_name, context, stream=None):
+    """``render()``, or a response streaming the page when enabled.
+
+    The parts outside of the streamed blocks are rendered right away, so
+    the cookies and headers they set are in the response.
+    """
+    if not (ENABLED if stream is None else stream):
+        return render(request, template_name, context)
+    pending = Stream()
+    html = loader.get_template(template_name).render(
+        {**context, STREAM: pending}, request
+    )
+    return StreamingHttpResponse(pending.expand(html))
@@ -0,0 +1,305 @@
+"""Synthetic users, groups, posts, comments and subscriptions.
+
+Rows are written with ``bulk_create`` under primary keys reserved up
+front, so a run splits into independent chunks that worker processes
+can write in parallel, and a seed always produces the same rows however
+many workers write them. Activity follows power laws: a few authors
+write most posts, a few posts get most comments and a few authors have
+most followers. Signals do not run; the counters, timelines and search
+index are rebuilt once at the end.
+"""
+import io
+import multiprocessing
+import random
+import time
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from . import counters, feed, search, thumbnails
+from .bulk import bulk_create
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'утро город кот собака море солнце дождь книга кофе дорога друг '
+    'лес река горы поезд музыка фильм работа отпуск снег весна осень '
+    'лето зима праздник ужин завтрак прогулка велосипед фотография '
+    'вечер ночь парк мост окно сад цветы небо ветер песня'
+).split()
+CHUNK_SIZE = 20000
+PERIOD = timedelta(days=365)
+# exponent of the Zipf laws picking authors, groups and followed users
+ZIPF_EXPONENT = 1.1
+# shape of the Pareto laws of comments per post and follows per user
+PARETO_SHAPE = 1.5
+# share of posts published outside of any group
+NO_GROUP = 0.3
+
+
+@lru_cache(maxsize=8)
+def zipf(size, exponent=ZIPF_EXPONENT):
+    """Cumulative Zipf weights of ranks ``0 .. size - 1``."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, size + 1)))
+
+
+def pareto(rng, mean, limit):
+    """Heavy-tailed count with the given mean, at most ``limit``."""
+    if mean <= 0:
+        return 0
+    draw = (rng.paretovariate(PARETO_SHAPE) - 1) * (PARETO_SHAPE - 1)
+    return min(int(mean * draw + rng.random()), limit)
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(3, words)))
+
+
+def picture(rng):
+    """A small JPEG filled with random colour blocks."""
+    image = Image.new('RGB', (1200, 800), tuple(rng.choices(range(256), k=3)))
+    for _ in range(8):
+        x, y = rng.randrange(1100), rng.randrange(700)
+        size = rng.randint(50, 400), rng.randint(50, 300)
+        block = Image.new('RGB', size, tuple(rng.choices(range(256), k=3)))
+        image.paste(block, (x, y))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return ContentFile(buffer.getvalue())
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Plan:
+    """Sizes, seed and reserved primary keys of one run."""
+
+    def __init__(self, users=100, groups=10, posts=1000, comments=2000,
+                 follows=500, seed=0, chunk_size=CHUNK_SIZE):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.seed = seed
+        self.chunk_size = chunk_size
+        # a run-specific tag keeps usernames and slugs unique between runs
+        self.tag = uuid.uuid4().hex[:6]
+        self.now = timezone.now()
+        self.user_base = next_pk(User)
+        self.group_base = next_pk(Group)
+        self.post_base = next_pk(Post)
+
+    @property
+    def user_ids(self):
+        return range(self.user_base, self.user_base + self.users)
+
+    @property
+    def group_ids(self):
+        return range(self.group_base, self.group_base + self.groups)
+
+    @property
+    def post_ids(self):
+        return range(self.post_base, self.post_base + self.posts)
+
+    def _chunks(self, kind, total):
+        for start in range(0, total, self.chunk_size):
+            yield kind, start, min(start + self.chunk_size, total)
+
+    def phases(self):
+        """Chunks to write, phase after phase; a phase may run in parallel.
+
+        Posts and subscriptions only reference users and groups, so they
+        share the second phase.
+        """
+        return [
+            [*self._chunks('users', self.users),
+             *self._chunks('groups', self.groups)],
+            [*self._chunks('posts', self.posts),
+             *self._chunks('follows', self.users)],
+        ]
+
+    def rng(self, kind, start):
+        return random.Random(f'{self.seed}:{kind}:{start}')
+
+
+def _users(plan, rng, start, stop):
+    bulk_create(User, [
+        User(pk=plan.user_base + i, username=f'user{plan.tag}_{i}',
+             password='!')
+        for i in range(start, stop)
+    ])
+    return stop - start
+
+
+def _groups(plan, rng, start, stop):
+    bulk_create(Group, [
+        Group(pk=plan.group_base + i, title=f'Группа {plan.tag} {i}',
+              slug=f'g{plan.tag}-{i}', description=sentence(rng))
+        for i in range(start, stop)
+    ])
+    return stop - start
+
+
+def _posts(plan, rng, start, stop):
+    count = stop - start
+    authors = rng.choices(plan.user_ids, cum_weights=zipf(plan.users),
+                          k=count)
+    groups = [None] * count
+    if plan.groups:
+        groups = [
+            None if rng.random() < NO_GROUP else group
+            for group in rng.choices(plan.group_ids,
+                                     cum_weights=zipf(plan.groups), k=count)
+        ]
+    posts, comments = [], []
+    first = plan.now - PERIOD
+    for i, author, group in zip(range(start, stop), authors, groups):
+        pub_date = first + PERIOD * ((i + rng.random()) / plan.posts)
+        total = pareto(rng, plan.comments / plan.posts, plan.users)
+        post = Post(pk=plan.post_base + i, text=sentence(rng, 40),
+                    author_id=author, group_id=group, pub_date=pub_date,
+                    comment_count=total)
+        posts.append(post)
+        commenters = rng.choices(plan.user_ids,
+                                 cum_weights=zipf(plan.users), k=total)
+        comments += [
+            Comment(post_id=post.pk, author_id=commenter,
+                    text=sentence(rng),
+                    created=pub_date + (plan.now - pub_date) * rng.random())
+            for commenter in commenters
+        ]
+    # raw keeps the dates, auto_now_add would set them all to now
+    bulk_create(Post, posts, raw=True)
+    bulk_create(Comment, comments, raw=True)
+    return len(posts) + len(comments)
+
+
+def _follows(plan, rng, start, stop):
+    follows = []
+    for i in range(start, stop):
+        user = plan.user_base + i
+        total = pareto(rng, plan.follows / plan.users, plan.users - 1)
+        authors = set(rng.choices(plan.user_ids,
+                                  cum_weights=zipf(plan.users), k=total))
+        authors.discard(user)
+        follows += [Follow(user_id=user, author_id=author)
+                    for author in sorted(authors)]
+    bulk_create(Follow, follows, ignore_conflicts=True)
+    return len(follows)
+
+
+WRITERS = {
+    'users': _users,
+    'groups': _groups,
+    'posts': _posts,
+    'follows': _follows,
+}
+
+
+def write_chunk(plan, kind, start, stop):
+    """Write one chunk in its own transaction, return the rows written."""
+    with transaction.atomic():
+        return kind, WRITERS[kind](plan, plan.rng(kind, start), start, stop)
+
+
+def _init_worker():
+    if connection.vendor == 'sqlite':
+        # writers take turns on SQLite, wait for the lock instead of failing
+        connection.settings_dict['OPTIONS'] = {
+            **connection.settings_dict['OPTIONS'], 'timeout': 600,
+        }
+
+
+def _write_task(args):
+    try:
+        return write_chunk(*args)
+    finally:
+        connections.close_all()
+
+
+def write(plan, workers=1, progress=None):
+    """Write every chunk of the plan, in worker processes if ``workers > 1``.
+
+    ``progress(kind, rows)`` is called after each chunk.
+    """
+    for phase in plan.phases():
+        tasks = [(plan, *chunk) for chunk in phase]
+        if workers > 1:
+            # forked workers inherit the configured project, not the
+            # connections: each one opens its own
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(workers, _init_worker) as pool:
+                done = pool.imap_unordered(_write_task, tasks)
+                for kind, rows in done:
+                    if progress:
+                        progress(kind, rows)
+        else:
+            for task in tasks:
+                kind, rows = write_chunk(*task)
+                if progress:
+                    progress(kind, rows)
+    reset_sequences(User, Group, Post, Comment, Follow)
+
+
+def reset_sequences(*models):
+    """Move the id sequences past the primary keys written explicitly."""
+    sequences = connection.ops.sequence_reset_sql(no_style(), models)
+    if sequences:
+        with connection.cursor() as cursor:
+            for sql in sequences:
+                cursor.execute(sql)
+
+
+def add_images(plan, images):
+    """Attach generated pictures to random posts and render variants."""
+    rng = plan.rng('images', 0)
+    chosen = rng.sample(plan.post_ids, min(images, plan.posts))
+    for pk in chosen:
+        post = Post(pk=pk)
+        post.image.save(f'synthetic_{pk}.jpg', picture(rng), save=False)
+        Post.objects.filter(pk=pk).update(image=post.image.name)
+        thumbnails.run(pk, release=False)
+    return len(chosen)
+
+
+def finish(feeds=True, search_index=True):
+    """Rebuild what the signals maintain, return seconds per step."""
+    timings = {}
+    steps = [('counters', counters.reconcile)]
+    if feeds:
+        steps.append(('feeds', feed.rebuild_all))
+    if search_index:
+        steps.append(('search', search.rebuild))
+    for name, step in steps:
+        start = time.monotonic()
+        step()
+        timings[name] = time.monotonic() - start
+    return timings
+
+
+def generate(users=100, groups=10, posts=1000, comments=2000, follows=500,
+             images=0, seed=0):
+    """Create a small dataset in this process, return its primary keys."""
+    plan = Plan(users, groups, posts, comments, follows, seed)
+    write(plan)
+    add_images(plan, images)
+    finish()
+    return {
+        'users': list(plan.user_ids),
+        'groups': list(plan.group_ids),
+        'posts': list(plan.post_ids),
+    }
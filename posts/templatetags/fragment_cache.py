@@ -0,0 +1,59 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from posts import cards, streaming
+from posts.cache import get_or_render
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, version, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.version = version
+        self.vary_on = vary_on
+
+    def render(self, context):
+        if context.get(streaming.STREAM) is not None:
+            # a streamed page sends its cards as they come from the cache
+            return self.nodelist.render(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        html = get_or_render(
+            key, self.version.resolve(context), lambda: self._render(context)
+        )
+        if context.get(cards.DEFERRED):
+            return html
+        return cards.for_viewer(html, context.get('user'))
+
+    def _render(self, context):
+        # the fragment is shared: parts for the author stay in markers
+        with context.push({cards.DEFERRED: True}):
+            return self.nodelist.render(context)
+
+
+@register.tag
+def versioned_cache(parser, token):
+    """Cache a fragment until one of its version scopes is bumped.
+
+    Usage::
+
+        {% versioned_cache fragment_name cache_version [var1] .. %}
+        {% endversioned_cache %}
+
+    ``cache_version`` comes from ``posts.cache.versions`` in the view.
+    The fragment is shared by all viewers, wrap what only the author of
+    a post may see in ``{% author_only %}``.
+    """
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.'
+        )
+    return VersionedCacheNode(
+        nodelist, tokens[1], parser.compile_filter(tokens[2]),
+        [parser.compile_filter(t) for t in tokens[3:]],
+    )
@@ -0,0 +1,87 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards, streaming
+
+register = template.Library()
+
+
+def _shown(context, html):
+    # inside a cached fragment the markers stay for the fragment to resolve
+    if context.get(cards.DEFERRED):
+        return mark_safe(html)
+    return cards.for_viewer(mark_safe(html), context.get('user'))
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, template_name=cards.CARD_TEMPLATE):
+    """Render the card of every post of a page.
+
+    Usage::
+
+        {% post_cards page %}
+
+    The cards are rendered once for all viewers and kept in the cache
+    under a digest of the post, see ``posts.cards``; a page reads them
+    with a single ``get_many`` and renders only the missing ones.
+    A streamed page gets them ``STREAM_CARDS_PER_CHUNK`` at a time.
+    """
+    stream = context.get(streaming.STREAM)
+    if stream is not None and not context.get(cards.DEFERRED):
+        user = context.get('user')
+        return stream.defer(lambda: (
+            cards.for_viewer(mark_safe(''.join(cards.rendered(
+                template_name, chunk, cards.post_version, 'post'
+            ))), user)
+            for chunk in streaming.chunks(posts)
+        ))
+    html = cards.rendered(template_name, posts, cards.post_version, 'post')
+    return _shown(context, ''.join(html))
+
+
+@register.simple_tag(takes_context=True)
+def post_body(context, post):
+    """Render the post of the post page, ``{% post_body post %}``."""
+    return _shown(context, cards.body(post))
+
+
+@register.simple_tag(takes_context=True)
+def comment_items(context, comments):
+    """Render a page of comments, ``{% comment_items comments %}``."""
+    return _shown(context, ''.join(cards.comments(comments)))
+
+
+class AuthorOnlyNode(template.Node):
+    def __init__(self, nodelist, author_id):
+        self.nodelist = nodelist
+        self.author_id = author_id
+
+    def render(self, context):
+        author_id = self.author_id.resolve(context)
+        if context.get(cards.DEFERRED):
+            return cards.marked(author_id, self.nodelist.render(context))
+        user = context.get('user')
+        if user is not None and user.pk is not None and user.pk == author_id:
+            return self.nodelist.render(context)
+        return ''
+
+
+@register.tag
+def author_only(parser, token):
+    """Show a part of a fragment only to the author of the post.
+
+    Usage::
+
+        {% author_only post.author_id %}...{% endauthor_only %}
+
+    In fragments rendered for everyone the part is wrapped in markers
+    instead, ``posts.cards.for_viewer`` resolves them for each viewer.
+    """
+    nodelist = parser.parse(('endauthor_only',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) != 2:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires exactly 1 argument.'
+        )
+    return AuthorOnlyNode(nodelist, parser.compile_filter(tokens[1]))
@@ -0,0 +1,27 @@
+from django import template
+
+from posts import routes
+
+register = template.Library()
+
+register.filter('post_url', routes.post_url)
+register.filter('post_edit_url', routes.post_edit_url)
+register.filter('comment_url', routes.comment_url)
+register.filter('profile_url', routes.profile_url)
+register.filter('group_url', routes.group_url)
+
+
+@register.simple_tag
+def route(name, *args):
+    """``{% url %}`` for the routes of ``posts.routes.ROUTES``.
+
+    Usage::
+
+        {% route 'post' post.author.username post.id %}
+        {% route 'profile' username as profile_url %}
+
+    The filters ``post_url``, ``post_edit_url``, ``comment_url``,
+    ``profile_url`` and ``group_url`` build the same URLs from a post, a
+    username or a group slug.
+    """
+    return routes.url(name, *args)
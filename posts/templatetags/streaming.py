@@ -0,0 +1,41 @@
+from copy import copy
+
+from django import template
+
+from posts.streaming import STREAM
+
+register = template.Library()
+
+
+class StreamedNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        stream = context.get(STREAM)
+        if stream is None:
+            return self.nodelist.render(context)
+        # the template is done with the context by the time the part is
+        # rendered, the copy keeps its variables and template
+        context = copy(context)
+        return stream.defer(lambda: [self.nodelist.render(context)])
+
+
+@register.tag
+def streamed(parser, token):
+    """Render a part of a listing page once the rest is sent.
+
+    Usage::
+
+        {% streamed %}{% post_cards page %}...{% endstreamed %}
+
+    Outside of a streamed response the part is rendered in place. See
+    ``posts.streaming``.
+    """
+    nodelist = parser.parse(('endstreamed',))
+    parser.delete_first_token()
+    if len(token.split_contents()) != 1:
+        raise template.TemplateSyntaxError(
+            "'streamed' tag takes no arguments."
+        )
+    return StreamedNode(nodelist)
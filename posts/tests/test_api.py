@@ -0,0 +1,86 @@
+import json
+
+from django.urls import reverse
+
+from .settings import Settings
+from posts.models import Comment, Follow, Post
+
+
+class ApiTests(Settings):
+    def get(self, client, url, **params):
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_listing_pages_with_cursor(self):
+        """Посты отдаются страницами, курсор ведёт к следующей."""
+        for number in range(4):
+            Post.objects.create(text=f'Пост {number}', author=self.User2)
+        url = reverse('api_posts')
+        first = self.get(self.guest_client, url, limit=3)
+        self.assertEqual([post['text'] for post in first['results']],
+                         ['Пост 3', 'Пост 2', 'Пост 1'])
+        second = self.guest_client.get(first['next']).json()
+        self.assertEqual([post['id'] for post in second['results']],
+                         [Post.objects.get(text='Пост 0').pk, self.post.pk])
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+        self.assertEqual(second['results'][1]['author'], self.User.username)
+        self.assertEqual(second['results'][1]['group'], self.group.slug)
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только запрошенные поля."""
+        data = self.get(self.guest_client, reverse('api_posts'),
+                        fields='id,author')
+        self.assertEqual(data['results'][0],
+                         {'id': self.post.pk, 'author': self.User.username})
+        response = self.guest_client.get(reverse('api_posts'),
+                                          {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_comment_and_follow(self):
+        """Комментарии и подписки пишутся только авторизованными."""
+        url = reverse('api_comments', kwargs={'post_id': self.post.pk})
+        payload = json.dumps({'text': 'Из приложения'})
+        response = self.guest_client.post(url, payload,
+                                          content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        response = self.authorized_client_2.post(
+            url, payload, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], self.User2.username)
+        self.assertTrue(Comment.objects.filter(text='Из приложения').exists())
+        follow = reverse('api_follow', kwargs={'username': self.User.username})
+        self.assertEqual(self.authorized_client_2.post(follow).status_code,
+                         201)
+        feed = self.get(self.authorized_client_2, reverse('api_follow_index'))
+        self.assertEqual([post['id'] for post in feed['results']],
+                         [self.post.pk])
+        self.assertEqual(self.authorized_client_2.delete(follow).status_code,
+                         200)
+        self.assertFalse(Follow.objects.filter(user=self.User2).exists())
+
+    def test_profile_and_missing_objects(self):
+        """Профиль содержит счётчики, несуществующее — 404 в JSON."""
+        data = self.get(self.guest_client, reverse(
+            'api_profile', kwargs={'username': self.User.username}
+        ))
+        self.assertEqual(data['posts_count'], 1)
+        response = self.guest_client.get(
+            reverse('api_post', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    def test_export_streams_posts(self):
+        """Экспорт отдаёт все посты потоком одним JSON-массивом."""
+        for number in range(5):
+            Post.objects.create(text=f'Экспорт {number}', author=self.User2)
+        response = self.guest_client.get(reverse('api_export'),
+                                         {'author': self.User2.username,
+                                          'fields': 'text'})
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data, [{'text': f'Экспорт {number}'}
+                                for number in range(5)])
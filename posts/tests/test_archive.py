@@ -0,0 +1,164 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from .settings import Settings
+from posts import archive, counters, synthetic
+from posts.models import Comment, Group, Post
+
+
+def snapshot():
+    posts = Post.objects.order_by('pub_date', 'text').values_list(
+        'text', 'pub_date', 'author__username', 'group__slug', 'image',
+        'comment_count'
+    )
+    comments = Comment.objects.order_by('created', 'text').values_list(
+        'post__text', 'author__username', 'text', 'created'
+    )
+    return list(posts), list(comments)
+
+
+class InterruptedImporter(archive.Importer):
+    """Падает на второй пачке, как прерванный импорт."""
+
+    def apply(self, batch, state, line):
+        if state['line']:
+            raise RuntimeError('interrupted')
+        super().apply(batch, state, line)
+
+
+class LostCheckpoint(archive.Checkpoint):
+    """Не сохраняет точку после первой пачки, как сбой до её записи."""
+
+    saves = 0
+
+    def save(self, state):
+        self.saves += 1
+        if self.saves == 2:
+            raise RuntimeError('crashed')
+        super().save(state)
+
+
+class ArchiveTests(Settings):
+    def setUp(self):
+        synthetic.generate(users=6, groups=2, posts=40, comments=60,
+                           follows=5, seed=3)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, name='posts.ndjson.gz'):
+        path = os.path.join(self.directory, name)
+        with archive.open_archive(path, 'w') as stream:
+            archive.export(stream, chunk_size=7)
+        return path
+
+    def clear(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+
+    def test_round_trip(self):
+        """Импорт выгрузки восстанавливает посты, комментарии и группы."""
+        before = snapshot()
+        groups = set(Group.objects.values_list('slug', 'title'))
+        path = self.export()
+        self.clear()
+        with archive.open_archive(path, 'r') as stream:
+            counts = archive.Importer(batch_size=9).run(stream)
+        synthetic.finish()
+        self.assertEqual(counts['posts'], len(before[0]))
+        self.assertEqual(counts['comments'], len(before[1]))
+        self.assertEqual(snapshot(), before, 'Данные не совпадают')
+        self.assertEqual(set(Group.objects.values_list('slug', 'title')),
+                         groups, 'Группы не восстановлены')
+        self.assertEqual(counters.reconcile(), 0, 'Счётчики разошлись')
+        post = Post.objects.create(text='Новый', author=self.User)
+        self.assertGreater(post.pk, max(Post.objects.exclude(
+            pk=post.pk).values_list('pk', flat=True)))
+
+    def test_resume(self):
+        """Прерванный импорт продолжается с контрольной точки без дублей."""
+        before = snapshot()
+        path = self.export('posts.ndjson')
+        self.clear()
+        checkpoint = archive.Checkpoint(path + '.checkpoint')
+        with open(path, encoding='utf-8') as stream:
+            with self.assertRaises(RuntimeError):
+                InterruptedImporter(checkpoint, batch_size=10).run(stream)
+        state = checkpoint.load()
+        self.assertEqual(state['line'], 10, 'Контрольная точка не сохранена')
+        self.assertEqual(Post.objects.count(), state['posts'])
+        with open(path, encoding='utf-8') as stream:
+            archive.Importer(checkpoint, batch_size=10).run(stream)
+        self.assertEqual(snapshot(), before, 'Данные не совпадают')
+        self.assertIsNone(checkpoint.load(), 'Контрольная точка осталась')
+
+    def test_replayed_batch_not_duplicated(self):
+        """Пачка, записанная до сохранения точки, не повторяется."""
+        before = snapshot()
+        path = self.export('posts.ndjson')
+        self.clear()
+        checkpoint = LostCheckpoint(path + '.checkpoint')
+        with open(path, encoding='utf-8') as stream:
+            with self.assertRaises(RuntimeError):
+                archive.Importer(checkpoint, batch_size=10).run(stream)
+        self.assertGreater(Post.objects.count(), 0)
+        with open(path, encoding='utf-8') as stream:
+            archive.Importer(checkpoint, batch_size=10).run(stream)
+        self.assertEqual(snapshot(), before, 'Данные не совпадают')
+
+    def test_live_posts_during_import(self):
+        """Посты сайта во время импорта не занимают места архивных."""
+        comment = Comment.objects.first()
+        comment.text = 'Архивный комментарий'
+        comment.save()
+        archived = comment.post.text
+        total = Post.objects.count()
+        path = self.export('posts.ndjson')
+        importer = archive.Importer(batch_size=10)
+        state = importer.new_state()
+        # живой пост берёт id, свободный в начале импорта
+        Post.objects.create(text='Живой пост', author=self.User)
+        importer.new_state = lambda: state
+        with open(path, encoding='utf-8') as stream:
+            importer.run(stream)
+        self.assertEqual(Post.objects.count(), total * 2 + 1,
+                         'Архивные посты потеряны')
+        for imported in Comment.objects.filter(text='Архивный комментарий'):
+            self.assertEqual(imported.post.text, archived,
+                             'Комментарий привязан к чужому посту')
+
+    def test_images_tar(self):
+        """Картинки постов переносятся в tar-архиве."""
+        name = self.post.image.name
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            with archive.open_archive(
+                    os.path.join(self.directory, 'posts.ndjson'),
+                    'w') as stream:
+                counts = archive.export(stream, images=tar)
+        self.assertEqual(counts['images'], 1)
+        default_storage.delete(name)
+        buffer.seek(0)
+        with tarfile.open(fileobj=buffer) as tar:
+            self.assertEqual(archive.extract_images(tar), 1)
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), self.gif)
+
+    def test_commands(self):
+        """Команды выгрузки и загрузки сообщают о скорости."""
+        path = os.path.join(self.directory, 'posts.ndjson.gz')
+        total = Post.objects.count()
+        out = StringIO()
+        call_command('export_posts', path, author=self.User2.username,
+                     stdout=out)
+        self.assertIn('rows/s', out.getvalue())
+        call_command('export_posts', path, stdout=out)
+        call_command('import_posts', path, stdout=out)
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(Post.objects.count(), total * 2)
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Min
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from .settings import Settings
+from posts import benchmark, bulk, counters, synthetic
+from posts.models import Follow, Post
+
+
+class SyntheticDataTests(Settings):
+    def test_generate(self):
+        """Генератор создаёт данные с согласованными счётчиками и лентами."""
+        created = synthetic.generate(users=5, groups=2, posts=30,
+                                     comments=20, follows=6, seed=1)
+        self.assertEqual(len(created['posts']), 30)
+        self.assertEqual(counters.reconcile(), 0, 'Счётчики разошлись')
+        follow = Follow.objects.filter(user_id__in=created['users']).first()
+        self.assertEqual(
+            set(Post.objects.filter(
+                feed_entries__user=follow.user
+            ).values_list('pk', flat=True)),
+            set(Post.objects.filter(
+                author__following__user=follow.user
+            ).values_list('pk', flat=True)),
+            'Лента не заполнена'
+            )
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый seed даёт одинаковые посты и подписки."""
+        def snapshot(plan):
+            synthetic.write(plan)
+            posts = Post.objects.filter(pk__in=plan.post_ids).order_by('pk')
+            follows = Follow.objects.filter(user_id__in=plan.user_ids)
+            return (
+                [(text, author - plan.user_base, comments) for
+                 text, author, comments in posts.values_list(
+                     'text', 'author_id', 'comment_count')],
+                sorted((user - plan.user_base, author - plan.user_base)
+                       for user, author in follows.values_list(
+                           'user_id', 'author_id')),
+            )
+
+        first = snapshot(synthetic.Plan(users=20, groups=2, posts=40,
+                                        comments=80, follows=40, seed=3,
+                                        chunk_size=7))
+        second = snapshot(synthetic.Plan(users=20, groups=2, posts=40,
+                                         comments=80, follows=40, seed=3,
+                                         chunk_size=7))
+        self.assertEqual(first, second)
+        self.assertEqual(len(first[0]), 40)
+
+    def test_dates_kept_without_touching_fields(self):
+        """Сид сохраняет свои даты, не отключая auto_now_add у полей."""
+        field = Post._meta.get_field('pub_date')
+        seen = []
+
+        def spy(model, objs, **kwargs):
+            seen.append(field.auto_now_add)
+            return bulk.bulk_create(model, objs, **kwargs)
+
+        plan = synthetic.Plan(users=5, groups=1, posts=20, comments=10,
+                              follows=5, seed=2)
+        with mock.patch('posts.synthetic.bulk_create', spy):
+            synthetic.write(plan)
+        self.assertTrue(seen and all(seen), 'auto_now_add отключался')
+        oldest = Post.objects.filter(pk__in=plan.post_ids).aggregate(
+            oldest=Min('pub_date'))['oldest']
+        self.assertLess(oldest, timezone.now() - timedelta(days=1),
+                        'Даты постов заменены текущим временем')
+
+    def test_seed_command(self):
+        """Команда seed_yatube создаёт данные и сообщает о скорости."""
+        out = StringIO()
+        call_command('seed_yatube', users=10, groups=2, posts=50,
+                     comments=100, follows=20, stdout=out)
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(counters.reconcile(), 0, 'Счётчики разошлись')
+
+    def test_run_scenarios(self):
+        """Бенчмарк проходит все сценарии без ошибок."""
+        cache.clear()
+        synthetic.generate(users=5, groups=2, posts=30, comments=20,
+                           follows=6, seed=2)
+        driver = benchmark.ClientDriver(self.User)
+        results = benchmark.run(driver, benchmark.sample_data(),
+                                requests=3, warmup=1)
+        self.assertEqual(set(results), set(benchmark.SCENARIOS))
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['queries'], 0, name)
+
+
+class PercentileTests(SimpleTestCase):
+    def test_percentile(self):
+        """Перцентиль считается методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([], 95), 0.0)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .settings import Settings
+from posts.cache import get_or_render
+from posts.models import Comment, Group
+from yatube.cache_backends import SQLiteCache
+
+
+class FragmentCacheTests(Settings):
+    def setUp(self):
+        cache.clear()
+
+    def test_comment_invalidates_post_page(self):
+        """Новый комментарий сразу виден на странице поста."""
+        url = reverse('post', kwargs={'username': self.User.username,
+                                      'post_id': self.post.id})
+        self.guest_client.get(url)
+        Comment.objects.create(text='Свежий комментарий', post=self.post,
+                               author=self.User2)
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_group_change_invalidates_both_groups(self):
+        """Перенос поста сбрасывает кеш старой и новой группы."""
+        other = Group.objects.create(title='Другая', slug='other',
+                                     description='Описание')
+        old_url = reverse('group', kwargs={'slug': self.group.slug})
+        new_url = reverse('group', kwargs={'slug': other.slug})
+        self.guest_client.get(old_url)
+        self.guest_client.get(new_url)
+        post = self.User.posts.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+        self.assertNotContains(self.guest_client.get(old_url), post.text)
+        self.assertContains(self.guest_client.get(new_url), post.text)
+
+    def test_group_edit_and_delete_refresh_listings(self):
+        """Правка и удаление группы обновляют ленту и профиль автора."""
+        urls = [reverse('index'),
+                reverse('profile', kwargs={'username': self.User.username})]
+        group_url = reverse('group', kwargs={'slug': self.group.slug})
+        for url in urls:
+            self.assertContains(self.guest_client.get(url), group_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название группы'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url),
+                                    'Новое название группы')
+        group.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest_client.get(url), group_url)
+
+
+class StampedeGuardTests(Settings):
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_served_while_locked(self):
+        """Пока фрагмент пересобирается, остальные получают старую версию."""
+        cache.set('fragment', (1, time.time() - 1, 'старое'))
+        cache.add('lock:fragment', 1)
+        value = get_or_render('fragment', 1, lambda: 'новое')
+        self.assertEqual(value, 'старое')
+        cache.delete('lock:fragment')
+        self.assertEqual(get_or_render('fragment', 1, lambda: 'новое'),
+                         'новое')
+
+    def test_new_version_is_never_stale(self):
+        """После сброса версии старый фрагмент не отдаётся."""
+        cache.set('fragment', (1, time.time() + 60, 'старое'))
+        with mock.patch('posts.cache.LOCK_WAIT', 0):
+            cache.add('lock:fragment', 1)
+            self.assertEqual(get_or_render('fragment', 2, lambda: 'новое'),
+                             'новое')
+
+    def test_hit_does_not_write(self):
+        """Попадание в кеш ничего не пишет в общий кеш."""
+        cache.set('fragment', (1, time.time() + 60, 'готово'))
+        writes = dict.fromkeys(('add', 'incr', 'set'), mock.DEFAULT)
+        with mock.patch.multiple('posts.cache.cache', **writes) as writes:
+            self.assertEqual(get_or_render('fragment', 1, lambda: 'новое'),
+                             'готово')
+        for name, method in writes.items():
+            self.assertFalse(method.called, f'Попадание вызывает cache.{name}')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        # Settings.tearDownClass удаляет весь временный каталог
+        os.makedirs(tempfile.gettempdir(), exist_ok=True)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.cache = SQLiteCache(os.path.join(directory, 'cache.sqlite3'),
+                                 {})
+
+    def test_basic_operations(self):
+        """SQLiteCache поддерживает интерфейс кеша Django."""
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.assertEqual(self.cache.get_many(['key', 'other', 'none']),
+                         {'key': {'a': 1}, 'other': 2})
+        self.cache.set('short', 1, 0)
+        self.assertIsNone(self.cache.get('short'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic(self):
+        """Инкремент не теряет обновления при параллельной записи."""
+        self.cache.set('counter', 0)
+
+        def work():
+            for _ in range(50):
+                self.cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
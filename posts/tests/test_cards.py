@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from .settings import Settings
+from posts import cards
+from posts.loaders import load_posts
+from posts.models import Comment, Post
+
+
+class CardsTests(Settings):
+    def setUp(self):
+        cache.clear()
+
+    def edit_url(self, post):
+        return reverse('post_edit', args=[post.author.username, post.pk])
+
+    def test_edit_button_only_for_author(self):
+        """Общий фрагмент показывает кнопку правки только автору."""
+        url = self.edit_url(self.post)
+        pages = (reverse('index'),
+                 reverse('post', args=[self.User.username, self.post.pk]))
+        for page in pages:
+            with self.subTest(page=page):
+                cache.clear()
+                stranger = self.authorized_client_2.get(page)
+                author = self.authorized_client.get(page)
+                guest = self.guest_client.get(page)
+                self.assertContains(author, url)
+                self.assertNotContains(stranger, url)
+                self.assertNotContains(guest, url)
+                self.assertNotContains(author, '<!--author:')
+
+    def test_cards_are_reused(self):
+        """Карточка рендерится один раз и обновляется после правки поста."""
+        post = load_posts().get(pk=self.post.pk)
+        html, = cards.cards([post])
+        key = (f'html:{cards.CARD_TEMPLATE}:{post.pk}:'
+               f'{cards.post_version(post)}')
+        self.assertEqual(cache.get(key), html, 'Карточка не сохранена')
+        cache.set(key, 'из кэша')
+        self.assertEqual(cards.cards([post]), ['из кэша'])
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
+        post = load_posts().get(pk=post.pk)
+        self.assertIn('Новый текст', cards.cards([post])[0],
+                      'После правки выведена старая карточка')
+
+    def test_post_is_rendered_on_save(self):
+        """Сохранённый пост рендерится заранее."""
+        post = Post.objects.create(text='Заранее', author=self.User2)
+        post = load_posts().get(pk=post.pk)
+        keys = [f'html:{template}:{post.pk}:{cards.post_version(post)}'
+                for template in (cards.CARD_TEMPLATE, cards.BODY_TEMPLATE)]
+        self.assertEqual(len(cache.get_many(keys)), 2)
+
+    def test_comments(self):
+        """Комментарии выводятся из общих фрагментов."""
+        comment = Comment.objects.create(post=self.post, author=self.User2,
+                                         text='Комментарий к посту')
+        html, = cards.comments([comment])
+        self.assertIn('Комментарий к посту', html)
+        self.assertIn(f'comment_{comment.pk}', html)
+        response = self.guest_client.get(
+            reverse('post', args=[self.User.username, self.post.pk])
+        )
+        self.assertContains(response, 'Комментарий к посту')
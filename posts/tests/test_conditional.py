@@ -0,0 +1,88 @@
+from django.urls import reverse
+
+from .settings import Settings
+from posts.models import Comment, Follow, Post
+
+
+class ConditionalGetTests(Settings):
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Неизменная страница отвечает 304 без рендера шаблонов."""
+        url = reverse('index')
+        response = self.guest_client.get(url)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn('max-age=0', response['Cache-Control'])
+        again = self.revalidate(self.guest_client, url, response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.templates, [], 'Шаблон отрендерен для 304')
+
+    def test_changes_invalidate_validators(self):
+        """Комментарии и правки постов меняют ETag страниц."""
+        pages = {
+            'index': reverse('index'),
+            'group': reverse('group', kwargs={'slug': self.group.slug}),
+            'post': reverse('post', kwargs={'username': self.User.username,
+                                            'post_id': self.post.id}),
+        }
+        first = {name: self.guest_client.get(url)
+                 for name, url in pages.items()}
+        Comment.objects.create(text='Новый', post=self.post,
+                               author=self.User2)
+        for name, url in pages.items():
+            with self.subTest(name=name):
+                again = self.revalidate(self.guest_client, url, first[name])
+                self.assertEqual(again.status_code, 200)
+        response = self.guest_client.get(pages['index'])
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(
+            self.revalidate(self.guest_client, pages['index'],
+                            response).status_code, 200
+        )
+
+    def test_edit_not_hidden_by_modified_since(self):
+        """После правки поста If-Modified-Since не даёт 304."""
+        url = reverse('post', kwargs={'username': self.User.username,
+                                      'post_id': self.post.id})
+        response = self.authorized_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        # дата позже любой правки: по ней одной страница была бы свежей
+        again = self.authorized_client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Sun, 17 Oct 2100 00:00:00 GMT'
+        )
+        self.assertEqual(again.status_code, 200)
+        self.assertContains(again, 'Правка')
+
+    def test_validators_vary_by_user(self):
+        """ETag одного пользователя не подходит другому."""
+        url = reverse('profile', kwargs={'username': self.User.username})
+        response = self.authorized_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.revalidate(self.authorized_client, url,
+                                         response).status_code, 304)
+        self.assertEqual(self.revalidate(self.authorized_client_2, url,
+                                         response).status_code, 200)
+
+    def test_follow_changes_profile(self):
+        """Подписка меняет кнопку и счётчики, а значит и ETag профиля."""
+        url = reverse('profile', kwargs={'username': self.User.username})
+        response = self.authorized_client_2.get(url)
+        Follow.objects.create(user=self.User2, author=self.User)
+        self.assertEqual(self.revalidate(self.authorized_client_2, url,
+                                         response).status_code, 200)
+        response = self.authorized_client_3.get(url)
+        Follow.objects.create(user=self.User3, author=self.User2)
+        self.assertEqual(self.revalidate(self.authorized_client_3, url,
+                                         response).status_code, 304)
+
+    def test_missing_post(self):
+        """Пост чужого автора по-прежнему даёт 404."""
+        url = reverse('post', kwargs={'username': self.User2.username,
+                                      'post_id': self.post.id})
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .settings import Settings
+from posts.models import Comment, Follow, Post, UserStats
+
+
+class CountersTests(Settings):
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        posts = self.stats(self.User).posts_count
+        post = Post.objects.create(text='Пост', author=self.User)
+        self.assertEqual(self.stats(self.User).posts_count, posts + 1)
+
+        comment = Comment.objects.create(text='Ком', post=post,
+                                         author=self.User2)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+        Follow.objects.create(user=self.User2, author=self.User)
+        self.assertEqual(self.stats(self.User).followers_count, 1)
+        self.assertEqual(self.stats(self.User2).following_count, 1)
+        Follow.objects.filter(user=self.User2).delete()
+        self.assertEqual(self.stats(self.User).followers_count, 0)
+        self.assertEqual(self.stats(self.User2).following_count, 0)
+
+        post.delete()
+        self.assertEqual(self.stats(self.User).posts_count, posts)
+
+    def test_profile_without_aggregates(self):
+        """Профиль отображается без агрегирующих запросов."""
+        url = reverse('profile', kwargs={'username': self.User.username})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        aggregates = [q['sql'] for q in queries if 'COUNT(' in q['sql']]
+        self.assertEqual(aggregates, [], 'Профиль считает агрегаты')
+        self.assertEqual(response.context['count'], self.User.posts.count())
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет рассинхронизацию."""
+        UserStats.objects.filter(user=self.User).update(posts_count=100)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        UserStats.objects.filter(user=self.User3).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.User).posts_count,
+                         self.User.posts.count())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count,
+                         self.post.comments.count())
+        self.assertTrue(UserStats.objects.filter(user=self.User3).exists())
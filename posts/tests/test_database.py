@@ -0,0 +1,84 @@
+import os
+import time
+from contextlib import nullcontext
+from unittest import mock, skipUnless
+
+from django.db import connection
+
+from .settings import Settings
+from yatube.db.pool import ConnectionPool, PooledDatabaseWrapper
+from yatube.db.sqlite3.base import PRAGMAS
+
+
+class ConnectionPoolTests(Settings):
+    def test_reuses_connections(self):
+        """Пул отдаёт припаркованное соединение и не растёт сверх размера."""
+        pool = ConnectionPool(1)
+        first, second = mock.Mock(), mock.Mock()
+        self.assertTrue(pool.put(first, 1.0))
+        self.assertFalse(pool.put(second, 2.0), 'Пул превысил свой размер')
+        self.assertEqual(pool.get(), (first, 1.0))
+        self.assertIsNone(pool.get())
+
+    def test_forgets_parent_connections(self):
+        """После fork соединения родителя не переиспользуются."""
+        pool = ConnectionPool(2)
+        pool.put(mock.Mock(), time.time())
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNone(pool.get())
+
+    def wrapper(self, name):
+        class Backend:
+            wrap_database_errors = nullcontext()
+            errors_occurred = in_atomic_block = False
+
+            def __init__(self):
+                self.settings_dict = {'ENGINE': 'test', 'NAME': name,
+                                      'POOL_SIZE': 2, 'CONN_MAX_AGE': 60}
+                self.connection = None
+
+            def get_new_connection(self, conn_params):
+                return mock.Mock(closed=0, usable=True)
+
+            def is_usable(self):
+                return self.connection.usable
+
+            def _close(self):
+                self.connection.close()
+
+        class Wrapper(PooledDatabaseWrapper, Backend):
+            def open(self):
+                self.connection = self.get_new_connection({})
+                return self.connection
+
+        return Wrapper()
+
+    def test_old_connections_dropped(self):
+        """Соединение старше CONN_MAX_AGE закрывается, а не паркуется."""
+        wrapper = self.wrapper('old')
+        first = wrapper.open()
+        wrapper._close()
+        self.assertIs(wrapper.open(), first, 'Соединение не взято из пула')
+        with mock.patch('time.time', return_value=time.time() + 61):
+            wrapper._close()
+            first.close.assert_called_once()
+            self.assertIsNot(wrapper.open(), first)
+
+    def test_unusable_connections_skipped(self):
+        """Перед выдачей из пула соединение проверяется is_usable()."""
+        wrapper = self.wrapper('unusable')
+        first = wrapper.open()
+        wrapper._close()
+        first.usable = False
+        self.assertIsNot(wrapper.open(), first,
+                         'Выдано оборванное соединение')
+        first.close.assert_called_once()
+
+    @skipUnless(connection.vendor == 'sqlite', 'Настройки SQLite')
+    def test_sqlite_pragmas(self):
+        """Соединение с SQLite получает настройки из PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], PRAGMAS['cache_size'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1, 'Ожидался NORMAL')
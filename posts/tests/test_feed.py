@@ -0,0 +1,86 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from .settings import Settings
+from posts import feed
+from posts.models import FeedEntry, Follow, Post
+
+
+class FeedTests(Settings):
+    def test_fan_out_on_new_post(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.User2, author=self.User)
+        post = Post.objects.create(text='Новый пост', author=self.User)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.User2, post=post).exists(),
+            'Пост не попал в ленту подписчика'
+            )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.User3, post=post).exists(),
+            'Пост попал в ленту пользователя без подписки'
+            )
+
+    def test_follow_backfill_and_unfollow_trim(self):
+        """Подписка заполняет ленту, отписка очищает её."""
+        self.authorized_client_2.get(
+            reverse('profile_follow', kwargs={'username': self.User.username})
+            )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.User2).count(),
+            self.User.posts.count(),
+            'Лента не заполнена старыми постами автора'
+            )
+        self.authorized_client_2.get(
+            reverse('profile_unfollow',
+                    kwargs={'username': self.User.username})
+            )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.User2).exists(),
+            'Лента не очищена после отписки'
+            )
+
+    def test_celebrity_read_at_request_time(self):
+        """Посты популярных авторов читаются без записи в ленту."""
+        Follow.objects.create(user=self.User2, author=self.User)
+        with mock.patch.object(feed, 'CELEBRITY_FOLLOWERS', 1):
+            post = Post.objects.create(text='Пост звезды', author=self.User)
+            self.assertFalse(
+                FeedEntry.objects.filter(post=post).exists(),
+                'Пост популярного автора разослан по лентам'
+                )
+            self.assertIn(post, feed.feed_posts(self.User2))
+
+    def test_author_crossing_celebrity_line(self):
+        """Автор, переставший быть популярным, возвращается в ленты."""
+        Follow.objects.create(user=self.User2, author=self.User)
+        with mock.patch.object(feed, 'CELEBRITY_FOLLOWERS', 2):
+            Follow.objects.create(user=self.User3, author=self.User)
+            self.assertFalse(
+                FeedEntry.objects.filter(author=self.User).exists(),
+                'Посты популярного автора остались в лентах'
+                )
+            post = Post.objects.create(text='Пост звезды', author=self.User)
+            Follow.objects.filter(user=self.User3).delete()
+            self.assertTrue(
+                FeedEntry.objects.filter(user=self.User2, post=post).exists(),
+                'Пост времён популярности не вернулся в ленту'
+                )
+            self.assertEqual(
+                list(feed.feed_posts(self.User2)),
+                list(self.User.posts.all()),
+                'Посты автора пропали из ленты'
+                )
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает ленты."""
+        Follow.objects.create(user=self.User2, author=self.User)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(
+            list(feed.feed_posts(self.User2)),
+            list(self.User.posts.all()),
+            'Лента не восстановлена'
+            )
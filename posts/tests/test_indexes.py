@@ -0,0 +1,50 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+
+from .settings import Settings
+from posts.models import Comment, Follow, Group, Post
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Планы запросов SQLite')
+class ListingIndexTests(Settings):
+    def setUp(self):
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(3):
+            post = Post.objects.create(text=f'Пост {number}',
+                                       author=self.User, group=group)
+            Comment.objects.create(text='Комментарий', post=post,
+                                   author=self.User2)
+        Follow.objects.create(user=self.User2, author=self.User)
+
+    def explain(self, *views):
+        out = StringIO()
+        call_command('explain_views', views=views, stdout=out,
+                     no_color=True)
+        return out.getvalue()
+
+    def test_listings_use_composite_indexes(self):
+        """Ленты и комментарии читаются по составным индексам."""
+        plans = self.explain('group', 'profile', 'post')
+        for index in ('post_group_date', 'post_author_date',
+                      'comment_post_created'):
+            with self.subTest(index=index):
+                self.assertIn(index, plans, f'Индекс {index} не используется')
+
+    def test_streamed_listings_explained(self):
+        """Запросы потоковых страниц попадают в планы целиком."""
+        with mock.patch('posts.streaming.ENABLED', True):
+            plans = self.explain('group', 'profile')
+        self.assertEqual(
+            plans.count('ORDER BY "posts_post"."pub_date" DESC'), 2,
+            'Запросы страниц постов не попали в планы'
+            )
+
+    def test_explain_leaves_no_session(self):
+        """Команда не оставляет в базе сессию своего клиента."""
+        before = Session.objects.count()
+        self.explain('index', 'follow_index')
+        self.assertEqual(Session.objects.count(), before)
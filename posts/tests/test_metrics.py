@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .settings import Settings
+from yatube import metrics
+
+
+class MetricsTests(Settings):
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, name, **labels):
+        key = tuple(sorted(labels.items()))
+        for metric in metrics.METRICS:
+            for sample_name, sample_key, value in metric.samples():
+                if sample_name == name and sample_key == key:
+                    return value
+        return 0
+
+    def test_request_is_measured(self):
+        """Запрос к странице попадает в метрики своего представления."""
+        before = self.sample('yatube_sql_queries_count', view='index')
+        misses = self.sample('yatube_fragment_cache_total',
+                             view='index', result='miss')
+        self.guest_client.get(reverse('index'))
+        self.assertEqual(
+            self.sample('yatube_sql_queries_count', view='index'),
+            before + 1
+            )
+        self.assertGreater(
+            self.sample('yatube_sql_queries_sum', view='index'), 0,
+            'Запросы к базе не посчитаны'
+            )
+        self.assertGreater(
+            self.sample('yatube_fragment_cache_total',
+                        view='index', result='miss'),
+            misses, 'Промах кеша фрагментов не посчитан'
+            )
+
+    def test_streamed_page_measured_when_sent(self):
+        """Потоковая страница учитывается вместе с рендером карточек."""
+        count = self.sample('yatube_sql_queries_count', view='index')
+        total = self.sample('yatube_sql_queries_sum', view='index')
+        with mock.patch('posts.streaming.ENABLED', True):
+            response = self.authorized_client.get(reverse('index'))
+        self.assertEqual(
+            self.sample('yatube_sql_queries_count', view='index'), count,
+            'Запрос учтён до отправки страницы'
+            )
+        with CaptureQueriesContext(connection) as streamed:
+            b''.join(response.streaming_content)
+        response.close()
+        self.assertGreater(len(streamed), 0)
+        self.assertEqual(
+            self.sample('yatube_sql_queries_count', view='index'), count + 1
+            )
+        self.assertGreaterEqual(
+            self.sample('yatube_sql_queries_sum', view='index') - total,
+            len(streamed), 'Запросы карточек не посчитаны'
+            )
+
+    def test_histogram_buckets(self):
+        """Корзины гистограммы накопительные и заканчиваются +Inf."""
+        histogram = metrics.Histogram('test_seconds', 'Тест', (1, 2))
+        for value in (0.5, 2, 3):
+            histogram.observe(value, view='test')
+        self.assertEqual(
+            [value for _, _, value in histogram.samples()],
+            [1, 2, 3, 5.5, 3]
+            )
+
+    def test_endpoint_is_staff_only(self):
+        """Метрики видит только персонал."""
+        url = reverse('metrics')
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+            )
+        self.client.force_login(admin)
+        self.guest_client.get(reverse('index'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, '# TYPE yatube_request_duration_seconds histogram'
+            )
+        self.assertContains(response, 'yatube_requests_total{')
+        self.assertContains(response, 'view="index"')
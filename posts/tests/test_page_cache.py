@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from .settings import Settings
+from posts import page_cache
+from posts.models import Comment, Group
+from yatube.db import routers
+
+
+class PageCacheTests(Settings):
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('index'),
+            reverse('groups'),
+            reverse('group', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.User.username}),
+            reverse('post', kwargs={'username': self.User.username,
+                                    'post_id': self.post.id}),
+        ]
+
+    def test_anonymous_pages_are_cached(self):
+        """Анонимы получают сохранённую страницу без рендера шаблонов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                again = self.guest_client.get(url)
+                self.assertEqual(again.status_code, 200)
+                self.assertEqual(again.templates, [],
+                                 'Страница отрендерена заново')
+                self.assertEqual(again.content, first.content)
+                self.assertIn('s-maxage', again['Cache-Control'])
+                self.assertIn('Cookie', again['Vary'])
+
+    def test_signed_in_users_bypass_cache(self):
+        """Авторизованные пользователи всегда получают свежий рендер."""
+        url = self.urls[-1]
+        self.guest_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertNotEqual(response.templates, [])
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_changes_invalidate_pages(self):
+        """Новый комментарий и правка группы обновляют страницы."""
+        post_url, group_url = self.urls[-1], self.urls[2]
+        self.guest_client.get(post_url)
+        Comment.objects.create(text='Свежий комментарий', post=self.post,
+                               author=self.User2)
+        self.assertContains(self.guest_client.get(post_url),
+                            'Свежий комментарий')
+        self.guest_client.get(group_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        self.assertContains(self.guest_client.get(group_url),
+                            'Новое название')
+
+    def test_replica_pages_kept_briefly(self):
+        """Страница, прочитанная с реплики, хранится не дольше закрепления."""
+        url = self.urls[0]
+        with mock.patch('posts.page_cache.cache', wraps=cache) as spy:
+            self.guest_client.get(url)
+            self.assertEqual(spy.set.call_args[0][2], page_cache.TIMEOUT)
+            cache.clear()
+            replica = mock.Mock(wraps=routers, PIN_SECONDS=5)
+            replica.reads_replica.return_value = True
+            with mock.patch('posts.page_cache.routers', replica):
+                self.guest_client.get(url)
+            self.assertEqual(spy.set.call_args[0][2], 5)
@@ -0,0 +1,121 @@
+import base64
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .settings import Settings
+from posts.models import Post
+from posts.paginator import CursorPaginator, decode_cursor, encode_cursor
+
+
+class CursorPaginatorTests(Settings):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for i in range(24):
+            Post.objects.create(text=f'Пост {i}', author=cls.User)
+
+    def walk(self, url):
+        seen = []
+        response = self.guest_client.get(url)
+        while True:
+            page = response.context['page']
+            seen.extend(post.id for post in page)
+            if not page.has_next():
+                return seen, page
+            response = self.guest_client.get(
+                f'{url}?cursor={page.next_cursor}'
+                )
+
+    def test_cursor_walk_matches_ordering(self):
+        """Проход по курсорам выдаёт все посты по порядку без повторов."""
+        seen, _ = self.walk(reverse('index'))
+        self.assertEqual(
+            seen, list(Post.objects.values_list('id', flat=True)),
+            'Курсорная пагинация нарушает порядок постов'
+            )
+
+    def test_cursor_previous_page(self):
+        """Ссылка назад возвращает предыдущую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertTrue(back.has_next())
+        self.assertFalse(back.has_previous())
+
+    def test_deep_page_query_count(self):
+        """Глубокая страница стоит столько же запросов, сколько первая."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursor = paginator.page(paginator.page().next_cursor).next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.page(cursor)
+        self.assertEqual(len(page), 5)
+
+    def test_broken_cursor(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.guest_client.get(reverse('index') + '?cursor=abc')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 10)
+        with self.assertRaises(ValueError):
+            decode_cursor('abc')
+        token = encode_cursor([Post.objects.first().pub_date, 1])
+        self.assertEqual(decode_cursor(token)[1][1], 1)
+
+    def test_cursor_values_of_wrong_type(self):
+        """Курсор со значениями не того типа считается испорченным."""
+        date = Post.objects.first().pub_date.isoformat()
+        for values in ([{'a': 1}, 1], [[1], 1], [1.5, 1], [1, 1],
+                       [date, date], [date, 1.5], [date, True],
+                       [date, None], ['2020-13-45T00:00:00', 1]):
+            token = base64.urlsafe_b64encode(
+                json.dumps([False, *values]).encode()
+            ).decode()
+            with self.subTest(values=values):
+                with self.assertRaises(ValueError):
+                    decode_cursor(token)
+                response = self.guest_client.get(reverse('index'),
+                                                 {'cursor': token})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page']), 10)
+                response = self.guest_client.get(reverse('api_posts'),
+                                                 {'cursor': token})
+                self.assertEqual(response.status_code, 400)
+
+    @mock.patch('posts.paginator.MAX_PAGES', 2)
+    def test_page_numbers_limited(self):
+        """Номера страниц есть только до PAGINATOR_MAX_PAGES."""
+        response = self.authorized_client.get(reverse('index'), {'page': 1})
+        self.assertEqual(list(response.context['page'].page_numbers), [1, 2])
+        self.assertNotContains(response, '?page=3')
+        response = self.authorized_client.get(reverse('index'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page'].number, 2)
+        response = self.authorized_client.get(reverse('index'), {'page': 3})
+        self.assertEqual(response.status_code, 404,
+                         'Страница за пределом отдаётся как последняя')
+
+    def test_first_page_not_counted(self):
+        """Первая страница лент читается без COUNT(*)."""
+        self.authorized_client_2.get(reverse('profile_follow',
+                                             args=[self.User.username]))
+        for url in (reverse('index'), reverse('follow_index')):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client_2.get(url)
+                page = response.context['page']
+                self.assertEqual(page.number, 1)
+                self.assertEqual(len(page), 10)
+                self.assertTrue(page.has_next())
+                self.assertContains(response, f'?cursor={page.next_cursor}')
+                self.assertFalse(
+                    [q for q in queries if 'COUNT(' in q['sql'].upper()],
+                    f'{url} считает все посты ради первой страницы'
+                    )
+        response = self.authorized_client.get(reverse('index'), {'page': 1})
+        self.assertEqual(response.context['paginator'].count,
+                         Post.objects.count())
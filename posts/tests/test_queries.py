@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .settings import Settings
+from posts.models import Comment, Follow, Post
+
+
+class QueryBudgetMixin:
+    """Fail when a page needs more queries than its budget."""
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def assertQueryBudget(self, client, url, budget):
+        count = self.count_queries(client, url)
+        self.assertLessEqual(
+            count, budget,
+            f'{url} выполняет {count} запросов при бюджете {budget}'
+            )
+        return count
+
+
+class QueryBudgetTests(QueryBudgetMixin, Settings):
+    # Сессия и пользователь авторизованного клиента занимают два запроса,
+    # варианты картинок подгружаются одним запросом на страницу.
+    budgets = {
+        'index': 5,
+        'group': 6,
+        'profile': 6,
+        'follow_index': 6,
+        'post': 8,
+        'groups': 4,
+    }
+
+    def urls(self):
+        username = self.User.username
+        return {
+            'index': reverse('index'),
+            'group': reverse('group', kwargs={'slug': self.group.slug}),
+            'profile': reverse('profile', kwargs={'username': username}),
+            'follow_index': reverse('follow_index'),
+            'post': reverse('post', kwargs={'username': username,
+                                            'post_id': self.post.id}),
+            'groups': reverse('groups'),
+        }
+
+    def add_content(self, number):
+        for i in range(number):
+            post = Post.objects.create(text=f'Пост {i}', author=self.User,
+                                       group=self.group)
+            Comment.objects.create(text='Ком', post=post, author=self.User2)
+            Comment.objects.create(text='Ком', post=self.post,
+                                   author=self.User3)
+
+    def test_listing_query_budget(self):
+        """Страницы списков укладываются в бюджет запросов."""
+        # превью картинок проверяются отдельно
+        Post.objects.filter(pk=self.post.pk).update(image=None)
+        Follow.objects.create(user=self.User2, author=self.User)
+        self.add_content(3)
+        small = {
+            name: self.assertQueryBudget(
+                self.authorized_client_2, url, self.budgets[name]
+                )
+            for name, url in self.urls().items()
+        }
+        self.add_content(20)
+        for name, url in self.urls().items():
+            with self.subTest(name=name):
+                count = self.assertQueryBudget(
+                    self.authorized_client_2, url, self.budgets[name]
+                    )
+                self.assertEqual(
+                    count, small[name],
+                    f'Число запросов {url} растёт вместе со страницей'
+                    )
@@ -0,0 +1,82 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+from yatube.db import replication, routers
+
+REPLICAS = ['replica1']
+
+
+# без транзакции TestCase: внутри неё роутер всегда читает основную базу
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_go_to_replicas_only_when_enabled(self):
+        """Без middleware чтения идут в основную базу, с ним — в реплику."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with routers.replica_reads():
+            self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+    def test_read_your_writes(self):
+        """После записи запрос читает из основной базы."""
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default',
+                             'Прочитали свою запись с реплики')
+
+    def test_replicas_are_not_migrated(self):
+        """Миграции применяются только к основной базе."""
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def request(self, request):
+        seen = {}
+
+        def view(request):
+            seen['read'] = routers.ReplicaRouter().db_for_read(Post)
+            if request.method == 'POST':
+                routers.ReplicaRouter().db_for_write(Post)
+            return HttpResponse()
+
+        response = routers.ReplicaMiddleware(view)(request)
+        return seen['read'], response
+
+    def test_write_pins_client_to_primary(self):
+        """После POST клиент получает cookie и читает из основной базы."""
+        factory = RequestFactory()
+        read, response = self.request(factory.get('/'))
+        self.assertIn(read, REPLICAS)
+        read, response = self.request(factory.post('/'))
+        self.assertEqual(read, 'default')
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], routers.PIN_SECONDS)
+        factory.cookies[routers.PIN_COOKIE] = cookie.value
+        read, _ = self.request(factory.get('/'))
+        self.assertEqual(read, 'default', 'Cookie не закрепил основную базу')
+
+
+class ReplicationTests(SimpleTestCase):
+    def test_copy_between_files(self):
+        """Заглушка репликации переносит данные основной базы в реплику."""
+        directory = tempfile.mkdtemp()
+        primary = sqlite3.connect(os.path.join(directory, 'primary.sqlite3'))
+        replica = sqlite3.connect(os.path.join(directory, 'replica.sqlite3'))
+        primary.execute('CREATE TABLE post (text TEXT)')
+        primary.execute("INSERT INTO post VALUES ('Пост')")
+        primary.commit()
+        replication.copy(primary, replica)
+        self.assertEqual(replica.execute('SELECT text FROM post').fetchall(),
+                         [('Пост',)])
+        primary.close()
+        replica.close()
+        shutil.rmtree(directory)
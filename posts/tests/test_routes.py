@@ -0,0 +1,85 @@
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+
+from posts import routes
+
+USERNAMES = ('test', 'leo_tolstoy', 'user.name+tag@mail', 'Лев-Толстой',
+             'with space', '50%', "o'neil")
+
+
+class RoutesTests(SimpleTestCase):
+    def tearDown(self):
+        set_script_prefix('/')
+
+    def assertSameAsReverse(self, name, *args):
+        self.assertEqual(routes.url(name, *args), reverse(name, args=args),
+                         f'URL {name} {args} отличается от reverse()')
+
+    def test_same_as_reverse(self):
+        """Адреса совпадают с reverse() для любых имён пользователей."""
+        for username in USERNAMES:
+            with self.subTest(username=username):
+                self.assertSameAsReverse('profile', username)
+                for name in ('post', 'post_edit', 'add_comment'):
+                    self.assertSameAsReverse(name, username, 12)
+                    self.assertSameAsReverse(name, username, '12')
+        for slug in ('cats', 'test-slug', 'Slug_2'):
+            self.assertSameAsReverse('group', slug)
+
+    def test_script_prefix(self):
+        """Адреса учитывают префикс приложения."""
+        set_script_prefix('/yatube/')
+        self.assertSameAsReverse('post', 'leo', 1)
+        self.assertTrue(routes.url('post', 'leo', 1).startswith('/yatube/'))
+
+    def test_invalid_arguments(self):
+        """Недопустимые аргументы дают ту же ошибку, что и reverse()."""
+        calls = (('profile', 'a/b'), ('profile', ''), ('group', 'не слаг'),
+                 ('post', 'leo', -1), ('post', 'leo'), ('search', 'leo'))
+        for call in calls:
+            with self.subTest(call=call):
+                with self.assertRaises(NoReverseMatch):
+                    routes.url(*call)
+
+    def test_other_routes(self):
+        """Остальные маршруты строятся через reverse()."""
+        self.assertEqual(routes.url('index'), reverse('index'))
+
+    def test_template_filters(self):
+        """Фильтры и тег route выводят то же, что и тег url."""
+        post = SimpleNamespace(pk=5, id=5, author=SimpleNamespace(
+            username='Лев-Толстой'), group=SimpleNamespace(slug='cats'))
+        pairs = (
+            ('{{ post|post_url }}',
+             "{% url 'post' post.author.username post.id %}"),
+            ('{{ post|post_edit_url }}',
+             "{% url 'post_edit' post.author.username post.id %}"),
+            ('{{ post|comment_url }}',
+             "{% url 'add_comment' post.author.username post.id %}"),
+            ('{{ post.author.username|profile_url }}',
+             "{% url 'profile' post.author.username %}"),
+            ('{{ post.group.slug|group_url }}',
+             "{% url 'group' post.group.slug %}"),
+            ("{% route 'post' post.author.username post.id %}",
+             "{% url 'post' post.author.username post.id %}"),
+        )
+        engine = engines['django']
+        for fast, slow in pairs:
+            with self.subTest(template=fast):
+                self.assertEqual(
+                    engine.from_string('{% load routes %}' + fast).render(
+                        {'post': post}),
+                    engine.from_string(slow).render({'post': post}),
+                )
+
+    def test_bench_urls_command(self):
+        """Команда bench_urls замеряет все маршруты."""
+        out = StringIO()
+        call_command('bench_urls', number=10, stdout=out)
+        for name in routes.ROUTES + ('card links',):
+            self.assertIn(name, out.getvalue())
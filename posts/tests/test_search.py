@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from .settings import Settings
+from posts import search
+from posts.models import Comment, Post
+
+
+class SearchTests(Settings):
+    def setUp(self):
+        self.cats = Post.objects.create(text='Котики гуляли по крыше',
+                                        author=self.User)
+        self.dogs = Post.objects.create(text='Собака лаяла на котика',
+                                        author=self.User2)
+
+    def find(self, query):
+        response = self.guest_client.get(reverse('search'), {'q': query})
+        return [post.pk for post in response.context['page']]
+
+    def test_stemming(self):
+        """Разные формы слова приводятся к одной основе."""
+        self.assertEqual(search.tokenize('котики котиков котик'),
+                         ['котик'] * 3)
+        self.assertEqual(search.tokenize('и в на'), [],
+                         'Стоп-слова попали в индекс')
+
+    def test_search_view_ranks_results(self):
+        """Поиск находит формы слова, пост со словом в тексте выше."""
+        Comment.objects.create(text='котики', post=self.dogs,
+                               author=self.User)
+        self.assertEqual(self.find('котиков'), [self.cats.pk, self.dogs.pk])
+        self.assertEqual(self.find('крыша котик'), [self.cats.pk])
+        self.assertEqual(self.find(''), [])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении постов и комментариев."""
+        comment = Comment.objects.create(text='Попугай', post=self.cats,
+                                         author=self.User2)
+        self.assertEqual(self.find('попугаи'), [self.cats.pk])
+        comment.delete()
+        self.assertEqual(self.find('попугаи'), [])
+        self.cats.text = 'Ёжики'
+        self.cats.save()
+        self.assertEqual(self.find('ежик'), [self.cats.pk])
+        self.assertEqual(self.find('крыша'), [])
+        self.cats.delete()
+        self.assertEqual(self.find('ежик'), [])
+
+    def test_fallback_index(self):
+        """Запасной индекс SearchTerm находит те же посты."""
+        Comment.objects.create(text='Рыжий котик', post=self.cats,
+                               author=self.User2)
+        with mock.patch('posts.search.BACKEND', 'terms'):
+            search.rebuild()
+            self.assertEqual(self.find('котиков'),
+                             [self.cats.pk, self.dogs.pk])
+            self.assertEqual(self.find('собаки'), [self.dogs.pk])
+
+    def test_rebuild(self):
+        """Перестройка индекса возвращает число постов."""
+        self.assertEqual(search.rebuild(), Post.objects.count())
+        self.assertEqual(self.find('лаяла'), [self.dogs.pk])
+
+    def test_admin_search(self):
+        """Поиск в админке идёт через индекс."""
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+            )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котиков'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_admin_search_not_limited(self):
+        """Админка находит все совпадения, а не первую страницу выдачи."""
+        Post.objects.bulk_create(
+            Post(text=f'Котик номер {number}', author=self.User)
+            for number in range(search.RESULT_LIMIT)
+        )
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+            )
+        self.client.force_login(admin)
+        for backend in ('auto', 'terms'):
+            with self.subTest(backend=backend), \
+                    mock.patch('posts.search.BACKEND', backend):
+                search.rebuild()
+                response = self.client.get(
+                    reverse('admin:posts_post_changelist'), {'q': 'котик'}
+                    )
+                self.assertEqual(response.context['cl'].result_count,
+                                 search.RESULT_LIMIT + 2)
@@ -0,0 +1,67 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+
+from .settings import Settings
+from posts.models import Post
+
+
+class StreamingTests(Settings):
+    def setUp(self):
+        cache.clear()
+
+    def pages(self):
+        return (reverse('index'), reverse('group', args=[self.group.slug]),
+                reverse('profile', args=[self.User.username]),
+                reverse('follow_index'))
+
+    def test_same_page_as_render(self):
+        """Потоковая страница совпадает с обычной."""
+        for url in self.pages():
+            with self.subTest(url=url):
+                cache.clear()
+                rendered = self.authorized_client.get(url)
+                cache.clear()
+                with mock.patch('posts.streaming.ENABLED', True):
+                    streamed = self.authorized_client.get(url)
+                self.assertTrue(streamed.streaming, 'Ответ не потоковый')
+                content = b''.join(streamed.streaming_content)
+                self.assertEqual(content.split(), rendered.content.split())
+                self.assertNotIn(b'<!--stream:', content)
+
+    def test_head_is_sent_first(self):
+        """Шапка страницы уходит до запроса постов."""
+        with mock.patch('posts.streaming.ENABLED', True):
+            response = self.authorized_client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            head = next(iter(response.streaming_content))
+        self.assertIn(b'<nav', head)
+        self.assertNotIn(self.post.text.encode(), head)
+        self.assertIn(self.post.text.encode(),
+                      b''.join(response.streaming_content))
+
+    def test_cards_come_in_chunks(self):
+        """Карточки приходят частями и с кнопкой правки только автору."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=self.User2)
+            for number in range(7)
+        )
+        with mock.patch('posts.streaming.ENABLED', True):
+            author = self.authorized_client_2.get(reverse('index'))
+            stranger = self.authorized_client.get(reverse('index'))
+        chunks = list(author.streaming_content)
+        self.assertGreater(len(chunks), 3, 'Карточки пришли одним куском')
+        post = Post.objects.filter(author=self.User2).first()
+        edit = reverse('post_edit', args=[self.User2.username, post.pk])
+        self.assertIn(edit.encode(), b''.join(chunks))
+        self.assertNotIn(edit.encode(), b''.join(stranger.streaming_content))
+
+    def test_bench_streaming_command(self):
+        """Команда bench_streaming сравнивает оба способа."""
+        out = StringIO()
+        call_command('bench_streaming', sizes=[1], repeat=1, stdout=out)
+        self.assertIn('render', out.getvalue())
+        self.assertIn('stream', out.getvalue())
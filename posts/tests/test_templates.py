@@ -0,0 +1,57 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.urls import reverse
+
+from .settings import Settings
+from posts.loaders import load_posts
+from posts.models import Post
+
+
+def render(source, **context):
+    return ' '.join(
+        engines['django'].from_string(source).render(context).split()
+    )
+
+
+class PostCardsTests(Settings):
+    def test_same_cards_as_include(self):
+        """Тег post_cards выводит те же карточки, что и include в цикле."""
+        Post.objects.create(text='Второй пост', author=self.User2,
+                            group=self.group)
+        posts = list(load_posts())
+        cards = render('{% load post_cards %}{% post_cards posts %}',
+                       posts=posts, user=self.User)
+        included = render(
+            '{% for post in posts %}'
+            '{% include "includes/post_item.html" with post=post %}'
+            '{% endfor %}', posts=posts, user=self.User
+        )
+        self.assertEqual(cards, included)
+        self.assertIn('Второй пост', cards)
+
+    def test_card_context_is_popped(self):
+        """После тега в контексте не остаётся последнего поста."""
+        output = render(
+            '{% load post_cards %}{% post_cards posts %}[{{ post }}]',
+            posts=[self.post], user=self.User
+        )
+        self.assertTrue(output.endswith('[]'))
+
+    def test_server_timing(self):
+        """Профилировщик шаблонов добавляет заголовок Server-Timing."""
+        cache.clear()
+        with mock.patch('yatube.metrics.PROFILE_TEMPLATES', True):
+            response = self.authorized_client.get(reverse('index'))
+        self.assertIn('includes/post_item.html x1',
+                      response['Server-Timing'])
+
+    def test_bench_templates_command(self):
+        """Команда bench_templates замеряет все профили и способы."""
+        out = StringIO()
+        call_command('bench_templates', sizes=[1], repeat=1, stdout=out)
+        for name in ('debug', 'cached', 'include', 'post_cards'):
+            self.assertIn(name, out.getvalue())
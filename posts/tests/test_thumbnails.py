@@ -0,0 +1,80 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+
+from .settings import Settings
+from posts import thumbnails
+from posts.models import Post, PostImageVariant
+
+
+def run_now(callback):
+    callback()
+
+
+@mock.patch('posts.thumbnails.transaction.on_commit', run_now)
+@mock.patch('posts.thumbnails.ASYNC', False)
+class ThumbnailTests(Settings):
+    def setUp(self):
+        cache.clear()
+
+    def test_generate_stores_card_url(self):
+        """Превью сохраняется в посте и выводится в карточке."""
+        url = thumbnails.generate(self.post.pk)
+        self.assertTrue(url)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).image_card, url)
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, url)
+
+    def test_generate_stores_variants(self):
+        """Для картинки создаются варианты всех ширин в JPEG и WebP."""
+        thumbnails.generate(self.post.pk)
+        variants = PostImageVariant.objects.filter(post=self.post)
+        self.assertEqual(
+            set(variants.values_list('width', 'format')),
+            {(width, image_format) for width in thumbnails.WIDTHS
+             for image_format in thumbnails.FORMATS},
+            'Набор вариантов картинки неполный'
+            )
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'type="image/webp"')
+        for variant in variants:
+            self.assertContains(
+                response, f'{variant.file.url} {variant.width}w'
+                )
+
+    def test_regenerate_replaces_variants(self):
+        """Повторная генерация заменяет старые варианты, а не дублирует."""
+        thumbnails.generate(self.post.pk)
+        thumbnails.generate(self.post.pk)
+        self.assertEqual(
+            PostImageVariant.objects.filter(post=self.post).count(),
+            len(thumbnails.WIDTHS) * len(thumbnails.FORMATS)
+            )
+
+    def test_new_post_schedules_thumbnail(self):
+        """Новый пост с картинкой получает превью при сохранении."""
+        self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Пост с картинкой', 'image': self.gif_file},
+            )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertNotEqual(post.image_card, '', 'Превью не создано')
+
+    def test_placeholder_without_thumbnail(self):
+        """Без превью карточка показывает заглушку, а не оригинал."""
+        Post.objects.filter(pk=self.post.pk).update(image_card='')
+        for url in (reverse('index'),
+                    reverse('post', args=[self.User.username, self.post.pk])):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Изображение обрабатывается')
+                self.assertNotContains(response, self.post.image.url)
+
+    def test_generate_thumbnails_command(self):
+        """Команда generate_thumbnails заполняет пропущенные превью."""
+        Post.objects.filter(pk=self.post.pk).update(image_card='')
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        self.assertNotEqual(Post.objects.get(pk=self.post.pk).image_card, '')
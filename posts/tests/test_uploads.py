@@ -0,0 +1,120 @@
+import io
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image
+
+from .settings import Settings
+from posts import uploads
+from posts.models import Post, Upload
+from yatube import metrics
+
+
+def run_now(callback):
+    callback()
+
+
+def stored_bytes():
+    return sum(value for _, _, value in metrics.UPLOAD_BYTES.samples())
+
+
+def jpeg(width=300, height=200):
+    image = Image.new('RGB', (width, height), 'red')
+    exif = Image.Exif()
+    exif[0x010f] = 'Camera'
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@mock.patch('tasks.queue.transaction.on_commit', run_now)
+@mock.patch('posts.thumbnails.ASYNC', False)
+class UploadTests(Settings):
+    def start(self, data, post=None, client=None):
+        response = (client or self.authorized_client).post(
+            reverse('api_uploads'),
+            {'post': (post or self.post).pk, 'filename': 'photo.jpg',
+             'size': len(data)},
+            content_type='application/json',
+        )
+        return response
+
+    def put(self, upload, data, offset):
+        return self.authorized_client.put(
+            upload['url'], data, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_in_parts(self):
+        """Картинка загружается частями и после обработки попадает в пост."""
+        data = jpeg()
+        before = stored_bytes()
+        response = self.start(data)
+        self.assertEqual(response.status_code, 201, response.content)
+        upload = response.json()
+        for offset in range(0, len(data), 500):
+            response = self.put(upload, data[offset:offset + 500], offset)
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['state'], Upload.DONE)
+        self.assertEqual(response.json()['format'], 'JPEG')
+        self.assertEqual(stored_bytes() - before, len(data))
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertTrue(post.image_card, 'Превью не построены')
+        with default_storage.open(post.image.name) as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (300, 200))
+            self.assertFalse(image.getexif(), 'Метаданные не удалены')
+        self.assertEqual(default_storage.listdir(
+            f'uploads/{upload["id"]}')[1], [], 'Части не удалены')
+
+    def test_resume(self):
+        """После обрыва загрузка продолжается с полученного места."""
+        data = jpeg()
+        upload = self.start(data).json()
+        self.put(upload, data[:1000], 0)
+        response = self.put(upload, data[500:1000], 500)
+        self.assertEqual(response.status_code, 409)
+        offset = self.authorized_client.get(upload['url']).json()['offset']
+        self.assertEqual(offset, 1000)
+        response = self.put(upload, data[offset:], offset)
+        self.assertEqual(response.json()['state'], Upload.DONE)
+
+    def test_not_an_image(self):
+        """Файл без сигнатуры картинки отклоняется по первой части."""
+        data = b'%PDF-1.4' + b'0' * 5000
+        upload = self.start(data).json()
+        response = self.put(upload, data[:100], 0)
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(Upload.objects.get().state, Upload.FAILED)
+        self.assertEqual(self.put(upload, data[100:], 100).status_code, 409)
+
+    def test_limits(self):
+        """Размер файла и число пикселей ограничены."""
+        with mock.patch('posts.uploads.MAX_BYTES', 100):
+            self.assertEqual(self.start(jpeg()).status_code, 413)
+        data = jpeg()
+        upload = self.start(data).json()
+        with mock.patch('posts.uploads.MAX_PIXELS', 1000):
+            response = self.put(upload, data[:len(data) // 2], 0)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('pixels', response.json()['detail'])
+
+    def test_only_author(self):
+        """Загрузить картинку к чужому посту нельзя."""
+        response = self.start(jpeg(), client=self.authorized_client_2)
+        self.assertEqual(response.status_code, 404)
+        upload = self.start(jpeg()).json()
+        response = self.authorized_client_2.get(upload['url'])
+        self.assertEqual(response.status_code, 404)
+
+    def test_cancel(self):
+        """Отменённая загрузка удаляет полученные части."""
+        data = jpeg()
+        upload = self.start(data).json()
+        self.put(upload, data[:500], 0)
+        response = self.authorized_client.delete(upload['url'])
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(uploads._parts(Upload(pk=upload['id'])), [])
@@ -4,6 +4,12 @@ from django import forms
 
 from .settings import Settings
 from posts.models import Follow, Group, Post
+from yatube import metrics
+
+
+def fragment_hits():
+    return sum(value for _, labels, value in metrics.FRAGMENT_CACHE.samples()
+               if ('result', 'hit') in labels)
 
 
 class ViewsTests(Settings):
@@ -215,20 +221,27 @@ class ViewsTests(Settings):
             )
 
     def test_cache_index(self):
-        """Cache работает верно."""
+        """Cache работает верно и сбрасывается при изменении постов."""
         client = self.authorized_client
+        cache.clear()
+        content = client.get(reverse('index')).content
+        hits = fragment_hits()
         response = client.get(reverse('index'))
-        content = response.content
-        Post.objects.create(
-                text='Тестовый текст' * 5,
+        self.assertEqual(content, response.content, 'Кеширование не работает')
+        self.assertEqual(fragment_hits(), hits + 1,
+                         'Фрагмент не взят из кеша')
+        post = Post.objects.create(
+                text='Новый пост для кеша',
                 author=self.User
             )
         response = client.get(reverse('index'))
-        self.assertEqual(content, response.content, 'Кеширование не работает')
-        cache.clear()
+        self.assertContains(response, 'Новый пост для кеша',
+                            msg_prefix='Новый пост не виден после создания')
+        post.text = 'Исправленный пост'
+        post.save()
         response = client.get(reverse('index'))
-        self.assertNotEqual(content, response.content,
-                            'Кеширование неисправно')
+        self.assertContains(response, 'Исправленный пост',
+                            msg_prefix='Правка поста не видна')
 
     def test_flatpages_context(self):
         """Flatpages сформированны с правильным контекстом."""
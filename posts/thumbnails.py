@@ -0,0 +1,134 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from tasks import queue
+
+from . import cache, cards
+from .models import Post, PostImageVariant
+
+logger = logging.getLogger(__name__)
+
+CARD_WIDTH, CARD_HEIGHT = 960, 339
+WIDTHS = getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 960))
+QUALITY = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+FORMATS = {
+    PostImageVariant.JPEG: ('JPEG', {'quality': QUALITY, 'optimize': True,
+                                     'progressive': True}),
+    PostImageVariant.WEBP: ('WEBP', {'quality': QUALITY, 'method': 4}),
+}
+WORKERS = getattr(settings, 'IMAGE_PIPELINE_WORKERS', 2)
+ASYNC = getattr(settings, 'IMAGE_PIPELINE_ASYNC', True)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """Process-wide pool rendering thumbnails off the request path."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=WORKERS, thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def render_variants(fileobj, widths=WIDTHS, formats=FORMATS):
+    """Yield ``(width, height, format, data)`` for every card variant.
+
+    The image is decoded and center-cropped to the card ratio once, then
+    downscaled for each width and encoded in every format.
+    """
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        largest = max(widths)
+        card = ImageOps.fit(
+            image, (largest, round(largest * CARD_HEIGHT / CARD_WIDTH)),
+            Image.LANCZOS
+        )
+    for width in sorted(widths, reverse=True):
+        height = round(width * CARD_HEIGHT / CARD_WIDTH)
+        if width != card.width:
+            card = card.resize((width, height), Image.LANCZOS)
+        for image_format, (pil_format, options) in formats.items():
+            buffer = io.BytesIO()
+            card.save(buffer, pil_format, **options)
+            yield width, height, image_format, buffer.getvalue()
+
+
+@queue.task(dedupe=True)
+def generate(post_id):
+    """Render the image variants of the post and store their URLs."""
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author_id', 'group_id'
+    ).first()
+    if post is None or not post.image:
+        return None
+    name = post.image.name
+    stem = os.path.splitext(os.path.basename(name))[0]
+    with post.image.open('rb') as source:
+        rendered = list(render_variants(source))
+    variants = []
+    for width, height, image_format, data in rendered:
+        variant = PostImageVariant(post_id=post_id, width=width,
+                                   height=height, format=image_format,
+                                   size=len(data))
+        variant.file.save(f'{post_id}/{stem}-{width}.{image_format}',
+                          ContentFile(data), save=False)
+        variants.append(variant)
+    card = max(
+        (v for v in variants if v.format == PostImageVariant.JPEG),
+        key=lambda v: v.width
+    )
+    with transaction.atomic():
+        # the image may have been replaced while we were rendering
+        updated = Post.objects.filter(pk=post_id, image=name).update(
+            image_card=card.file.url
+        )
+        if updated:
+            for old in PostImageVariant.objects.filter(post_id=post_id):
+                old.delete()
+            PostImageVariant.objects.bulk_create(variants)
+    if not updated:
+        for variant in variants:
+            variant.file.delete(save=False)
+        return None
+    cache.bump_post(post.pk, post.author_id, post.group_id)
+    queue.enqueue(cards.warm_post, post_id)
+    return card.file.url
+
+
+def run(post_id, release=True):
+    """Generate in a worker thread: log failures, release connections."""
+    try:
+        return generate(post_id)
+    except Exception:
+        logger.exception('Thumbnail of post %s failed', post_id)
+    finally:
+        if release:
+            connections.close_all()
+
+
+def schedule(post):
+    """Queue the variants of a saved post once the transaction commits."""
+    if post.image_card:
+        Post.objects.filter(pk=post.pk).update(image_card='')
+        post.image_card = ''
+    if not post.image:
+        return
+    if not queue.EAGER:
+        # a worker renders them and retries failures
+        queue.enqueue_on_commit(generate, post.pk)
+    elif ASYNC:
+        transaction.on_commit(lambda: executor().submit(run, post.pk))
+    else:
+        transaction.on_commit(lambda: generate(post.pk))
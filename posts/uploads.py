@@ -0,0 +1,264 @@
+"""Images uploaded in parts and processed off the request.
+
+An upload is started for a post of the user with the size of the file,
+then its bytes come in parts, each one ``PUT`` at the offset the upload
+has reached and stored as it is read from the request. A client that
+lost a part asks for the offset and goes on from there. The header of
+the image is checked as soon as it has arrived: the magic bytes and
+the format and dimensions Pillow reads without decoding the pixels, so
+a wrong or oversized file is refused before the rest is sent.
+
+Once every byte is in, a worker decodes the whole image, turns it
+upright, drops its metadata by encoding it again and makes it the image
+of the post, whose thumbnails follow as for any other new image.
+"""
+import io
+import os
+import tempfile
+import time
+import warnings
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from tasks import queue
+from yatube import metrics
+
+from . import thumbnails
+from .models import Post, Upload
+
+MAX_BYTES = getattr(settings, 'UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+MAX_PART_BYTES = getattr(settings, 'UPLOAD_MAX_PART_BYTES', 4 * 1024 * 1024)
+MAX_PIXELS = getattr(settings, 'UPLOAD_MAX_PIXELS', 40 * 1000 * 1000)
+QUALITY = getattr(settings, 'UPLOAD_IMAGE_QUALITY', 90)
+# how far into the file to look for the dimensions before refusing it
+HEADER_BYTES = 256 * 1024
+# larger images are assembled in a temporary file instead of in memory
+SPOOL_BYTES = 1024 * 1024
+MAGIC = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+
+
+class UploadError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _part_name(upload_id, offset):
+    # zero padded, so the names sort in the order of the bytes
+    return f'uploads/{upload_id}/{offset:012d}.part'
+
+
+def _parts(upload):
+    directory = f'uploads/{upload.pk}'
+    try:
+        files = default_storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return []
+    return [f'{directory}/{name}' for name in sorted(files)
+            if name.endswith('.part')]
+
+
+def delete_parts(upload):
+    for name in _parts(upload):
+        default_storage.delete(name)
+
+
+def _read(upload, limit=None):
+    """The received bytes, up to ``limit``, in a file object."""
+    buffer = tempfile.SpooledTemporaryFile(SPOOL_BYTES)
+    for name in _parts(upload):
+        with default_storage.open(name, 'rb') as part:
+            for chunk in part.chunks():
+                buffer.write(chunk)
+                if limit is not None and buffer.tell() >= limit:
+                    break
+        if limit is not None and buffer.tell() >= limit:
+            break
+    buffer.seek(0)
+    return buffer
+
+
+def sniff(head):
+    """Format named by the magic bytes, None if there are too few."""
+    if len(head) < 12:
+        return None
+    for magic, image_format in MAGIC:
+        if head.startswith(magic):
+            return image_format
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    raise UploadError(415, 'Not a JPEG, PNG, GIF or WebP image.')
+
+
+def probe(source, complete):
+    """``(format, width, height)`` from the header of the image.
+
+    None means the header is not in yet. Only the header is parsed, the
+    pixels are left for the worker.
+    """
+    image_format = sniff(source.read(12))
+    source.seek(0)
+    if image_format is None:
+        if complete:
+            raise UploadError(415, 'Not a JPEG, PNG, GIF or WebP image.')
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                header = image.format, image.width, image.height
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise UploadError(413, 'The image has too many pixels.')
+    except (OSError, SyntaxError, ValueError):
+        if not complete and source.seek(0, io.SEEK_END) < HEADER_BYTES:
+            return None
+        raise UploadError(415, 'The image header is broken.')
+    if header[0] != image_format:
+        raise UploadError(415, 'The image does not match its signature.')
+    if header[1] * header[2] > MAX_PIXELS:
+        raise UploadError(413, 'The image has too many pixels.')
+    return header
+
+
+def fail(upload, error):
+    """Give up on the upload and free its storage."""
+    Upload.objects.filter(pk=upload.pk).update(state=Upload.FAILED,
+                                               error=error)
+    upload.state, upload.error = Upload.FAILED, error
+    delete_parts(upload)
+    metrics.UPLOADS.inc(result='failed')
+
+
+def start(owner, post, filename, size):
+    """A new upload of ``size`` bytes for the post."""
+    if post.author_id != owner.pk:
+        raise UploadError(403, 'Only the author may change the image.')
+    if not isinstance(size, int) or size < 1:
+        raise UploadError(400, 'size must be a positive number of bytes.')
+    if size > MAX_BYTES:
+        raise UploadError(413, f'Images are limited to {MAX_BYTES} bytes.')
+    return Upload.objects.create(
+        owner=owner, post=post, size=size,
+        filename=os.path.basename(str(filename or 'image'))[:255],
+    )
+
+
+def receive(upload, offset, stream, length):
+    """Store ``length`` bytes read from ``stream`` at ``offset``.
+
+    The part is written to storage as it is read; its name follows from
+    the offset, so a part sent again replaces the one that failed.
+    """
+    if upload.state != Upload.RECEIVING:
+        raise UploadError(409, f'The upload is {upload.state}.')
+    if offset != upload.received:
+        raise UploadError(409, f'Expected the part at {upload.received}.')
+    if not 0 < length <= MAX_PART_BYTES:
+        raise UploadError(413, f'Parts are 1 to {MAX_PART_BYTES} bytes.')
+    if offset + length > upload.size:
+        raise UploadError(400, 'The part goes past the end of the file.')
+    started = time.perf_counter()
+    expected = _part_name(upload.pk, offset)
+    default_storage.delete(expected)
+    name = default_storage.save(expected, File(stream))
+    written = default_storage.size(name)
+    if name != expected or written != length:
+        default_storage.delete(name)
+        raise UploadError(409 if name != expected else 400,
+                          'The part was not stored, send it again.')
+    received = offset + written
+    updated = Upload.objects.filter(
+        pk=upload.pk, state=Upload.RECEIVING, received=offset
+    ).update(received=received)
+    if not updated:
+        default_storage.delete(name)
+        raise UploadError(409, 'Another part was stored at this offset.')
+    upload.received = received
+    metrics.UPLOAD_BYTES.inc(written)
+    metrics.UPLOAD_PART_TIME.observe(time.perf_counter() - started)
+    complete = received == upload.size
+    if not upload.format:
+        _check_header(upload, complete)
+    if complete:
+        upload.state = Upload.PROCESSING
+        Upload.objects.filter(pk=upload.pk).update(state=upload.state)
+        queue.enqueue_on_commit(process, upload.pk)
+    return upload
+
+
+def _check_header(upload, complete):
+    try:
+        with _read(upload, HEADER_BYTES) as source:
+            header = probe(source, complete)
+    except UploadError as error:
+        fail(upload, error.detail)
+        raise
+    if header is not None:
+        upload.format, upload.width, upload.height = header
+        Upload.objects.filter(pk=upload.pk).update(
+            format=upload.format, width=upload.width, height=upload.height
+        )
+
+
+def clean(source):
+    """The fully decoded image, upright and without metadata, encoded.
+
+    Returns the data and its extension: PNG when the image has
+    transparency, JPEG otherwise.
+    """
+    with Image.open(source) as image:
+        image.load()
+        image = ImageOps.exif_transpose(image)
+        transparent = (image.mode in ('RGBA', 'LA', 'PA')
+                       or 'transparency' in image.info)
+        buffer = io.BytesIO()
+        if transparent:
+            image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+            return buffer.getvalue(), 'png'
+        image.convert('RGB').save(buffer, 'JPEG', quality=QUALITY,
+                                  optimize=True, progressive=True)
+        return buffer.getvalue(), 'jpg'
+
+
+@queue.task(max_attempts=3)
+def process(upload_id):
+    """Decode and clean a received upload, then attach it to its post."""
+    upload = Upload.objects.filter(pk=upload_id,
+                                   state=Upload.PROCESSING).first()
+    if upload is None:
+        return
+    started = time.perf_counter()
+    try:
+        with _read(upload) as source:
+            data, extension = clean(source)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        fail(upload, 'The image could not be decoded.')
+        return
+    stem = os.path.splitext(upload.filename)[0] or 'image'
+    name = default_storage.save(f'posts/{stem}.{extension}',
+                                ContentFile(data))
+    with transaction.atomic():
+        post = Post.objects.select_for_update().filter(
+            pk=upload.post_id
+        ).first()
+        if post is None:
+            default_storage.delete(name)
+            return
+        post.image = name
+        post.save(update_fields=['image'])
+        thumbnails.schedule(post)
+        Upload.objects.filter(pk=upload.pk).update(state=Upload.DONE)
+    delete_parts(upload)
+    metrics.UPLOAD_PROCESS_TIME.observe(time.perf_counter() - started)
+    metrics.UPLOADS.inc(result='done')
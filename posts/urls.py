@@ -6,6 +6,7 @@ urlpatterns = [
     path("group/<slug:slug>/", views.group_post, name="group"),
     path("group/", views.groups, name="groups"),
     path("new/", views.new_post, name="new_post"),
+    path("search/", views.search, name="search"),
     path("follow/", views.follow_index, name="follow_index"),
     path(
         "<str:username>/follow/", views.profile_follow,
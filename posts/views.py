@@ -3,41 +3,55 @@ from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
+from . import search as search_index, streaming, thumbnails
+from .cache import versions
+from .conditional import (group_state, groups_state, index_state,
+                          post_state, profile_state, validated_by)
+from .feed import feed_posts
 from .forms import CommentForm, PostForm
+from .loaders import load_comments, load_posts
 from .models import Post, Group, Follow
+from .page_cache import cached_for_anonymous
+from .paginator import COMMENT_KEYS, FEED_KEYS, PER_PAGE, paginate
 
 User = get_user_model()
 
 
+@validated_by(index_state)
+@cached_for_anonymous(index_state)
 def index(request):
     """Dialpaying posts on the homepage."""
-    all_posts = Post.objects.all()
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    all_posts = load_posts()
+    paginator, page = streaming.paginate(request, all_posts)
+    return streaming.render_listing(
         request,
         'index.html',
-        {'page': page, 'paginator': paginator}
+        {'page': page, 'paginator': paginator,
+         'cache_version': index_state(request).version}
         )
 
 
+@validated_by(group_state)
+@cached_for_anonymous(group_state)
 def group_post(request, slug):
     """Displaying posts on the group/slug page."""
-    group = get_object_or_404(Group, slug=slug)
-    all_posts = group.posts.all()
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    state = group_state(request, slug=slug)
+    group = state.group
+    all_posts = load_posts(group.posts.all())
+    paginator, page = streaming.paginate(request, all_posts)
     context = {
         'group': group,
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        'cache_version': state.version
     }
-    return render(request, 'group.html', context)
+    return streaming.render_listing(request, 'group.html', context)
 
 
+@validated_by(groups_state)
+@cached_for_anonymous(groups_state)
 def groups(request):
     """Displaying groups on the group page."""
     all_groups = Group.objects.all()
@@ -51,7 +65,24 @@ def groups(request):
         )
 
 
+def search(request):
+    """Displaying posts found by the search query."""
+    query = request.GET.get('q', '').strip()
+    found = search_index.search_ids(query) if query else []
+    paginator = Paginator(found, PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    page.page_numbers = paginator.page_range
+    posts = load_posts().in_bulk(page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return render(
+        request,
+        'search.html',
+        {'page': page, 'paginator': paginator, 'query': query}
+        )
+
+
 @login_required
+@transaction.atomic
 def new_post(request):
     """Displaying a form for adding posts."""
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -59,67 +90,66 @@ def new_post(request):
         data = form.save(commit=False)
         data.author = request.user
         data.save()
+        thumbnails.schedule(data)
         return redirect('index')
     return render(request, 'new_post.html', {'form': form})
 
 
+@validated_by(profile_state)
+@cached_for_anonymous(profile_state)
 def profile(request, username):
     """Displaying posts on the profile."""
-    author = get_object_or_404(User, username=username)
-    all_posts = author.posts.all()
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
-    else:
-        following = False
-    count_follower = author.following.all().count()
-    count_following = author.follower.all().count()
-    paginator = Paginator(all_posts, 10)
-    count = paginator.count
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    state = profile_state(request, username=username)
+    author, stats = state.author, state.stats
+    all_posts = load_posts(author.posts.all())
+    paginator, page = streaming.paginate(request, all_posts,
+                                         count=stats.posts_count)
     context = {
         'page': page,
         'paginator': paginator,
-        'count': count,
+        'count': stats.posts_count,
         'author': author,
-        'following': following,
-        'count_follower': count_follower,
-        'count_following': count_following
+        'following': state.following,
+        'count_follower': stats.followers_count,
+        'count_following': stats.following_count,
+        'cache_version': state.version
     }
-    return render(request, 'profile.html', context)
+    return streaming.render_listing(request, 'profile.html', context)
 
 
+@validated_by(post_state)
+@cached_for_anonymous(post_state)
 def post_view(request, username, post_id):
     """Displaying one post."""
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    author = post.author
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
-    else:
-        following = False
-    count_follower = author.following.all().count()
-    count_following = author.follower.all().count()
+    state = post_state(request, username=username, post_id=post_id)
+    author, stats = state.author, state.stats
+    post = get_object_or_404(
+        Post.objects.select_related('group').prefetch_related('variants'),
+        author=author, id=post_id
+        )
+    post.author = author
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    paginator = Paginator(comments, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    count = post.author.posts.all().count()
+    comments = load_comments(post.comments.all())
+    paginator, page = paginate(
+        request, comments, COMMENT_KEYS, count=post.comment_count
+        )
     context = {
         'post': post,
-        'count': count,
+        'count': stats.posts_count,
         'for_pytest': comments,  # костыль для pytest.
         'comments': page,
         'form': form,
         'paginator': paginator,
-        'following': following,
-        'count_follower': count_follower,
-        'count_following': count_following
+        'following': state.following,
+        'count_follower': stats.followers_count,
+        'count_following': stats.following_count,
+        'cache_version': state.version
     }
     return render(request, 'post.html', context)
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, username, post_id):
     """Displaying a form for edit post."""
     post = get_object_or_404(Post, author__username=username, id=post_id)
@@ -128,13 +158,17 @@ def post_edit(request, username, post_id):
         form = PostForm(request.POST or None, files=request.FILES or None,
                         instance=post)
         if form.is_valid():
-            form.save()
+            # comment_count ведут сигналы, не перезаписываем его
+            form.save(commit=False).save(update_fields=PostForm.Meta.fields)
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
             return redirect('post', author, post_id)
         return render(request, 'new_post.html', {'form': form, 'post': post})
     return redirect('post', author, post_id)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     """Displaying a for for add comment."""
     post = get_object_or_404(Post, author__username=username, id=post_id)
@@ -150,17 +184,17 @@ def add_comment(request, username, post_id):
 @login_required
 def follow_index(request):
     """Displaying posts for subscribe."""
-    all_posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    all_posts = load_posts(feed_posts(request.user))
+    paginator, page = streaming.paginate(request, all_posts, FEED_KEYS)
+    return streaming.render_listing(
         request, 'follow.html',
-        {'page': page, 'paginator': paginator}
+        {'page': page, 'paginator': paginator,
+         'cache_version': versions(('all',), ('feed', request.user.pk))}
         )
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Subscribe to author."""
     author = get_object_or_404(User, username=username)
@@ -175,6 +209,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Unsubscribe from author."""
     author = get_object_or_404(User, username=username)
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "args", "state", "attempts", "run_at")
+    search_fields = ("name",)
+    list_filter = ("state", "name")
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,87 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import queue
+
+
+def _worker(stop, options):
+    # the parent stops the workers, Ctrl-C must not kill a running task
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    try:
+        counts = queue.work(stop, options['burst'], options['poll'],
+                            options['batch_size'])
+    finally:
+        connections.close_all()
+    queue.logger.info('Worker stopped: %s', counts)
+
+
+class Command(BaseCommand):
+    help = ('Run queued background tasks in a pool of worker processes '
+            'until interrupted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=getattr(settings, 'TASKS_WORKERS', 2),
+                            help='Processes running tasks, 1 to run them '
+                                 'in this process.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due.')
+        parser.add_argument('--poll', type=float, default=queue.POLL_SECONDS,
+                            help='Seconds to wait when no job is due.')
+        parser.add_argument('--batch-size', type=int,
+                            default=queue.BATCH_SIZE,
+                            help='Jobs leased at once by a worker.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Queue the failed jobs again first.')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Queued {queue.retry_failed()} failed jobs '
+                              f'again.')
+        if options['workers'] <= 1:
+            self.run_here(options)
+        else:
+            self.run_pool(options)
+
+    def run_here(self, options):
+        stop = multiprocessing.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            counts = queue.work(stop, options['burst'], options['poll'],
+                                options['batch_size'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Done {counts["done"]} jobs, retried {counts["retried"]}, '
+            f'failed {counts["failed"]}.'
+        ))
+
+    def run_pool(self, options):
+        # forked workers inherit the configured project, not the
+        # connections: each one opens its own
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        workers = [
+            context.Process(target=_worker, args=(stop, options),
+                            name=f'tasks-{number}')
+            for number in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {len(workers)} workers.')
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the running tasks...')
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class Job(models.Model):
+    """A queued call of a task function; done jobs are deleted."""
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATES = (
+        (QUEUED, 'В очереди'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField("Задача", max_length=200)
+    args = models.TextField("Аргументы", default='[]')
+    # set while the job waits, so the same call is queued once
+    key = models.CharField(max_length=255, unique=True, null=True,
+                           blank=True, editable=False)
+    state = models.CharField("Состояние", max_length=10, choices=STATES,
+                             default=QUEUED)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Предел попыток", default=5)
+    run_at = models.DateTimeField("Запустить после")
+    locked_by = models.CharField(max_length=64, blank=True, editable=False)
+    locked_until = models.DateTimeField(null=True, blank=True,
+                                        editable=False)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created = models.DateTimeField("Создана", auto_now_add=True)
+
+    class Meta:
+        ordering = ["run_at", "id"]
+        indexes = [
+            models.Index(fields=['state', 'run_at'], name='job_state_run_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}{self.args}'
@@ -0,0 +1,175 @@
+"""Database-backed queue running side effects of writes in the background.
+
+A task is a module-level function marked with ``@task``; its arguments
+must be JSON-serializable, like primary keys. ``enqueue`` inserts a job
+in the current transaction, so it is committed or rolled back together
+with the write that caused it. ``enqueue_on_commit`` waits for the
+commit instead, for tasks that must see the committed rows or files.
+Tasks marked ``dedupe`` are queued once per arguments while waiting.
+
+Workers (``manage.py run_workers``) claim due jobs with one UPDATE that
+leases them for ``LEASE_SECONDS``, so a job of a crashed worker runs
+again once its lease expires: tasks run at least once and have to be
+idempotent. A failed job is retried with exponential backoff and kept
+as failed after ``max_attempts``. With ``TASKS_EAGER`` the jobs run in
+the process instead, when they would be queued; that is how a
+development server or the tests work without workers.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+EAGER = getattr(settings, 'TASKS_EAGER', False)
+MAX_ATTEMPTS = getattr(settings, 'TASKS_MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = getattr(settings, 'TASKS_BACKOFF_SECONDS', 2)
+MAX_BACKOFF_SECONDS = getattr(settings, 'TASKS_MAX_BACKOFF_SECONDS', 600)
+LEASE_SECONDS = getattr(settings, 'TASKS_LEASE_SECONDS', 300)
+POLL_SECONDS = getattr(settings, 'TASKS_POLL_SECONDS', 1)
+BATCH_SIZE = 10
+
+
+def task(func=None, *, max_attempts=MAX_ATTEMPTS, dedupe=False):
+    """Mark a module-level function as a task; it stays callable as is."""
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        func.dedupe = dedupe
+        return func
+    return decorator if func is None else decorator(func)
+
+
+def _job(func, args, delay=0):
+    encoded = json.dumps(args)
+    return Job(
+        name=func.task_name, args=encoded,
+        key=f'{func.task_name}:{encoded}'[:255] if func.dedupe else None,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(func, *args, delay=0):
+    """Queue the task in the current transaction, run it now if eager."""
+    if EAGER:
+        return func(*args)
+    # a waiting job with the same key already covers this call
+    Job.objects.bulk_create([_job(func, args, delay)],
+                            ignore_conflicts=True)
+
+
+def enqueue_on_commit(func, *args, delay=0):
+    """Queue the task once the current transaction commits."""
+    transaction.on_commit(lambda: enqueue(func, *args, delay=delay))
+
+
+def backoff(attempts):
+    """Seconds to wait before the next attempt, with jitter."""
+    delay = min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim(limit=BATCH_SIZE, lease=LEASE_SECONDS):
+    """Lease up to ``limit`` due jobs to this worker, oldest first."""
+    now = timezone.now()
+    token = worker_name()[-64:]
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    due = Job.objects.filter(free, state=Job.QUEUED, run_at__lte=now)
+    # one statement: two workers never lease the same job, and the
+    # free condition is checked again on rows another worker changed
+    Job.objects.filter(
+        free, pk__in=due.order_by('run_at', 'id').values('pk')[:limit]
+    ).update(locked_by=token, locked_until=now + timedelta(seconds=lease),
+             attempts=F('attempts') + 1, key=None)
+    return list(Job.objects.filter(locked_by=token))
+
+
+def execute(job):
+    """Run a leased job, then delete it, retry it later or fail it.
+
+    Returns ``'done'``, ``'retried'`` or ``'failed'``.
+    """
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    try:
+        func = import_string(job.name)
+        with transaction.atomic():
+            func(*json.loads(job.args))
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            logger.warning('Job %s %s failed, attempt %s of %s', job.pk,
+                           job.name, job.attempts, job.max_attempts)
+            mine.update(locked_by='', locked_until=None, last_error=error,
+                        run_at=timezone.now() + timedelta(
+                            seconds=backoff(job.attempts)))
+            return 'retried'
+        logger.error('Job %s %s failed for good', job.pk, job.name)
+        mine.update(state=Job.FAILED, locked_by='', locked_until=None,
+                    last_error=error)
+        return 'failed'
+    mine.delete()
+    return 'done'
+
+
+def _release():
+    # what request_started and request_finished do; a caller's transaction
+    # (like the one of a test) keeps its connection
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def work(stop=None, burst=False, poll=POLL_SECONDS, batch_size=BATCH_SIZE):
+    """Run due jobs until ``stop`` is set, or the queue is empty if burst.
+
+    Returns how many jobs were done, retried and failed.
+    """
+    counts = {'done': 0, 'retried': 0, 'failed': 0}
+    while stop is None or not stop.is_set():
+        _release()
+        try:
+            jobs = claim(batch_size)
+            for job in jobs:
+                counts[execute(job)] += 1
+        except DatabaseError:
+            # the database may be restarting, try again after a pause
+            logger.exception('Claiming jobs failed')
+            jobs = []
+        finally:
+            _release()
+        if not jobs:
+            if burst:
+                break
+            if stop is None:
+                time.sleep(poll)
+            else:
+                stop.wait(poll)
+    return counts
+
+
+def retry_failed(name=None):
+    """Queue the failed jobs again, return how many."""
+    failed = Job.objects.filter(state=Job.FAILED)
+    if name:
+        failed = failed.filter(name=name)
+    return failed.update(state=Job.QUEUED, attempts=0,
+                         run_at=timezone.now(), last_error='')
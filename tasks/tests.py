@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import thumbnails
+from posts.models import FeedEntry, Follow, Post
+from tasks import queue
+from tasks.models import Job
+
+User = get_user_model()
+CALLS = []
+
+
+@queue.task(dedupe=True)
+def record(value):
+    CALLS.append(value)
+
+
+@queue.task(max_attempts=2)
+def explode():
+    raise RuntimeError('Ошибка задачи')
+
+
+def run_now(callback):
+    callback()
+
+
+@mock.patch('tasks.queue.EAGER', False)
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_work(self):
+        """Задача ставится в очередь и выполняется воркером."""
+        queue.enqueue(record, 1)
+        self.assertEqual(CALLS, [], 'Задача выполнена без воркера')
+        counts = queue.work(burst=True)
+        self.assertEqual(counts['done'], 1)
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Job.objects.exists(), 'Выполненная задача осталась')
+
+    def test_dedupe(self):
+        """Одинаковые ожидающие задачи ставятся в очередь один раз."""
+        queue.enqueue(record, 1)
+        queue.enqueue(record, 1)
+        queue.enqueue(record, 2)
+        queue.work(burst=True)
+        self.assertEqual(sorted(CALLS), [1, 2])
+
+    def test_claimed_job_is_leased(self):
+        """Взятая воркером задача недоступна другим до конца аренды."""
+        queue.enqueue(record, 1)
+        self.assertEqual(len(queue.claim()), 1)
+        self.assertEqual(queue.claim(), [], 'Задачу взяли дважды')
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        job, = queue.claim()
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача повторяется позже, затем помечается неудачной."""
+        queue.enqueue(explode)
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertEqual(queue.work(burst=True)['retried'], 1)
+        job = Job.objects.get()
+        self.assertGreater(job.run_at, timezone.now(), 'Повтор без паузы')
+        self.assertIn('Ошибка задачи', job.last_error)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertEqual(queue.work(burst=True)['failed'], 1)
+        self.assertEqual(Job.objects.get().state, Job.FAILED)
+        self.assertEqual(queue.retry_failed(), 1)
+        self.assertEqual(Job.objects.get().state, Job.QUEUED)
+
+    def test_enqueue_on_commit(self):
+        """enqueue_on_commit ставит задачу в очередь после коммита."""
+        with mock.patch('tasks.queue.transaction.on_commit') as on_commit:
+            queue.enqueue_on_commit(record, 1)
+            self.assertFalse(Job.objects.exists())
+            on_commit.call_args[0][0]()
+        self.assertEqual(Job.objects.get().name, record.task_name)
+
+    def test_eager(self):
+        """Без воркеров задача выполняется сразу."""
+        with mock.patch('tasks.queue.EAGER', True):
+            queue.enqueue(record, 1)
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_workers_command(self):
+        """Команда run_workers выполняет очередь и сообщает итог."""
+        queue.enqueue(record, 1)
+        out = StringIO()
+        call_command('run_workers', workers=1, burst=True, stdout=out)
+        self.assertIn('Done 1 jobs', out.getvalue())
+
+
+@mock.patch('tasks.queue.EAGER', False)
+class SideEffectTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+
+    def test_fan_out_runs_in_worker(self):
+        """Рассылка поста по лентам выполняется воркером."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        queue.work(burst=True)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists(),
+            'Пост не попал в ленту подписчика'
+            )
+
+    @mock.patch('tasks.queue.transaction.on_commit', run_now)
+    def test_thumbnails_are_queued(self):
+        """Превью новой картинки готовит воркер."""
+        post = Post.objects.create(text='Пост', author=self.author,
+                                   image='posts/missing.gif')
+        thumbnails.schedule(post)
+        self.assertTrue(
+            Job.objects.filter(name=thumbnails.generate.task_name).exists()
+            )
@@ -0,0 +1,130 @@
+"""Idle database connections kept for reuse inside one process.
+
+Django opens a connection per thread and closes it at the end of the
+request when ``CONN_MAX_AGE`` runs out. With ``POOL_SIZE`` in the
+database settings the closed connections are parked here instead and
+handed to the next thread that connects, which saves the handshake (and
+on SQLite the pragmas) of a new connection. ``CONN_MAX_AGE`` still
+bounds the life of a connection from the moment it was opened: older
+ones are closed rather than parked, and a parked one is checked with
+``is_usable()`` before it is handed out.
+"""
+import os
+import threading
+import time
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, size):
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _forget_parent(self):
+        # connections inherited through fork belong to the parent process
+        if self._pid != os.getpid():
+            self._idle, self._pid = [], os.getpid()
+
+    def get(self):
+        """``(connection, opened)`` of an idle connection, or None."""
+        with self._lock:
+            self._forget_parent()
+            return self._idle.pop() if self._idle else None
+
+    def put(self, connection, opened):
+        """Park the connection, return False if the pool is full.
+
+        ``opened`` is the ``time.time()`` the connection was opened at.
+        """
+        with self._lock:
+            self._forget_parent()
+            if len(self._idle) >= self.size:
+                return False
+            self._idle.append((connection, opened))
+            return True
+
+    def clear(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            connection.close()
+
+
+def pool_for(settings_dict):
+    """Pool of the database described by the settings, None if disabled."""
+    size = settings_dict.get('POOL_SIZE', 0)
+    if not size:
+        return None
+    key = tuple(settings_dict.get(name) for name in
+                ('ENGINE', 'NAME', 'HOST', 'PORT', 'USER'))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(size)
+        return _pools[key]
+
+
+class PooledDatabaseWrapper:
+    """Mixin for a ``DatabaseWrapper`` taking connections from the pool."""
+
+    opened_at = None
+
+    def connect(self):
+        super().connect()
+        # a connection from the pool is as old as when it was opened
+        if self.close_at is not None:
+            self.close_at = (self.opened_at
+                             + self.settings_dict['CONN_MAX_AGE'])
+
+    def get_new_connection(self, conn_params):
+        pool = pool_for(self.settings_dict)
+        while pool is not None:
+            idle = pool.get()
+            if idle is None:
+                break
+            connection, self.opened_at = idle
+            if not self._obsolete() and self._usable(connection):
+                return connection
+            _discard(connection)
+        self.opened_at = time.time()
+        return super().get_new_connection(conn_params)
+
+    def _obsolete(self):
+        max_age = self.settings_dict['CONN_MAX_AGE']
+        return max_age is not None and time.time() >= self.opened_at + max_age
+
+    def _usable(self, connection):
+        if getattr(connection, 'closed', 0):
+            return False
+        # is_usable() checks the connection of the wrapper
+        saved, self.connection = self.connection, connection
+        try:
+            return self.is_usable()
+        finally:
+            self.connection = saved
+
+    def _close(self):
+        pool = pool_for(self.settings_dict)
+        # a connection that failed or is inside atomic() is not trusted
+        if (pool is None or self.errors_occurred or self.in_atomic_block
+                or self._obsolete()):
+            return super()._close()
+        try:
+            with self.wrap_database_errors:
+                self.connection.rollback()
+        except Exception:
+            return super()._close()
+        if not pool.put(self.connection, self.opened_at):
+            return super()._close()
+
+
+def _discard(connection):
+    try:
+        connection.close()
+    except Exception:
+        # the server may have dropped it already
+        pass
@@ -0,0 +1,26 @@
+"""Replication stand-in for local SQLite replicas.
+
+Real replicas follow the primary by themselves. To try the replica
+router locally, ``replicate_sqlite`` copies the primary file over the
+replica files with the online backup API every few seconds: readers of
+a replica see the old snapshot until the copy commits, then the new one.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy(source, target):
+    """Copy the SQLite database of one DB-API connection into another."""
+    source.backup(target)
+
+
+def sync(alias):
+    """Overwrite the replica with a snapshot of the primary."""
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+    if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+        raise ValueError('Only SQLite replicas are copied')
+    if primary.settings_dict['NAME'] == replica.settings_dict['NAME']:
+        # a test mirror of the primary
+        return
+    primary.ensure_connection()
+    replica.ensure_connection()
+    copy(primary.connection, replica.connection)
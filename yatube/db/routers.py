@@ -0,0 +1,92 @@
+"""Reads from the replicas, writes to the primary.
+
+Replica reads are opt-in: ``ReplicaMiddleware`` turns them on for safe
+requests of clients that have not written for ``DATABASE_PIN_SECONDS``.
+Everything else, management commands included, reads the primary. Once
+the request writes, or while a transaction on the primary is open, the
+rest of the request reads the primary too, and the response pins the
+client to it with a cookie until the replicas have caught up.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# longer than the replication lag: what the client wrote must be there
+PIN_SECONDS = getattr(settings, 'DATABASE_PIN_SECONDS', 5)
+PIN_COOKIE = 'yatube_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+class ReadState:
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def _state():
+    return getattr(_local, 'state', None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads(replica=True):
+    """Let the reads of this thread go to a replica inside the block."""
+    previous = _state()
+    state = _local.state = ReadState(replica)
+    try:
+        yield state
+    finally:
+        _local.state = previous
+
+
+def reads_replica():
+    """Whether a read of this thread would now go to a replica."""
+    state = _state()
+    return bool(
+        state is not None and state.replica and not state.wrote
+        and replicas()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reads_replica():
+            return random.choice(replicas())
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (request.method not in SAFE_METHODS
+                  or PIN_COOKIE in request.COOKIES)
+        with replica_reads(not pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
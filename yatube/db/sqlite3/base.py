@@ -0,0 +1,32 @@
+"""SQLite tuned for concurrent web workers.
+
+In WAL mode readers and the writer no longer block each other, and a
+commit only appends to the log, so ``synchronous=NORMAL`` is safe: a
+power loss may drop the last commits but never corrupts the file. The
+busy timeout is the ``timeout`` option of the database settings.
+"""
+from django.db.backends.sqlite3 import base
+
+from ..pool import PooledDatabaseWrapper
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # negative sizes are in KiB
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class TunedDatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict.get('PRAGMAS', PRAGMAS)
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+
+class DatabaseWrapper(PooledDatabaseWrapper, TunedDatabaseWrapper):
+    pass
@@ -0,0 +1,377 @@
+"""In-process request metrics exported in the Prometheus text format.
+
+``MetricsMiddleware`` counts the SQL queries, SQL time, template render
+time, fragment cache hits and latency of every request and adds them to
+histograms labelled by URL name. Each worker process keeps its own
+aggregates; ``/metrics/`` shows the ones of the process serving it.
+
+With ``METRICS_TEMPLATE_PROFILE`` every template, include and inclusion
+tag rendered by a request is timed too. Its own time, without the
+templates it renders in turn, is added to a counter per view and
+template and the slowest ones are sent in a ``Server-Timing`` header.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import HttpResponse
+from django.template import base
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+# queries slower than this many milliseconds are logged, None disables
+SLOW_QUERY_MS = getattr(settings, 'METRICS_SLOW_QUERY_MS', None)
+# views that run more queries than their budget are logged and counted
+QUERY_BUDGETS = getattr(settings, 'METRICS_QUERY_BUDGETS', {})
+PROFILE_TEMPLATES = getattr(settings, 'METRICS_TEMPLATE_PROFILE', False)
+# templates listed in the Server-Timing header, slowest first
+SERVER_TIMING_TEMPLATES = 10
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_lock = threading.Lock()
+_local = threading.local()
+_template_render = None
+_template_part_render = None
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            yield self.name, key, value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                # a count per bucket and +Inf, then the sum
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def totals(self, **labels):
+        """``(count, sum)`` of the observations with the labels."""
+        with _lock:
+            series = self._series.get(tuple(sorted(labels.items())))
+            if series is None:
+                return 0, 0
+            return sum(series[:-1]), series[-1]
+
+    def samples(self):
+        with _lock:
+            series = {key: list(value) for key, value in self._series.items()}
+        for key, values in sorted(series.items()):
+            total = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                total += count
+                yield f'{self.name}_bucket', (*key, ('le', bound)), total
+            yield f'{self.name}_sum', key, values[-1]
+            yield f'{self.name}_count', key, total
+
+
+REQUESTS = Counter('yatube_requests_total', 'Requests served.')
+LATENCY = Histogram('yatube_request_duration_seconds',
+                    'Time to build the response.', SECONDS)
+SQL_QUERIES = Histogram('yatube_sql_queries',
+                        'SQL queries per request.', QUERIES)
+SQL_TIME = Histogram('yatube_sql_duration_seconds',
+                     'Time spent in SQL per request.', SECONDS)
+TEMPLATE_TIME = Histogram('yatube_template_duration_seconds',
+                          'Time spent rendering templates per request, '
+                          'including the queries they run.', SECONDS)
+FRAGMENT_CACHE = Counter('yatube_fragment_cache_total',
+                         'Fragment cache lookups by result.')
+PAGE_CACHE = Counter('yatube_page_cache_total',
+                     'Anonymous full-page cache lookups by result.')
+OVER_BUDGET = Counter('yatube_query_budget_exceeded_total',
+                      'Requests running more queries than the budget.')
+TEMPLATE_SELF_TIME = Counter('yatube_template_self_seconds_total',
+                             'Time spent in each template without the '
+                             'templates it renders, when profiled.')
+UPLOAD_BYTES = Counter('yatube_upload_bytes_total',
+                       'Bytes of image uploads stored.')
+UPLOAD_PART_TIME = Histogram('yatube_upload_part_duration_seconds',
+                             'Time to receive and store a part of an '
+                             'upload; bytes over its sum is the upload '
+                             'throughput.', SECONDS)
+UPLOADS = Counter('yatube_uploads_total', 'Image uploads by outcome.')
+UPLOAD_PROCESS_TIME = Histogram('yatube_upload_processing_seconds',
+                                'Time to decode, clean and re-encode an '
+                                'uploaded image.', SECONDS)
+METRICS = (REQUESTS, LATENCY, SQL_QUERIES, SQL_TIME, TEMPLATE_TIME,
+           FRAGMENT_CACHE, PAGE_CACHE, OVER_BUDGET, TEMPLATE_SELF_TIME,
+           UPLOAD_BYTES, UPLOAD_PART_TIME, UPLOADS, UPLOAD_PROCESS_TIME)
+
+
+class RequestStats:
+    """What the request currently being served has spent so far."""
+
+    def __init__(self, path):
+        self.path = path
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+        # template name: [renders, seconds, own seconds], when profiled
+        self.templates = None
+        self._frames = []
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.sql_time += elapsed
+            if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+                logger.warning('Slow query (%.1f ms) on %s: %s',
+                               elapsed * 1000, self.path, sql)
+
+
+def current():
+    """Stats of the request served by this thread, if it is measured."""
+    return getattr(_local, 'stats', None)
+
+
+def count_cache(hit):
+    stats = current()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def _instrument_templates():
+    """Time the top-level template renders of the measured requests."""
+    global _template_render
+    if _template_render is not None:
+        return
+    _template_render = Template.render
+
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None or stats.rendering:
+            return _template_render(self, context, request)
+        stats.rendering = True
+        start = time.perf_counter()
+        try:
+            return _template_render(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+            stats.rendering = False
+
+    Template.render = render
+
+
+def _instrument_template_parts():
+    """Time every template render, includes and inclusion tags too."""
+    global _template_part_render
+    if _template_part_render is not None:
+        return
+    _template_part_render = base.Template._render
+
+    def _render(self, context):
+        stats = current()
+        if stats is None or stats.templates is None:
+            return _template_part_render(self, context)
+        # seconds spent in the templates this one renders
+        children = [0.0]
+        stats._frames.append(children)
+        start = time.perf_counter()
+        try:
+            return _template_part_render(self, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats._frames.pop()
+            if stats._frames:
+                stats._frames[-1][0] += elapsed
+            entry = stats.templates.setdefault(self.name or '<string>',
+                                               [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += elapsed - children[0]
+
+    base.Template._render = _render
+
+
+@contextmanager
+def template_profile():
+    """Profile the templates rendered in the block by this thread.
+
+    Yields the dict of template name to ``[renders, seconds, own
+    seconds]``, filled in as they render.
+    """
+    _instrument_template_parts()
+    saved = current()
+    stats = _local.stats = RequestStats('profile')
+    stats.templates = {}
+    try:
+        yield stats.templates
+    finally:
+        _local.stats = saved
+
+
+def server_timing(templates, limit=SERVER_TIMING_TEMPLATES):
+    """``Server-Timing`` entries of the templates taking most own time."""
+    slowest = sorted(templates.items(), key=lambda item: -item[1][2])
+    return ', '.join(
+        f'tpl{number};desc="{name} x{renders}";dur={own * 1000:.2f}'
+        for number, (name, (renders, _, own))
+        in enumerate(slowest[:limit])
+    )
+
+
+def record(view, status, stats, elapsed):
+    REQUESTS.inc(view=view, status=status)
+    LATENCY.observe(elapsed, view=view)
+    SQL_QUERIES.observe(stats.queries, view=view)
+    SQL_TIME.observe(stats.sql_time, view=view)
+    TEMPLATE_TIME.observe(stats.template_time, view=view)
+    if stats.cache_hits:
+        FRAGMENT_CACHE.inc(stats.cache_hits, view=view, result='hit')
+    if stats.cache_misses:
+        FRAGMENT_CACHE.inc(stats.cache_misses, view=view, result='miss')
+    for name, (_, _, own) in (stats.templates or {}).items():
+        TEMPLATE_SELF_TIME.inc(own, view=view, template=name)
+    budget = QUERY_BUDGETS.get(view)
+    if budget is not None and stats.queries > budget:
+        OVER_BUDGET.inc(view=view)
+        logger.warning('%s ran %d queries, its budget is %d',
+                       stats.path, stats.queries, budget)
+
+
+@contextmanager
+def _measuring(stats):
+    """Count what this thread spends in the block into ``stats``."""
+    saved = current()
+    _local.stats = stats
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(stats.execute)
+                )
+            yield
+    finally:
+        _local.stats = saved
+
+
+def _streamed(chunks, stats):
+    # each chunk renders its part of the page, measure it like the view
+    chunks = iter(chunks)
+    while True:
+        with _measuring(stats):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class MetricsMiddleware:
+    """Measure every request and record it once the response is built.
+
+    The parts of a streamed response render while it is sent, so such a
+    request is recorded when the response is closed. Its Server-Timing
+    header has gone out by then and is left out.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        stats = RequestStats(request.path)
+        if PROFILE_TEMPLATES:
+            _instrument_template_parts()
+            stats.templates = {}
+        start = time.perf_counter()
+        with _measuring(stats):
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+        if response.streaming:
+            self.record_on_close(response, view, stats, start)
+            return response
+        record(view, response.status_code, stats,
+               time.perf_counter() - start)
+        if stats.templates:
+            response['Server-Timing'] = server_timing(stats.templates)
+        return response
+
+    def record_on_close(self, response, view, stats, start):
+        response.streaming_content = _streamed(response.streaming_content,
+                                               stats)
+        close = response.close
+
+        def closed():
+            # servers and the test client may both close the response
+            response.close = close
+            try:
+                close()
+            finally:
+                record(view, response.status_code, stats,
+                       time.perf_counter() - start)
+
+        response.close = closed
+
+
+def _labels(key):
+    if not key:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in key)
+    return '{' + pairs + '}'
+
+
+def export():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, key, value in metric.samples():
+            lines.append(f'{name}{_labels(key)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+@staff_member_required
+def metrics_view(request):
+    """Metrics of this process for Prometheus."""
+    return HttpResponse(export(),
+                        content_type='text/plain; version=0.0.4')
@@ -38,6 +38,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'users',
     'posts',
+    'tasks',
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -51,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.db.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,12 +65,28 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Шаблоны: 'debug' перечитывает файлы при каждом рендере, 'cached' держит
+# скомпилированные шаблоны в памяти процесса (продакшен, YATUBE_TEMPLATES)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_PROFILES = {
+    'debug': {'loaders': TEMPLATE_LOADERS, 'debug': True},
+    'cached': {
+        'loaders': [('django.template.loaders.cached.Loader',
+                     TEMPLATE_LOADERS)],
+        'debug': False,
+    },
+}
+TEMPLATE_PROFILE = os.environ.get('YATUBE_TEMPLATES',
+                                  'debug' if DEBUG else 'cached')
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            **TEMPLATE_PROFILES[TEMPLATE_PROFILE],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -85,12 +104,53 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# База: sqlite (WAL, см. yatube/db/sqlite3) или postgresql для продакшена.
+# Выбирается переменной окружения YATUBE_DB, параметры — YATUBE_DB_*.
+DATABASE_BACKENDS = {
+    'sqlite': {
+        'ENGINE': 'yatube.db.sqlite3',
+        'NAME': os.environ.get('YATUBE_DB_NAME',
+                               os.path.join(BASE_DIR, 'db.sqlite3')),
+        # сколько секунд писатель ждёт блокировку, прежде чем сдаться
+        'OPTIONS': {'timeout': 20},
+    },
+    'postgresql': {
+        'ENGINE': 'yatube.db.postgresql',
+        'NAME': os.environ.get('YATUBE_DB_NAME', 'yatube'),
+        'USER': os.environ.get('YATUBE_DB_USER', 'yatube'),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('YATUBE_DB_PORT', '5432'),
+    },
+}
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **DATABASE_BACKENDS[os.environ.get('YATUBE_DB', 'sqlite')],
+        # соединение живёт между запросами потока столько секунд
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+        # сколько закрытых соединений процесс держит для повторного
+        # использования, 0 отключает пул
+        'POOL_SIZE': int(os.environ.get('YATUBE_DB_POOL_SIZE', 8)),
     }
 }
+# Реплики для чтения: YATUBE_DB_REPLICAS через запятую — файлы для sqlite
+# (их обновляет manage.py replicate_sqlite) или хосты для postgresql.
+REPLICA_SETTING = {'yatube.db.sqlite3': 'NAME', 'yatube.db.postgresql': 'HOST'}
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(','))):
+    alias = f'replica{number + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        REPLICA_SETTING[DATABASES['default']['ENGINE']]: location,
+        # в тестах реплика — та же база, что и основная
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['yatube.db.routers.ReplicaRouter']
+# после записи клиент читает с основной базы столько секунд,
+# это время должно быть больше отставания реплик
+DATABASE_PIN_SECONDS = 5
 
 
 # Password validation
@@ -115,9 +175,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Кеш: locmem годится для одного процесса, sqlite, file и memcached
+# общие для всех воркеров. Выбирается переменной окружения YATUBE_CACHE.
+CACHE_LOCATION = os.environ.get(
+    'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+)
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sqlite': {
+        'BACKEND': 'yatube.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_LOCATION, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION,
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   '127.0.0.1:11211'),
+    },
+}
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+        'KEY_PREFIX': 'yatube',
+        # увеличьте, чтобы разом сбросить весь кеш при выкладке
+        'VERSION': int(os.environ.get('YATUBE_CACHE_VERSION', 1)),
     }
 }
 
@@ -153,3 +240,74 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 SITE_ID = 1
+
+# Лента подписок: посты авторов с большим числом подписчиков
+# не рассылаются по лентам, а читаются при запросе
+FEED_CELEBRITY_FOLLOWERS = 1000
+# сколько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL_SIZE = 500
+
+# Номера страниц доступны только для первых страниц списка,
+# дальше листаем по курсору
+PAGINATOR_MAX_PAGES = 50
+
+# Фрагменты списков живут долго: их сбрасывают счётчики версий
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# пока один воркер пересобирает истёкший фрагмент, остальные отдают старый
+FRAGMENT_CACHE_STALE_TIMEOUT = 60
+# Страницы целиком кешируются для анонимов, ключ включает версии
+# содержимого; прокси может отдавать их без запроса к нам столько секунд
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_EDGE_SECONDS = 10
+
+# Превью картинок готовятся в фоновых потоках после сохранения поста
+IMAGE_PIPELINE_ASYNC = True
+IMAGE_PIPELINE_WORKERS = 2
+# Ширины вариантов картинки для srcset и качество JPEG и WebP
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_QUALITY = 80
+# Картинки, загружаемые частями через API: предел файла и одной части,
+# предел пикселей проверяется по заголовку до загрузки остального;
+# воркер декодирует картинку целиком и сохраняет её без метаданных
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+UPLOAD_MAX_PART_BYTES = 4 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+UPLOAD_IMAGE_QUALITY = 90
+
+# Побочные эффекты записей (ленты, поиск, превью) выполняет очередь задач
+# в базе. Без воркеров (разработка, тесты) задачи выполняются сразу в
+# процессе; в продакшене YATUBE_TASKS_EAGER=0 и manage.py run_workers
+TASKS_EAGER = os.environ.get('YATUBE_TASKS_EAGER', '1') == '1'
+TASKS_WORKERS = int(os.environ.get('YATUBE_TASKS_WORKERS', 2))
+# повтор через 2, 4, 8... секунд, но не реже раза в 10 минут
+TASKS_MAX_ATTEMPTS = 5
+TASKS_BACKOFF_SECONDS = 2
+TASKS_MAX_BACKOFF_SECONDS = 60 * 10
+# задача упавшего воркера достаётся другому по истечении аренды
+TASKS_LEASE_SECONDS = 60 * 5
+TASKS_POLL_SECONDS = 1
+
+# Поиск: 'auto' берёт FTS5 на SQLite, 'terms' — индекс в таблице SearchTerm
+SEARCH_BACKEND = os.environ.get('YATUBE_SEARCH', 'auto')
+
+# Ленты (главная, группа, профиль, подписки) отдаются потоком: шапка
+# страницы уходит сразу, карточки постов — по мере рендера, по
+# STREAM_CARDS_PER_CHUNK за раз. Такие ответы не попадают в кеш страниц
+STREAM_LISTINGS = os.environ.get('YATUBE_STREAM_LISTINGS') == '1'
+STREAM_CARDS_PER_CHUNK = 5
+
+# Метрики запросов: медленные запросы к базе пишутся в лог,
+# превышение бюджета запросов страницей считается и логируется
+METRICS_SLOW_QUERY_MS = 200
+# время каждого шаблона и include: счётчик в метриках и заголовок
+# Server-Timing; замер каждого рендера стоит времени, включать для отладки
+METRICS_TEMPLATE_PROFILE = os.environ.get('YATUBE_TEMPLATE_PROFILE') == '1'
+METRICS_QUERY_BUDGETS = {
+    'index': 6,
+    'group': 7,
+    'profile': 7,
+    'follow_index': 6,
+    'post': 8,
+    'groups': 4,
+    'search': 6,
+}
@@ -21,6 +21,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from posts import views as post_views
+from yatube import metrics
 
 handler404 = "posts.views.page_not_found" # noqa
 handler500 = "posts.views.server_error" # noqa
@@ -33,6 +34,8 @@ urlpatterns = [
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("django.contrib.flatpages.urls")),
     path("admin/", admin.site.urls),
+    path("metrics/", metrics.metrics_view, name="metrics"),
+    path("api/v1/", include("posts.api_urls")),
     path(
             "about-author/", views.flatpage,
             {"url": "/about-author/"}, name="about"